@@ -0,0 +1,107 @@
+from pymongo import ASCENDING
+import threading
+import numpy as np
+from metrics import METRIC_NAMES
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Rules and their state are kept as parallel NumPy arrays so every rule of every tag is
+# evaluated with a handful of vector operations per frame.
+class AlarmEngine:
+    def __init__(self, db, project_name):
+        self.db = db
+        self.project_name = project_name
+        database = db.tags_collection.database
+        self.rules_collection = database["alarm_rules"]
+        self.events_collection = database["alarm_events"]
+        self.events_collection.create_index([("project_name", ASCENDING), ("timestamp", ASCENDING)])
+        self.lock = threading.Lock()
+        self.load_rules()
+
+    def load_rules(self):
+        rules = list(self.rules_collection.find({"project_name": self.project_name}))
+        rules = [rule for rule in rules if rule.get("metric") in METRIC_NAMES]
+        with self.lock:
+            self.rules = rules
+            self.tag_index = {}
+            for rule in rules:
+                self.tag_index.setdefault(rule["tag_name"], len(self.tag_index))
+            self.latest = np.full((max(len(self.tag_index), 1), len(METRIC_NAMES)), np.nan)
+            self.fresh = np.zeros(len(self.latest), dtype=bool)
+            self.rule_tag = np.array([self.tag_index[rule["tag_name"]] for rule in rules], dtype=np.int64)
+            self.rule_metric = np.array([METRIC_NAMES.index(rule["metric"]) for rule in rules], dtype=np.int64)
+            self.threshold = np.array([rule["threshold"] for rule in rules], dtype=np.float64)
+            self.hysteresis = np.array([rule.get("hysteresis", 0.0) for rule in rules], dtype=np.float64)
+            self.below = np.array([rule.get("direction", "above") == "below" for rule in rules], dtype=bool)
+            self.delay = np.array([rule.get("delay_frames", 1) for rule in rules], dtype=np.int64)
+            self.active = np.zeros(len(rules), dtype=bool)
+            self.raise_count = np.zeros(len(rules), dtype=np.int64)
+            self.clear_count = np.zeros(len(rules), dtype=np.int64)
+        logging.info(f"Loaded {len(rules)} alarm rules for {self.project_name}")
+
+    def add_rule(self, tag_name, metric, threshold, direction="above", hysteresis=0.0, delay_frames=1, severity="alarm"):
+        if metric not in METRIC_NAMES:
+            return False, f"Unknown metric {metric}. Use one of: {', '.join(METRIC_NAMES)}"
+        if direction not in ("above", "below"):
+            return False, "Direction must be 'above' or 'below'"
+        self.rules_collection.insert_one({
+            "project_name": self.project_name, "tag_name": tag_name, "metric": metric, "threshold": float(threshold),
+            "direction": direction, "hysteresis": float(hysteresis), "delay_frames": int(delay_frames),
+            "severity": severity,
+        })
+        self.load_rules()
+        return True, f"Alarm rule added for {tag_name} {metric} {direction} {threshold}"
+
+    def delete_rules(self, tag_name):
+        self.rules_collection.delete_many({"project_name": self.project_name, "tag_name": tag_name})
+        self.load_rules()
+
+    def process(self, tag_name, frame_metrics, timestamp, persist=True):
+        # persist=False evaluates without writing events, e.g. for a view-only replay
+        index = self.tag_index.get(tag_name)
+        if index is None or frame_metrics is None:
+            return []
+        with self.lock:
+            self.latest[index] = [frame_metrics[name] for name in METRIC_NAMES]
+            self.fresh[index] = True
+            events = self.evaluate(timestamp)
+        if events and persist:
+            try:
+                self.events_collection.insert_many([dict(event) for event in events])
+            except Exception as e:
+                logging.error(f"Failed to persist alarm events: {str(e)}")
+        return events
+
+    def evaluate(self, timestamp):
+        # A rule only moves on frames of its own tag; hysteresis sets the clear level
+        # below (or above) the trip level and the delay counts consecutive frames.
+        fresh = self.fresh[self.rule_tag]
+        values = self.latest[self.rule_tag, self.rule_metric]
+        sign = np.where(self.below, -1.0, 1.0)
+        over = sign * values > sign * self.threshold
+        clear = sign * values < sign * self.threshold - self.hysteresis
+
+        self.raise_count = np.where(fresh, np.where(over, self.raise_count + 1, 0), self.raise_count)
+        self.clear_count = np.where(fresh, np.where(clear, self.clear_count + 1, 0), self.clear_count)
+        raised = ~self.active & (self.raise_count >= self.delay)
+        cleared = self.active & (self.clear_count >= self.delay)
+        self.active = (self.active | raised) & ~cleared
+        self.fresh[:] = False
+
+        events = []
+        for state, indices in (("raised", np.flatnonzero(raised)), ("cleared", np.flatnonzero(cleared))):
+            for i in indices:
+                rule = self.rules[i]
+                events.append({
+                    "project_name": self.project_name, "tag_name": rule["tag_name"], "metric": rule["metric"],
+                    "value": float(values[i]), "threshold": float(self.threshold[i]), "direction": rule.get("direction", "above"),
+                    "severity": rule.get("severity", "alarm"), "state": state, "timestamp": timestamp,
+                })
+                logging.warning(f"Alarm {state}: {rule['tag_name']} {rule['metric']}={values[i]:.3f} "
+                                f"(threshold {self.threshold[i]})")
+        return events
+
+    def active_alarms(self):
+        with self.lock:
+            return [self.rules[i] for i in np.flatnonzero(self.active)]
@@ -4,7 +4,7 @@ from database import Database
 
 
 class AuthWindow(QWidget):
-    def __init__(self):
+    def __init__(self, options=None):
         super().__init__()
         self.setWindowTitle("Authentication")
         self.setGeometry(200, 200, 300, 100)
@@ -13,6 +13,6 @@ class AuthWindow(QWidget):
         self.setLayout(layout)
         # Simulate login success
         self.db = Database(email="user@example.com")
-        self.dashboard = DashboardWindow(self.db, "user@example.com")
+        self.dashboard = DashboardWindow(self.db, "user@example.com", options)
         self.dashboard.show()
         self.hide()
\ No newline at end of file
@@ -0,0 +1,52 @@
+import time
+import numpy as np
+from codec import CODECS, encode_frame, decode_frame
+
+FRAME_SIZE = 4096
+FRAMES = 200
+
+
+def publisher_frames(count):
+    # Same waveform publish.py sends: 16390..46537 sine, rounded to 2 decimals
+    amplitude = (46537 - 16390) / 2
+    offset = (46537 + 16390) / 2
+    frames = []
+    for i in range(count):
+        t = i + np.arange(FRAME_SIZE) / FRAME_SIZE
+        frames.append(np.round(offset + amplitude * np.sin(np.pi * 7 * t), 2))
+    return frames
+
+
+def noisy_frames(count):
+    rng = np.random.default_rng(0)
+    return [frame + rng.normal(0, 25, FRAME_SIZE) for frame in publisher_frames(count)]
+
+
+def bson_array_size(n):
+    # Each BSON double element is a type byte, the decimal index key + NUL, and 8 bytes
+    return sum(1 + len(str(i)) + 1 + 8 for i in range(n))
+
+
+def run(name, frames, codec_name):
+    start = time.perf_counter()
+    docs = [encode_frame(frame, codec_name) for frame in frames]
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = [decode_frame(doc) for doc in docs]
+    decode_time = time.perf_counter() - start
+
+    assert all(np.array_equal(a, b) for a, b in zip(frames, decoded)), f"{codec_name} is not lossless"
+    raw_bytes = sum(frame.nbytes for frame in frames)
+    bson_bytes = bson_array_size(FRAME_SIZE) * len(frames)
+    stored_bytes = sum(len(doc["data"]) for doc in docs)
+    used = sorted({doc["codec"] for doc in docs})
+    print(f"{name:<10} {codec_name:<12} {','.join(used):<12} "
+          f"ratio(float64) {raw_bytes / stored_bytes:6.2f}x  ratio(BSON) {bson_bytes / stored_bytes:6.2f}x  "
+          f"encode {raw_bytes / encode_time / 1e6:8.1f} MB/s  decode {raw_bytes / decode_time / 1e6:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    datasets = [("publisher", publisher_frames(FRAMES)), ("float", noisy_frames(FRAMES))]
+    for name, frames in datasets:
+        for codec_name in CODECS:
+            run(name, frames, codec_name)
@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import re
+import numpy as np
+from timeutil import to_ns_array
+from metrics import frame_metrics, DEFAULT_SAMPLE_RATE
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+TIMESTAMP_DTYPE = "i8"  # epoch ns
+
+
+def load_timestamps(array):
+    # Exports made before epoch-ns timestamps hold ISO byte strings
+    array = np.asarray(array)
+    if array.dtype.kind == "S":
+        array = np.char.decode(array)
+    return to_ns_array(array)
+
+
+def safe_name(tag_name):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", tag_name)
+
+
+def chunked(frames, chunk_size):
+    timestamps, values = [], []
+    for timestamp, frame in frames:
+        timestamps.append(timestamp)
+        values.append(frame)
+        if len(timestamps) >= chunk_size:
+            yield timestamps, values
+            timestamps, values = [], []
+    if timestamps:
+        yield timestamps, values
+
+
+def to_matrix(values, frame_length):
+    # Fixed-width formats need equal-length rows; short frames are NaN padded and their
+    # real lengths (frame_lengths) are stored alongside so imports can trim them again
+    matrix = np.full((len(values), frame_length), np.nan)
+    for row, frame in enumerate(values):
+        matrix[row, :min(len(frame), frame_length)] = frame[:frame_length]
+    return matrix
+
+
+def frame_lengths(values, frame_length):
+    return np.array([min(len(frame), frame_length) for frame in values], dtype=np.int32)
+
+
+def trim_rows(rows, lengths):
+    # Exports made before lengths were stored come back padded
+    if lengths is None:
+        return list(rows)
+    return [row[:length] for row, length in zip(rows, lengths)]
+
+
+class BulkExporter:
+    def __init__(self, frame_store, chunk_size=1000):
+        self.frame_store = frame_store
+        self.chunk_size = chunk_size
+
+    def export(self, project_name, tags, path, fmt, start=None, end=None):
+        exporters = {"parquet": self.export_parquet, "hdf5": self.export_hdf5, "npy": self.export_npy}
+        if fmt not in exporters:
+            return False, f"Unknown export format {fmt}. Use one of: {', '.join(exporters)}"
+        try:
+            total = exporters[fmt](project_name, tags, path, start, end)
+            return True, f"Exported {total} frames for {len(tags)} tags to {path}"
+        except Exception as e:
+            logging.error(f"Failed to export {project_name} to {path}: {str(e)}")
+            return False, str(e)
+
+    def frames(self, project_name, tag_name, start, end):
+        return self.frame_store.read_frames(project_name, tag_name, start, end, batch_size=self.chunk_size)
+
+    def export_parquet(self, project_name, tags, path, start, end):
+        if pa is None:
+            raise RuntimeError("Parquet export requires pyarrow")
+        schema = pa.schema([("tag_name", pa.string()), ("timestamp", pa.int64()), ("values", pa.list_(pa.float64()))])
+        total = 0
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for tag_name in tags:
+                for timestamps, values in chunked(self.frames(project_name, tag_name, start, end), self.chunk_size):
+                    offsets = np.concatenate([[0], np.cumsum([len(frame) for frame in values])]).astype(np.int32)
+                    column = pa.ListArray.from_arrays(pa.array(offsets), pa.array(np.concatenate(values)))
+                    writer.write_table(pa.Table.from_arrays(
+                        [pa.array([tag_name] * len(timestamps)), pa.array(to_ns_array(timestamps)), column],
+                        schema=schema))
+                    total += len(timestamps)
+                    logging.debug(f"Exported {total} frames to {path}")
+        return total
+
+    def export_hdf5(self, project_name, tags, path, start, end):
+        if h5py is None:
+            raise RuntimeError("HDF5 export requires h5py")
+        total = 0
+        with h5py.File(path, "w") as f:
+            f.attrs["project_name"] = project_name
+            for tag_name in tags:
+                # The group is only created once the tag has a frame in range
+                values_ds = None
+                for timestamps, values in chunked(self.frames(project_name, tag_name, start, end), self.chunk_size):
+                    width = max(max(len(frame) for frame in values), 1)
+                    if values_ds is None:
+                        group = f.create_group(safe_name(tag_name))
+                        group.attrs["tag_name"] = tag_name
+                        timestamps_ds = group.create_dataset("timestamps", (0,), maxshape=(None,), dtype=TIMESTAMP_DTYPE,
+                                                             chunks=(self.chunk_size,))
+                        lengths_ds = group.create_dataset("lengths", (0,), maxshape=(None,), dtype="i4",
+                                                          chunks=(self.chunk_size,))
+                        values_ds = group.create_dataset("values", (0, width), maxshape=(None, None), dtype="f8",
+                                                         chunks=(min(self.chunk_size, 64), width), compression="gzip",
+                                                         fillvalue=np.nan)
+                    elif width > values_ds.shape[1]:
+                        # A longer frame widens every row; the new columns read back as NaN
+                        values_ds.resize((values_ds.shape[0], width))
+                    offset = values_ds.shape[0]
+                    timestamps_ds.resize((offset + len(timestamps),))
+                    lengths_ds.resize((offset + len(timestamps),))
+                    values_ds.resize((offset + len(values), values_ds.shape[1]))
+                    timestamps_ds[offset:] = to_ns_array(timestamps)
+                    lengths_ds[offset:] = frame_lengths(values, values_ds.shape[1])
+                    values_ds[offset:] = to_matrix(values, values_ds.shape[1])
+                    total += len(timestamps)
+        return total
+
+    def export_npy(self, project_name, tags, path, start, end):
+        # path is a directory holding one values/timestamps .npy pair per tag plus index.json;
+        # every .npy can be opened later with np.load(..., mmap_mode="r")
+        os.makedirs(path, exist_ok=True)
+        index = {"project_name": project_name, "start": start, "end": end, "tags": {}}
+        total = 0
+        for tag_name in tags:
+            # Rows are as wide as the longest frame in range, so no frame is cut
+            timestamps, lengths, _ = self.frame_store.frame_index(project_name, tag_name, start, end)
+            count = len(timestamps)
+            if not count:
+                continue
+            frame_length = max(int(lengths.max()), 1)
+            name = safe_name(tag_name)
+            values_file, timestamps_file = f"{name}.values.npy", f"{name}.timestamps.npy"
+            lengths_file = f"{name}.lengths.npy"
+            values_mm = np.lib.format.open_memmap(os.path.join(path, values_file), mode="w+", dtype="f8",
+                                                  shape=(count, frame_length))
+            timestamps_mm = np.lib.format.open_memmap(os.path.join(path, timestamps_file), mode="w+",
+                                                      dtype=TIMESTAMP_DTYPE, shape=(count,))
+            lengths_mm = np.lib.format.open_memmap(os.path.join(path, lengths_file), mode="w+", dtype="i4",
+                                                   shape=(count,))
+            offset = 0
+            for timestamps, values in chunked(self.frames(project_name, tag_name, start, end), self.chunk_size):
+                # Frames written after frame_index ran are left for the next export
+                rows = min(len(timestamps), count - offset)
+                timestamps_mm[offset:offset + rows] = to_ns_array(timestamps[:rows])
+                values_mm[offset:offset + rows] = to_matrix(values[:rows], frame_length)
+                lengths_mm[offset:offset + rows] = frame_lengths(values[:rows], frame_length)
+                offset += rows
+                if offset >= count:
+                    break
+            values_mm.flush()
+            timestamps_mm.flush()
+            lengths_mm.flush()
+            del values_mm, timestamps_mm, lengths_mm
+            index["tags"][tag_name] = {"values": values_file, "timestamps": timestamps_file, "lengths": lengths_file,
+                                       "frames": offset, "frame_length": frame_length}
+            total += offset
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump(index, f, indent=2)
+        return total
+
+
+# Imported frames also feed the hourly summaries and metrics when those stores are given,
+# so reports and trends cover the imported range like frames that came in live.
+class BulkImporter:
+    def __init__(self, frame_store, chunk_size=1000, summary_store=None, metrics_store=None, metadata_store=None):
+        self.frame_store = frame_store
+        self.chunk_size = chunk_size
+        self.summary_store = summary_store
+        self.metrics_store = metrics_store
+        self.metadata_store = metadata_store
+
+    def import_path(self, project_name, path, fmt):
+        importers = {"parquet": self.read_parquet, "hdf5": self.read_hdf5, "npy": self.read_npy}
+        if fmt not in importers:
+            return False, f"Unknown import format {fmt}. Use one of: {', '.join(importers)}"
+        total = 0
+        try:
+            for tag_name, timestamps, values in importers[fmt](path):
+                success, message = self.frame_store.write_frames(project_name, tag_name, zip(timestamps, values))
+                if not success:
+                    return False, message
+                self.index_frames(project_name, tag_name, timestamps, values)
+                total += len(timestamps)
+                logging.debug(f"Imported {total} frames from {path}")
+            return True, f"Imported {total} frames into {project_name} from {path}"
+        except Exception as e:
+            logging.error(f"Failed to import {path}: {str(e)}")
+            return False, str(e)
+
+    def index_frames(self, project_name, tag_name, timestamps, values):
+        # One summary and one metrics round trip per chunk, with an update per hour touched
+        sample_rate = DEFAULT_SAMPLE_RATE
+        if self.metadata_store is not None:
+            sample_rate = self.metadata_store.get(project_name, tag_name).sample_rate or DEFAULT_SAMPLE_RATE
+        if self.summary_store is not None:
+            self.summary_store.update_many(project_name, tag_name, zip(timestamps, values))
+        if self.metrics_store is not None:
+            self.metrics_store.append_many(project_name, tag_name, [(timestamp, frame_metrics(frame, sample_rate))
+                                                                    for timestamp, frame in zip(timestamps, values)])
+
+    def read_parquet(self, path):
+        if pa is None:
+            raise RuntimeError("Parquet import requires pyarrow")
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_size):
+            tags = batch.column(0).to_pylist()
+            timestamps = load_timestamps(batch.column(1).to_pylist())
+            column = batch.column(2)
+            flat = column.values.to_numpy(zero_copy_only=False)
+            offsets = column.offsets.to_numpy()
+            values = [flat[offsets[i]:offsets[i + 1]] for i in range(len(tags))]
+            # A batch can straddle two tags; split it on tag boundaries
+            boundaries = [0] + [i for i in range(1, len(tags)) if tags[i] != tags[i - 1]] + [len(tags)]
+            for lo, hi in zip(boundaries, boundaries[1:]):
+                yield tags[lo], timestamps[lo:hi], values[lo:hi]
+
+    def read_hdf5(self, path):
+        if h5py is None:
+            raise RuntimeError("HDF5 import requires h5py")
+        with h5py.File(path, "r") as f:
+            for group in f.values():
+                if "values" not in group:
+                    # Older exports created a group for tags without frames in range
+                    continue
+                tag_name = group.attrs["tag_name"]
+                lengths = group["lengths"] if "lengths" in group else None
+                for lo in range(0, group["values"].shape[0], self.chunk_size):
+                    timestamps = load_timestamps(group["timestamps"][lo:lo + self.chunk_size])
+                    rows = group["values"][lo:lo + self.chunk_size]
+                    yield tag_name, timestamps, trim_rows(rows, None if lengths is None else lengths[lo:lo + self.chunk_size])
+
+    def read_npy(self, path):
+        with open(os.path.join(path, "index.json")) as f:
+            index = json.load(f)
+        for tag_name, entry in index["tags"].items():
+            values_mm = np.load(os.path.join(path, entry["values"]), mmap_mode="r")
+            timestamps_mm = np.load(os.path.join(path, entry["timestamps"]), mmap_mode="r")
+            lengths_mm = np.load(os.path.join(path, entry["lengths"]), mmap_mode="r") if "lengths" in entry else None
+            for lo in range(0, entry["frames"], self.chunk_size):
+                timestamps = load_timestamps(timestamps_mm[lo:lo + self.chunk_size])
+                rows = np.array(values_mm[lo:lo + self.chunk_size])
+                yield tag_name, timestamps, trim_rows(rows, None if lengths_mm is None else lengths_mm[lo:lo + self.chunk_size])
+
+
+if __name__ == "__main__":
+    from database import Database
+    from frame_store import FrameStore
+    from metrics import MetricsStore
+    from summaries import SummaryStore
+    from tag_metadata import TagMetadataStore
+
+    parser = argparse.ArgumentParser(description="Bulk export/import of tag history")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--email", default="user@example.com")
+    parser.add_argument("--project", required=True)
+    parser.add_argument("--tags", nargs="*", help="Tags to export (default: all tags of the project)")
+    parser.add_argument("--start", help="ISO timestamp, inclusive")
+    parser.add_argument("--end", help="ISO timestamp, inclusive")
+    parser.add_argument("--format", choices=["parquet", "hdf5", "npy"], default="npy")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    db = Database(email=args.email)
+    frame_store = FrameStore(db)
+    if args.command == "export":
+        tags = args.tags or [tag["tag_name"] for tag in db.tags_collection.find({"project_name": args.project})]
+        success, message = BulkExporter(frame_store, args.chunk_size).export(
+            args.project, tags, args.path, args.format, args.start, args.end)
+    else:
+        importer = BulkImporter(frame_store, args.chunk_size, SummaryStore(db), MetricsStore(db), TagMetadataStore(db))
+        success, message = importer.import_path(args.project, args.path, args.format)
+    print(message)
+    db.close_connection()
@@ -0,0 +1,178 @@
+from collections import deque
+from pymongo import ASCENDING
+import threading
+from timeutil import now_ns
+import settings
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CONTINUOUS, TRIGGERED = "continuous", "triggered"
+
+
+def request_capture(db, project_name, tags=None, reason="manual"):
+    # For dashboards in reader mode: the ingest daemon picks requests up on its next pass
+    try:
+        db.tags_collection.database["capture_requests"].insert_one(
+            {"project_name": project_name, "tags": tags, "reason": reason, "requested": now_ns()})
+        return True, "Capture requested"
+    except Exception as e:
+        logging.error(f"Failed to request capture for {project_name}: {str(e)}")
+        return False, str(e)
+
+
+# Decides which raw frames reach the frame store. In "continuous" mode that is all of
+# them. In "triggered" mode only metrics and rollups are stored by default, while the
+# last pre_frames frames of every tag wait in memory; a trigger (alarm, manual request,
+# or a metric jumping by more than a set fraction) writes those out and keeps storing
+# raw frames for post_frames more. Each capture is recorded in the "captures" collection.
+class CapturePolicy:
+    def __init__(self, db, project_name, write_frame):
+        self.db = db
+        self.project_name = project_name
+        self.write_frame = write_frame  # callable(SpoolFrame) -> bool
+        self.mode = settings.get("capture_mode")
+        self.pre_frames = settings.get("capture_pre_frames")
+        self.post_frames = settings.get("capture_post_frames")
+        self.scope = settings.get("capture_scope")  # "tag": only the tags involved; "project": every tag
+        self.on_alarm = settings.get("capture_on_alarm")
+        # [{"tag": ..., "metric": "rms", "change": 0.5}]: trigger when the metric moves by 50%
+        self.change_triggers = {}
+        for rule in settings.get("capture_change_triggers"):
+            self.change_triggers.setdefault(rule["tag"], []).append(rule)
+        database = db.tags_collection.database
+        self.captures_collection = database["captures"]
+        self.requests_collection = database["capture_requests"]
+        self.captures_collection.create_index([("project_name", ASCENDING), ("trigger_timestamp", ASCENDING)])
+        self.lock = threading.Lock()
+        self.buffers = {}
+        self.remaining = {}  # tag -> raw frames still to store after a trigger
+        self.capture_of = {}  # tag -> id of the capture it is recording for
+        self.baselines = {}
+        self.captures = 0
+        self.raw_frames = 0
+        self.skipped_frames = 0
+
+    @property
+    def triggered(self):
+        return self.mode == TRIGGERED
+
+    def accept(self, frame, metrics=None):
+        # Called for every received frame; True means store it raw now
+        if not self.triggered:
+            return True
+        with self.lock:
+            remaining = self.remaining.get(frame.tag_name, 0)
+            if remaining:
+                self.remaining[frame.tag_name] = remaining - 1
+                self.raw_frames += 1
+                finished = remaining == 1
+            else:
+                buffer = self.buffers.get(frame.tag_name)
+                if buffer is None:
+                    buffer = self.buffers[frame.tag_name] = deque(maxlen=self.pre_frames)
+                buffer.append(frame)
+                self.skipped_frames += 1
+                finished = False
+        if remaining:
+            self.record_frames(frame.tag_name, [frame], finished)
+        if metrics is not None and frame.tag_name in self.change_triggers:
+            self.check_change(frame, metrics)
+        return bool(remaining)
+
+    def check_change(self, frame, metrics):
+        for rule in self.change_triggers[frame.tag_name]:
+            value = metrics.get(rule["metric"])
+            if value is None:
+                continue
+            key = (frame.tag_name, rule["metric"])
+            baseline = self.baselines.get(key)
+            self.baselines[key] = value
+            if baseline and abs(value - baseline) > rule.get("change", 0.5) * abs(baseline):
+                self.trigger([frame.tag_name], f"{rule['metric']} changed {baseline:.4g} -> {value:.4g}",
+                             frame.timestamp)
+
+    def alarm(self, event):
+        if self.triggered and self.on_alarm and event.get("state") == "raised":
+            self.trigger([event["tag_name"]], f"alarm: {event.get('metric')} {event.get('direction')} "
+                                              f"{event.get('threshold')}", event.get("timestamp"))
+
+    def project_tags(self):
+        try:
+            return [tag["tag_name"] for tag in self.db.tags_collection.find({"project_name": self.project_name},
+                                                                              {"tag_name": 1})]
+        except Exception as e:
+            logging.error(f"Failed to list tags of {self.project_name}: {str(e)}")
+            return []
+
+    def trigger(self, tags=None, reason="manual", timestamp=None):
+        # Writes the buffered frames synchronously: call it off the GUI thread
+        if not self.triggered:
+            return None
+        timestamp = timestamp or now_ns()
+        # Every tag of the project, including those that have not sent a frame since the
+        # last capture and so have nothing buffered; they start recording from now
+        everything = self.project_tags() if tags is None or self.scope == "project" else []
+        with self.lock:
+            if tags is None or self.scope == "project":
+                tags = sorted(set(everything) | set(self.buffers) | set(tags or []))
+            pending = {tag_name: list(self.buffers.pop(tag_name, ())) for tag_name in tags}
+        try:
+            capture_id = self.captures_collection.insert_one({
+                "project_name": self.project_name, "tags": tags, "reason": reason, "trigger_timestamp": timestamp,
+                "start": min((frames[0].timestamp for frames in pending.values() if frames), default=timestamp),
+                "end": timestamp, "frames": 0, "state": "recording"}).inserted_id
+        except Exception as e:
+            logging.error(f"Failed to record capture for {self.project_name}: {str(e)}")
+            capture_id = None
+        with self.lock:
+            for tag_name in tags:
+                # A trigger during a running capture extends it
+                self.remaining[tag_name] = self.post_frames
+                self.capture_of[tag_name] = capture_id
+            self.captures += 1
+        logging.info(f"Capture triggered for {len(tags)} tags of {self.project_name}: {reason}")
+        for tag_name, frames in pending.items():
+            stored = [frame for frame in frames if self.write_frame(frame)]
+            if len(stored) < len(frames):
+                logging.error(f"Stored {len(stored)} of {len(frames)} pre-trigger frames for {tag_name}")
+            with self.lock:
+                self.raw_frames += len(stored)
+            self.record_frames(tag_name, stored, False)
+        return capture_id
+
+    def record_frames(self, tag_name, frames, finished):
+        capture_id = self.capture_of.get(tag_name)
+        if capture_id is None or not frames:
+            return
+        update = {"$inc": {"frames": len(frames)}, "$max": {"end": max(frame.timestamp for frame in frames)}}
+        try:
+            self.captures_collection.update_one({"_id": capture_id}, update)
+            if finished:
+                with self.lock:
+                    self.capture_of.pop(tag_name, None)
+                    busy = any(other == capture_id for other in self.capture_of.values())
+                if not busy:
+                    self.captures_collection.update_one({"_id": capture_id}, {"$set": {"state": "complete"}})
+        except Exception as e:
+            logging.error(f"Failed to update capture {capture_id}: {str(e)}")
+
+    def poll_requests(self):
+        # Consumes capture requests written by request_capture()
+        while True:
+            request = self.requests_collection.find_one_and_delete({"project_name": self.project_name},
+                                                                    sort=[("requested", ASCENDING)])
+            if request is None:
+                return
+            self.trigger(request.get("tags"), request.get("reason", "manual"))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "mode": self.mode,
+                "captures": self.captures,
+                "recording": sum(1 for remaining in self.remaining.values() if remaining),
+                "raw_frames": self.raw_frames,
+                "skipped_frames": self.skipped_frames,
+                "buffered_frames": sum(len(buffer) for buffer in self.buffers.values()),
+            }
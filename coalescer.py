@@ -0,0 +1,76 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from collections import deque
+import threading
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Sits between the MQTT thread and the GUI. Frames are parked in a bounded per-tag slot
+# instead of being queued as one cross-thread signal each; once per GUI tick a single
+# tags_updated notification hands over whatever is pending. If the GUI stalls, older
+# frames fall out of the slot, so memory and catch-up work stay bounded.
+class FrameCoalescer(QObject):
+    tags_updated = pyqtSignal(list)  # Signal: tag names with pending (timestamp, values) frames
+
+    def __init__(self, max_pending=4, interval_ms=50):
+        super().__init__()
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.ready = {}
+        self.received = 0
+        self.delivered = 0
+        self.merged = 0
+        self.dropped = 0
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(interval_ms)
+
+    def push(self, tag_name, timestamp, values):
+        # Called from the MQTT thread
+        with self.lock:
+            self.received += 1
+            slot = self.pending.get(tag_name)
+            if slot is None:
+                slot = self.pending[tag_name] = deque(maxlen=self.max_pending)
+            else:
+                self.merged += 1
+                if len(slot) == self.max_pending:
+                    self.dropped += 1
+            slot.append((timestamp, values))
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            self.ready, self.pending = self.pending, {}
+        self.tags_updated.emit(list(self.ready))
+        self.ready = {}
+
+    def take(self, tag_name):
+        frames = self.ready.pop(tag_name, None)
+        if frames is None:
+            return []
+        self.delivered += len(frames)
+        return list(frames)
+
+    def clear(self):
+        with self.lock:
+            self.pending.clear()
+        self.ready = {}
+
+    def stop(self):
+        self.timer.stop()
+        self.clear()
+
+    def nbytes(self):
+        # Samples parked for the GUI; bounded by max_pending per tag
+        with self.lock:
+            slots = list(self.pending.values()) + list(self.ready.values())
+            return sum(8 * len(values) for slot in slots for _, values in slot)
+
+    def stats(self):
+        with self.lock:
+            pending = sum(len(slot) for slot in self.pending.values())
+        return {"received": self.received, "delivered": self.delivered, "merged": self.merged,
+                "dropped": self.dropped, "pending": pending}
@@ -0,0 +1,197 @@
+import zlib
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+class ZlibCompressor:
+    name = "zlib"
+
+    def compress(self, data):
+        return zlib.compress(data, 6)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class ZstdCompressor:
+    name = "zstd"
+
+    def __init__(self, level=3):
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def decompress(self, data):
+        return self._decompressor.decompress(data)
+
+
+class LZ4Compressor:
+    name = "lz4"
+
+    def compress(self, data):
+        return lz4.frame.compress(data)
+
+    def decompress(self, data):
+        return lz4.frame.decompress(data)
+
+
+def zigzag_encode(values):
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def zigzag_decode(values):
+    values = values.astype(np.uint64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+
+def delta_encode(values):
+    deltas = np.empty_like(values)
+    if len(values):
+        deltas[0] = values[0]
+        deltas[1:] = np.diff(values)
+    return deltas
+
+
+def narrowest_uint(values):
+    top = int(values.max()) if len(values) else 0
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if top <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values.astype(np.uint64)
+
+
+# Lossless for values with a fixed number of decimals (the publisher rounds to 2).
+# Scaled to integers, delta encoded (first or second order, whichever packs
+# tighter), zigzag mapped and packed into the narrowest unsigned type before
+# compression.
+class DeltaIntCodec:
+    kind = "delta"
+
+    def __init__(self, compressor, scale=100):
+        self.compressor = compressor
+        self.scale = scale
+        self.name = f"delta-{compressor.name}"
+
+    def can_encode(self, values):
+        scaled = np.rint(values * self.scale)
+        if not np.all(np.isfinite(scaled)) or np.abs(scaled).max(initial=0) >= 2 ** 52:
+            return False
+        return np.array_equal(scaled / self.scale, values)
+
+    def encode(self, values):
+        scaled = np.rint(values * self.scale).astype(np.int64)
+        first = delta_encode(scaled)
+        second = delta_encode(first)
+        zz_first, zz_second = zigzag_encode(first), zigzag_encode(second)
+        if len(scaled) > 2 and zz_second[2:].max() < zz_first[1:].max():
+            order, packed = 2, narrowest_uint(zz_second)
+        else:
+            order, packed = 1, narrowest_uint(zz_first)
+        return {
+            "codec": self.name,
+            "n": len(values),
+            "order": order,
+            "width": packed.dtype.itemsize,
+            "scale": self.scale,
+            "data": self.compressor.compress(packed.tobytes()),
+        }
+
+    def decode(self, doc):
+        dtype = np.dtype(f"u{doc['width']}")
+        packed = np.frombuffer(self.compressor.decompress(doc["data"]), dtype=dtype)
+        scaled = zigzag_decode(packed)
+        for _ in range(doc.get("order", 1)):
+            scaled = np.cumsum(scaled)
+        return scaled / doc["scale"]
+
+
+# Gorilla-style XOR of consecutive float64 bit patterns for true floats. The XOR
+# residuals are byte-shuffled so the mostly-zero high bytes form long runs, which
+# stands in for Gorilla's per-value leading/trailing zero bit packing.
+class XorFloatCodec:
+    kind = "xor"
+
+    def __init__(self, compressor):
+        self.compressor = compressor
+        self.name = f"xor-{compressor.name}"
+
+    def can_encode(self, values):
+        return True
+
+    def encode(self, values):
+        bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+        residuals = bits.copy()
+        residuals[1:] ^= bits[:-1]
+        shuffled = residuals.view(np.uint8).reshape(-1, 8).T.copy()
+        return {
+            "codec": self.name,
+            "n": len(values),
+            "data": self.compressor.compress(shuffled.tobytes()),
+        }
+
+    def decode(self, doc):
+        shuffled = np.frombuffer(self.compressor.decompress(doc["data"]), dtype=np.uint8)
+        residuals = shuffled.reshape(8, doc["n"]).T.copy().view(np.uint64).ravel()
+        return np.bitwise_xor.accumulate(residuals).view(np.float64)
+
+
+def available_compressors():
+    compressors = [ZlibCompressor()]
+    if zstandard is not None:
+        compressors.append(ZstdCompressor())
+    if lz4 is not None:
+        compressors.append(LZ4Compressor())
+    return compressors
+
+
+CODECS = {}
+for _compressor in available_compressors():
+    for _codec in (DeltaIntCodec(_compressor), XorFloatCodec(_compressor)):
+        CODECS[_codec.name] = _codec
+
+DEFAULT_CODEC = "delta-zstd" if "delta-zstd" in CODECS else "delta-zlib"
+
+
+def get_codec(name):
+    codec = CODECS.get(name)
+    if codec is None:
+        logging.warning(f"Codec {name} not available, falling back to {DEFAULT_CODEC}")
+        codec = CODECS[DEFAULT_CODEC]
+    return codec
+
+
+def encode_frame(values, codec_name=DEFAULT_CODEC):
+    values = np.asarray(values, dtype=np.float64)
+    codec = get_codec(codec_name)
+    if not codec.can_encode(values):
+        # Scaled integers would lose precision; keep the frame lossless with the XOR codec
+        codec = get_codec(f"xor-{codec.compressor.name}")
+    return codec.encode(values)
+
+
+def decode_frame(doc):
+    return get_codec(doc["codec"]).decode(doc)
+
+
+def decode_engineering(doc):
+    # Frames are stored as raw counts, which compress far better than scaled floats; the
+    # scale and offset in force when the frame was written are kept on the document
+    values = decode_frame(doc)
+    scale, offset = doc.get("eng_scale", 1.0), doc.get("eng_offset", 0.0)
+    if scale == 1.0 and offset == 0.0:
+        return values
+    return values * scale + offset
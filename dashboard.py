@@ -1,12 +1,27 @@
 import sys
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout, QSplitter,
-                             QToolBar, QAction, QTreeWidget, QTreeWidgetItem, QInputDialog, QMessageBox,QSizePolicy,QApplication)
+                             QToolBar, QAction, QTreeWidget, QTreeWidgetItem, QInputDialog, QMessageBox,QSizePolicy,QApplication,
+                             QMenu)
 from PyQt5.QtCore import Qt, QSize, QTimer
-from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QIcon, QCursor
 import os
 from mqtthandler import MQTTHandler
+from store_reader import StoreFollower
+import settings
+from capture import request_capture
+from frame_store import FrameStore
+from workers import ComputePool
+from coalescer import FrameCoalescer
+from memory_budget import MemoryBudget, estimate_nbytes
+import profiler
+from frame_reduce import shutdown_process_pool
+from summaries import SummaryStore
+from metrics import MetricsStore
+from tag_metadata import TagMetadataStore
+from timeutil import format_ns
 from features.create_tags import CreateTagsFeature
 from features.tabular_view import TabularViewFeature
+from features.sample_browser import SampleBrowserFeature
 from features.time_view import TimeViewFeature
 from features.fft_view import FFTViewFeature
 from features.waterfall import WaterfallFeature
@@ -22,34 +37,142 @@ import logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class DashboardWindow(QWidget):
-    def __init__(self, db, email):
+    def __init__(self, db, email, options=None):
         super().__init__()
         self.db = db
         self.email = email
+        self.options = options or {}
+        self.frame_store = FrameStore(db)
+        self.summary_store = SummaryStore(db)
+        self.metrics_store = MetricsStore(db)
+        self.metadata_store = TagMetadataStore(db)
+        self.compute_pool = ComputePool()
+        self.captures_requested = 0
+        self.coalescer = FrameCoalescer()
+        self.coalescer.tags_updated.connect(self.on_tags_updated)
         self.current_project = None
         self.current_feature = None
         self.mqtt_handler = None
+        self.store_follower = None
         self.feature_instances = {}
+        self.active_alarms = {}
+        self.memory_budget = MemoryBudget(settings.get("memory_budget_mb") * 1024 * 1024)
+        self.memory_budget.register("query_cache", lambda: self.frame_store.cache.nbytes, self.frame_store.cache.invalidate,
+                                    "query cache")
+        self.memory_budget.register("coalescer", self.coalescer.nbytes, None, "pending frames")
         self.timer = QTimer(self)
-        
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_delivery_stats)
+        self.stats_timer.start(1000)
+
         self.initUI()
         self.setup_mqtt()
 
     def setup_mqtt(self):
         if self.current_project:
-            if self.mqtt_handler:
-                self.mqtt_handler.stop()
-            self.mqtt_handler = MQTTHandler(self.db, self.current_project)
+            self.stop_live_data()
+            self.active_alarms.clear()
+            self.update_alarm_banner()
+            self.coalescer.clear()
+            if settings.get("ingest_mode") == "daemon":
+                # ingest_daemon.py owns the broker connection and storage; the GUI only reads
+                self.store_follower = StoreFollower(self.db, self.current_project, self.frame_store, self.coalescer)
+                self.store_follower.alarm_event.connect(self.on_alarm_event)
+                self.store_follower.start()
+                return
+            self.mqtt_handler = MQTTHandler(self.db, self.current_project, self.frame_store, self.summary_store,
+                                            self.metrics_store, self.coalescer, self.metadata_store)
             self.mqtt_handler.data_received.connect(self.on_data_received)
-            self.mqtt_handler.start()
+            self.mqtt_handler.alarm_event.connect(self.on_alarm_event)
+            if self.options.get("record"):
+                self.mqtt_handler.start_recording(self.options["record"])
+            if self.options.get("replay"):
+                self.mqtt_handler.start_replay(self.options["replay"], self.options.get("speed", 1.0),
+                                               self.options.get("loop", False), self.options.get("replay_store", False))
+            else:
+                self.mqtt_handler.start()
             logging.info(f"MQTT setup for project: {self.current_project}")
 
+    def stop_live_data(self):
+        if self.mqtt_handler:
+            self.mqtt_handler.stop()
+            self.mqtt_handler = None
+        if self.store_follower:
+            self.store_follower.stop()
+            self.store_follower = None
+
     def on_data_received(self, tag_name, values):
         if self.current_feature and self.current_project:
             feature_instance = self.feature_instances.get(self.current_feature)
             if feature_instance:
                 feature_instance.on_data_received(tag_name, values)
 
+    def on_tags_updated(self, tag_names):
+        # One call per GUI tick. Features that keep a continuous buffer get every pending
+        # frame; the rest only redraw from the newest one.
+        feature_instance = self.feature_instances.get(self.current_feature) if self.current_project else None
+        if feature_instance:
+            self.memory_budget.touch(f"feature:{self.current_feature}")
+        for tag_name in tag_names:
+            frames = self.coalescer.take(tag_name)
+            if not frames or not feature_instance:
+                continue
+            if hasattr(feature_instance, "on_frames_received"):
+                feature_instance.on_frames_received(tag_name, frames)
+            else:
+                feature_instance.on_data_received(tag_name, frames[-1][1])
+
+    def update_delivery_stats(self):
+        self.memory_budget.enforce()
+        stats = self.coalescer.stats()
+        text = (f"Frames received: {stats['received']}  delivered: {stats['delivered']}  "
+                f"merged: {stats['merged']}  dropped: {stats['dropped']}  pending: {stats['pending']}")
+        if self.mqtt_handler:
+            sequence = self.mqtt_handler.sequence_tracker.stats()
+            text += (f"  |  Sequence gaps: {sequence['gaps']} ({sequence['missing']} frames missing)  "
+                     f"duplicates: {sequence['duplicates']}  restarts: {sequence['resets']}")
+            spool = self.mqtt_handler.spool.stats()
+            if spool["segments"] or not spool["available"]:
+                age = f"{spool['oldest_age']:.0f}s" if spool["oldest_age"] is not None else "-"
+                text += (f"  |  Spool: {'STORAGE DOWN, ' if not spool['available'] else ''}"
+                         f"{spool['bytes'] / 1e6:.1f} MB in {spool['segments']} segments, oldest {age}, "
+                         f"replaying {spool['replay_rate']:.0f} frames/s ({spool['replayed']}/{spool['spooled']})")
+            if spool["quarantined"]:
+                text += f"  |  Quarantined: {spool['quarantined']} frames rejected by the database"
+            capture = self.mqtt_handler.service.capture.stats()
+            if capture["mode"] == "triggered":
+                text += (f"  |  Capture: {capture['captures']} triggered, {capture['recording']} tags recording, "
+                         f"raw {capture['raw_frames']} / skipped {capture['skipped_frames']} frames")
+        elif self.store_follower:
+            text += "  |  Reader mode: data is stored by the ingest daemon"
+        cache = self.frame_store.cache.stats()
+        text += (f"  |  Query cache: {cache['hit_ratio']:.0%} hits ({cache['hits']}/{cache['hits'] + cache['misses']}), "
+                 f"{cache['bytes'] / 1e6:.1f}/{cache['budget'] / 1e6:.0f} MB, {cache['evictions']} evicted")
+        memory = self.memory_budget.stats()
+        rss = f", process {memory['rss'] / 1e6:.0f} MB" if memory["rss"] is not None else ""
+        text += (f"  |  Memory: {memory['tracked'] / 1e6:.0f}/{memory['budget'] / 1e6:.0f} MB tracked{rss}, "
+                 f"{memory['evictions']} released")
+        self.delivery_label.setToolTip("\n".join(f"{label}: {nbytes / 1e6:.1f} MB"
+                                                 for label, nbytes in self.memory_budget.usage()))
+        self.delivery_label.setText(text)
+
+    def on_alarm_event(self, event):
+        key = (event["tag_name"], event["metric"], event["direction"], event["threshold"])
+        if event["state"] == "raised":
+            self.active_alarms[key] = event
+        else:
+            self.active_alarms.pop(key, None)
+        self.update_alarm_banner()
+
+    def update_alarm_banner(self):
+        if not self.active_alarms:
+            self.alarm_banner.setVisible(False)
+            return
+        lines = [f"{e['severity'].upper()}: {e['tag_name']} {e['metric']} = {e['value']:.3f} "
+                 f"({e['direction']} {e['threshold']}) since {format_ns(e['timestamp'], '%Y-%m-%d %H:%M:%S')}" for e in self.active_alarms.values()]
+        self.alarm_banner.setText("\n".join(lines))
+        self.alarm_banner.setVisible(True)
+
     def initUI(self):
         self.setWindowTitle('Sarayu Dashboard')
         self.setGeometry(100, 100, 1200, 800)
@@ -86,6 +209,11 @@ class DashboardWindow(QWidget):
         self.update_toolbar()
         main_layout.addWidget(self.toolbar)
 
+        self.alarm_banner = QLabel()
+        self.alarm_banner.setStyleSheet("background-color: #e74c3c; color: white; font-size: 14px; font-weight: bold; padding: 5px;")
+        self.alarm_banner.setVisible(False)
+        main_layout.addWidget(self.alarm_banner)
+
         main_splitter = QSplitter(Qt.Horizontal)
         main_layout.addWidget(main_splitter)
 
@@ -109,6 +237,10 @@ class DashboardWindow(QWidget):
         main_splitter.setSizes([300, 900])
         main_splitter.setHandleWidth(0)
 
+        self.delivery_label = QLabel()
+        self.delivery_label.setStyleSheet("color: #2c3e50; font-size: 12px; padding: 2px;")
+        main_layout.addWidget(self.delivery_label)
+
         self.load_projects()
         self.display_dashboard()
 
@@ -139,15 +271,37 @@ class DashboardWindow(QWidget):
         add_action("", "icons/save.png", self.save_action, "Save Project")
         add_action("", "icons/refresh.png", self.refresh_action, "Refresh View")
         add_action("", "icons/edit.png", self.edit_project_dialog, "Edit Project Name")
+        add_action("Capture", "icons/time.png", self.capture_action, "Store raw frames around this moment")
         spacer = QWidget()
         spacer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
         self.toolbar.addWidget(spacer)
         add_action("Settings", "icons/settings.png", self.settings_action, "Settings")
 
-    def close_project(self):
+    def capture_action(self):
+        if not self.current_project:
+            QMessageBox.warning(self, "Capture", "Open a project first!")
+            return
         if self.mqtt_handler:
-            self.mqtt_handler.stop()
-            self.mqtt_handler = None
+            capture = self.mqtt_handler.service.capture
+            if not capture.triggered:
+                QMessageBox.information(self, "Capture", "Capture mode is continuous; every raw frame is already stored.")
+                return
+            # The pre-trigger frames are written synchronously, so keep that off the GUI thread
+            self.captures_requested += 1
+            self.compute_pool.submit(f"capture:{self.captures_requested}", lambda token: capture.trigger(reason="manual"),
+                                     on_result=lambda capture_id: QMessageBox.information(
+                                         self, "Capture", f"Capturing {capture.pre_frames} frames before and "
+                                                          f"{capture.post_frames} after now for every tag."),
+                                     on_error=lambda message: QMessageBox.warning(self, "Capture", message))
+        else:
+            success, message = request_capture(self.db, self.current_project)
+            if success:
+                QMessageBox.information(self, "Capture", "Capture requested from the ingest daemon.")
+            else:
+                QMessageBox.warning(self, "Capture", message)
+
+    def close_project(self):
+        self.stop_live_data()
         self.current_project = None
         self.current_feature = None
         self.timer.stop()
@@ -165,9 +319,7 @@ class DashboardWindow(QWidget):
             self.display_feature_content("Create Tags", project_name)
 
     def display_dashboard(self):
-        if self.mqtt_handler:
-            self.mqtt_handler.stop()
-            self.mqtt_handler = None
+        self.stop_live_data()
         self.current_project = None
         self.current_feature = None
         self.timer.stop()
@@ -198,6 +350,7 @@ class DashboardWindow(QWidget):
             ("Create Tags", "icons/tag.png"),
             ("Time View", "icons/time.png"),
             ("Tabular View", "icons/table.png"),
+            ("Sample Browser", "icons/table.png"),
             ("FFT", "icons/fft.png"),
             ("Waterfall", "icons/waterfall.png"),
             ("Orbit", "icons/orbit.png"),
@@ -305,6 +458,7 @@ class DashboardWindow(QWidget):
         feature_classes = {
             "Create Tags": CreateTagsFeature,
             "Tabular View": TabularViewFeature,
+            "Sample Browser": SampleBrowserFeature,
             "Time View": TimeViewFeature,
             "FFT": FFTViewFeature,
             "Waterfall": WaterfallFeature,
@@ -320,8 +474,27 @@ class DashboardWindow(QWidget):
         if feature_name in feature_classes:
             feature_instance = feature_classes[feature_name](self, self.db, project_name)
             self.feature_instances[feature_name] = feature_instance
+            self.memory_budget.register(f"feature:{feature_name}", lambda: estimate_nbytes(feature_instance),
+                                        lambda: self.release_feature(feature_name), feature_name)
             self.content_layout.addWidget(feature_instance.get_widget())
 
+    def release_feature(self, feature_name):
+        # Called by the memory budget. The feature on screen only sheds what it can spare;
+        # any other one is dropped and rebuilt when it is opened again.
+        feature_instance = self.feature_instances.get(feature_name)
+        if feature_instance is None:
+            return
+        if feature_name == self.current_feature:
+            if hasattr(feature_instance, "release_memory"):
+                feature_instance.release_memory()
+            return
+        del self.feature_instances[feature_name]
+        self.memory_budget.unregister(f"feature:{feature_name}")
+        figure = getattr(feature_instance, "figure", None) or getattr(getattr(feature_instance, "plot", None), "figure", None)
+        if figure is not None:
+            figure.clear()
+        logging.info(f"Released {feature_name} view to stay within the memory budget")
+
     def save_action(self):
         if self.current_project and self.db.get_project_data(self.current_project):
             QMessageBox.information(self, "Save", f"Data for project '{self.current_project}' saved successfully!")
@@ -337,12 +510,48 @@ class DashboardWindow(QWidget):
             QMessageBox.information(self, "Refresh", "Refreshed dashboard view!")
 
     def settings_action(self):
-        QMessageBox.information(self, "Settings", "Settings functionality not implemented yet.")
+        menu = QMenu(self)
+        profiling = menu.addMenu("Profiling")
+        running = profiler.session is not None
+        profiling.addAction("Start cProfile (GUI and MQTT threads)",
+                            lambda: self.start_profile(profiler.CPROFILE, "dashboard")).setEnabled(not running)
+        profiling.addAction("Start sampling profiler (all threads)",
+                            lambda: self.start_profile(profiler.SAMPLING, "dashboard")).setEnabled(not running)
+        profiling.addAction("Stop and save profile", self.stop_profile).setEnabled(running)
+        seconds = settings.get("profile_feature_seconds")
+        profiling.addAction(f"Profile current feature for {seconds} s",
+                            self.profile_current_feature).setEnabled(not running and bool(self.current_feature))
+        menu.exec_(QCursor.pos())
+
+    def start_profile(self, mode, label, restrict=None):
+        success, message = profiler.start(mode, label, restrict)
+        if not success:
+            QMessageBox.warning(self, "Profiling", message)
+        return success
+
+    def stop_profile(self):
+        success, message, paths = profiler.stop()
+        if success:
+            QMessageBox.information(self, "Profiling", message + ":\n" + "\n".join(paths))
+        else:
+            QMessageBox.warning(self, "Profiling", message)
+
+    def profile_current_feature(self):
+        # The GUI thread runs the feature's timers, plotting and the frames handed to it
+        seconds = settings.get("profile_feature_seconds")
+        if self.start_profile(profiler.CPROFILE, self.current_feature, restrict="features"):
+            session = profiler.session
+            QTimer.singleShot(seconds * 1000, lambda: profiler.session is session and self.stop_profile())
 
     def closeEvent(self, event):
+        if profiler.session is not None:
+            profiler.stop()
         self.timer.stop()
-        if self.mqtt_handler:
-            self.mqtt_handler.stop()
+        self.stats_timer.stop()
+        self.coalescer.stop()
+        self.stop_live_data()
+        self.compute_pool.shutdown()
+        shutdown_process_pool()
         self.db.close_connection()
         event.accept()
 
@@ -7,6 +7,19 @@ import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+def compute_bode(token, frame_store, project_name, tag_name, metadata):
+    data = frame_store.tag_values(project_name, tag_name, 1)
+    if not data or token.cancelled:
+        return None
+    latest_values = data[-1]["values"]
+    fft_data = np.fft.fft(latest_values)
+    freqs = np.fft.fftfreq(len(latest_values), metadata.sample_spacing)
+    half = len(freqs) // 2
+    with np.errstate(divide='ignore'):
+        magnitude = 20 * np.log10(np.abs(fft_data))
+    phase = np.angle(fft_data, deg=True)
+    return {"count": len(latest_values), "freqs": freqs[:half], "magnitude": magnitude[:half], "phase": phase[:half]}
+
 class BodePlotFeature:
     def __init__(self, parent, db, project_name):
         self.parent = parent
@@ -85,30 +98,26 @@ class BodePlotFeature:
             self.feature_result.setText("No project or tag selected for Bode Plot.")
             return
 
-        data = self.db.get_tag_values(self.project_name, self.mqtt_tag)
-        if not data:
+        self.parent.compute_pool.submit(f"bode:{id(self)}", compute_bode, self.parent.frame_store,
+                                        self.project_name, self.mqtt_tag,
+                                        self.parent.metadata_store.get(self.project_name, self.mqtt_tag), on_result=self.apply_bode)
+
+    def apply_bode(self, result):
+        if result is None:
             self.feature_result.setText(f"No MQTT data received for {self.mqtt_tag} yet.")
             return
 
-        latest_values = data[-1]["values"]
-        fft_data = np.fft.fft(latest_values)
-        freqs = np.fft.fftfreq(len(latest_values), 0.01)
-        magnitude = 20 * np.log10(np.abs(fft_data))
-        phase = np.angle(fft_data, deg=True)
-
-        self.feature_result.setText(f"Bode Plot Data for {self.mqtt_tag}:\nLatest values count: {len(latest_values)}")
+        self.feature_result.setText(f"Bode Plot Data for {self.mqtt_tag}:\nLatest values count: {result['count']}")
 
         self.figure.clear()
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 6), sharex=True)
-        self.figure.add_subplot(ax1)
-        self.figure.add_subplot(ax2)
-        
-        ax1.semilogx(freqs[:len(freqs)//2], magnitude[:len(freqs)//2], 'b-')
+        ax1, ax2 = self.figure.subplots(2, 1, sharex=True)
+
+        ax1.semilogx(result["freqs"], result["magnitude"], 'b-')
         ax1.set_ylabel('Magnitude (dB)')
         ax1.set_title(f'Bode Plot for {self.mqtt_tag}')
         ax1.grid(True)
 
-        ax2.semilogx(freqs[:len(freqs)//2], phase[:len(freqs)//2], 'b-')
+        ax2.semilogx(result["freqs"], result["phase"], 'b-')
         ax2.set_xlabel('Frequency (Hz)')
         ax2.set_ylabel('Phase (degrees)')
         ax2.grid(True)
@@ -1,9 +1,114 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QLineEdit, QHeaderView,QInputDialog,QPushButton, QTableWidget, QTableWidgetItem, QMessageBox
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QHBoxLayout, QLineEdit, QHeaderView, QInputDialog, QPushButton,
+                             QMessageBox, QTableView, QAbstractItemView, QStyledItemDelegate, QFileDialog)
+from PyQt5.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex, QRect, QEvent, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter
+from tag_metadata import split_tag_string
+from tag_import import read_tag_file, import_tags, delete_tags
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+REFRESH_INTERVAL_MS = 250
+BUTTON_WIDTH = 60
+BUTTON_HEIGHT = 30
+BUTTON_SPACING = 5
+MAX_REPORTED_ERRORS = 20
+
+
+class TagBoardModel(QAbstractTableModel):
+    # Incoming values only mark their row dirty; flush() then tells the view about all
+    # changed VALUE cells in one dataChanged, and the view repaints just the visible ones
+    HEADERS = ["FULL TAG", "VALUE", "ACTIONS"]
+
+    def __init__(self):
+        super().__init__()
+        self.tags = []
+        self.rows = {}
+        self.values = {}
+        self.dirty = set()
+
+    def load(self, tags, values):
+        self.beginResetModel()
+        self.tags = list(tags)
+        self.rows = {tag_name: row for row, tag_name in enumerate(self.tags)}
+        self.values = dict(values)
+        self.dirty.clear()
+        self.endResetModel()
+
+    def set_value(self, tag_name, value):
+        row = self.rows.get(tag_name)
+        if row is None:
+            return
+        self.values[tag_name] = value
+        self.dirty.add(row)
+
+    def flush(self):
+        if not self.dirty:
+            return
+        first, last = min(self.dirty), max(self.dirty)
+        self.dirty.clear()
+        self.dataChanged.emit(self.index(first, 1), self.index(last, 1), [Qt.DisplayRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tags)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        tag_name = self.tags[index.row()]
+        if index.column() == 0:
+            return tag_name
+        if index.column() == 1:
+            return str(self.values.get(tag_name, "N/A"))
+        return None
+
+
+class TagActionsDelegate(QStyledItemDelegate):
+    # Paints the Edit/Delete buttons instead of creating two QPushButtons per row
+    edit_requested = pyqtSignal(int)  # Signal: row
+    delete_requested = pyqtSignal(int)  # Signal: row
+
+    BUTTONS = [("Edit", QColor("#3498db")), ("Delete", QColor("#e74c3c"))]
+
+    def button_rects(self, cell):
+        total = len(self.BUTTONS) * BUTTON_WIDTH + (len(self.BUTTONS) - 1) * BUTTON_SPACING
+        left = cell.x() + (cell.width() - total) // 2
+        top = cell.y() + (cell.height() - BUTTON_HEIGHT) // 2
+        return [QRect(left + i * (BUTTON_WIDTH + BUTTON_SPACING), top, BUTTON_WIDTH, BUTTON_HEIGHT)
+                for i in range(len(self.BUTTONS))]
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        for rect, (label, color) in zip(self.button_rects(option.rect), self.BUTTONS):
+            painter.setBrush(color)
+            painter.drawRoundedRect(rect, 5, 5)
+            painter.setPen(Qt.white)
+            painter.drawText(rect, Qt.AlignCenter, label)
+            painter.setPen(Qt.NoPen)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            rects = self.button_rects(option.rect)
+            if rects[0].contains(event.pos()):
+                self.edit_requested.emit(index.row())
+                return True
+            if rects[1].contains(event.pos()):
+                self.delete_requested.emit(index.row())
+                return True
+        return False
+
+
 class CreateTagsFeature:
     def __init__(self, parent, db, project_name):
         self.parent = parent
@@ -27,7 +132,7 @@ class CreateTagsFeature:
 
         add_tag_form = QHBoxLayout()
         self.tag_name_input = QLineEdit()
-        self.tag_name_input.setPlaceholderText("Enter full tag (e.g., sarayu/tag1/topic1|m/s)")
+        self.tag_name_input.setPlaceholderText("Enter full tag (e.g., sarayu/tag1/topic1|m/s|sample_rate=4096,scale=0.001,offset=-31463)")
         self.tag_name_input.setStyleSheet("background-color: #34495e; color: white; border: 1px solid #1a73e8; padding: 5px; height: 25px;")
 
         add_tag_btn = QPushButton("Add Tag")
@@ -37,73 +142,83 @@ class CreateTagsFeature:
         """)
         add_tag_btn.clicked.connect(self.add_tag)
 
+        import_btn = QPushButton("Import...")
+        import_btn.setStyleSheet("""
+            QPushButton { background-color: #1a73e8; color: white; border: none; padding: 5px; border-radius: 5px; height: 25px; }
+            QPushButton:hover { background-color: #1558b0; }
+        """)
+        import_btn.clicked.connect(self.import_tags)
+
+        delete_selected_btn = QPushButton("Delete Selected")
+        delete_selected_btn.setStyleSheet("""
+            QPushButton { background-color: #e74c3c; color: white; border: none; padding: 5px; border-radius: 5px; height: 25px; }
+            QPushButton:hover { background-color: #c0392b; }
+        """)
+        delete_selected_btn.clicked.connect(self.delete_selected_tags)
+
         add_tag_form.addWidget(self.tag_name_input)
         add_tag_form.addWidget(add_tag_btn)
+        add_tag_form.addWidget(import_btn)
+        add_tag_form.addWidget(delete_selected_btn)
         add_tag_form.addStretch()
         tags_layout.addLayout(add_tag_form)
 
-        self.tags_table = QTableWidget()
-        self.tags_table.setColumnCount(3)
-        self.tags_table.setHorizontalHeaderLabels(["FULL TAG", "VALUE", "ACTIONS"])
+        self.tags_model = TagBoardModel()
+        self.tags_table = QTableView()
+        self.tags_table.setModel(self.tags_model)
         self.tags_table.setStyleSheet("""
-            QTableWidget { background-color: #34495e; color: white; border: none; gridline-color: #2c3e50; }
-            QTableWidget::item { padding: 5px; border: none; }
+            QTableView { background-color: #34495e; color: white; border: none; gridline-color: #2c3e50; }
+            QTableView::item { padding: 5px; border: none; }
             QHeaderView::section { background-color: #1a73e8; color: white; border: none; padding: 10px; font-size: 14px; }
         """)
         self.tags_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.tags_table.verticalHeader().setVisible(False)
+        self.tags_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.tags_table.verticalHeader().setDefaultSectionSize(40)
+        self.tags_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.tags_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.actions_delegate = TagActionsDelegate(self.tags_table)
+        self.actions_delegate.edit_requested.connect(self.edit_tag)
+        self.actions_delegate.delete_requested.connect(self.delete_tag)
+        self.tags_table.setItemDelegateForColumn(2, self.actions_delegate)
         self.update_table()
         tags_layout.addWidget(self.tags_table)
 
         layout.addWidget(tags_widget)
 
+        # Live values are only pushed to the view once per tick, however many frames arrive
+        self.refresh_timer = QTimer(self.widget)
+        self.refresh_timer.timeout.connect(self.tags_model.flush)
+        self.refresh_timer.start(REFRESH_INTERVAL_MS)
+
     def update_table(self):
-        tags_data = list(self.db.tags_collection.find({"project_name": self.project_name}))
-        self.tags_table.setRowCount(len(tags_data))
-        for row, tag in enumerate(tags_data):
-            self.tags_table.setItem(row, 0, QTableWidgetItem(tag["tag_name"]))
-            latest_data = self.db.get_tag_values(self.project_name, tag["tag_name"])
-            value = latest_data[-1]["values"][-1] if latest_data else "N/A"
-            self.tags_table.setItem(row, 1, QTableWidgetItem(str(value)))
-
-            actions_widget = QWidget()
-            actions_layout = QHBoxLayout()
-            actions_widget.setLayout(actions_layout)
-            actions_layout.setContentsMargins(0, 0, 0, 0)
-            actions_layout.setSpacing(5)
-            actions_layout.setAlignment(Qt.AlignCenter)
-
-            edit_btn = QPushButton("Edit")
-            edit_btn.setFixedSize(60, 30)
-            edit_btn.setStyleSheet("""
-                QPushButton { background-color: #3498db; color: white; border: none; border-radius: 5px; padding: 5px; }
-                QPushButton:hover { background-color: #2980b9; }
-            """)
-            edit_btn.clicked.connect(lambda checked, r=row: self.edit_tag(r))
-
-            delete_btn = QPushButton("Delete")
-            delete_btn.setFixedSize(60, 30)
-            delete_btn.setStyleSheet("""
-                QPushButton { background-color: #e74c3c; color: white; border: none; border-radius: 5px; padding: 5px; }
-                QPushButton:hover { background-color: #c0392b; }
-            """)
-            delete_btn.clicked.connect(lambda checked, r=row: self.delete_tag(r))
-
-            actions_layout.addWidget(edit_btn)
-            actions_layout.addWidget(delete_btn)
-            self.tags_table.setCellWidget(row, 2, actions_widget)
+        # Full reload; only needed when tags are added, edited or deleted
+        tags_data = list(self.db.tags_collection.find({"project_name": self.project_name}, {"tag_name": 1}))
+        values = {}
+        for tag in tags_data:
+            latest_data = self.parent.frame_store.tag_values(self.project_name, tag["tag_name"])
+            if latest_data:
+                values[tag["tag_name"]] = latest_data[-1]["values"][-1]
+        self.tags_model.load([tag["tag_name"] for tag in tags_data], values)
 
     def add_tag(self):
         tag_string = self.tag_name_input.text().strip()
+        try:
+            tag_string, metadata = split_tag_string(tag_string)
+        except ValueError as e:
+            QMessageBox.warning(self.parent, "Error", str(e))
+            return
         tag_data = self.db.parse_tag_string(tag_string)
         if tag_data is None:
             return
 
         success, message = self.db.add_tag(self.project_name, tag_data)
         if success:
+            if metadata:
+                self.parent.metadata_store.set(self.project_name, tag_data["tag_name"], metadata)
             self.tag_name_input.clear()
             if self.parent.mqtt_handler:
-                self.parent.mqtt_handler.client.subscribe(tag_data["tag_name"])
+                self.parent.mqtt_handler.subscribe([tag_data["tag_name"]])
             self.update_table()
         else:
             QMessageBox.warning(self.parent, "Error", message)
@@ -114,16 +229,26 @@ class CreateTagsFeature:
             return
         tag = tags_data[row]
         old_tag_string = tag["tag_name"]
-        new_tag_string, ok = QInputDialog.getText(self.parent, "Edit Tag", "Enter new tag (e.g., sarayu/tag1/topic1|m/s):", text=old_tag_string)
+        metadata = self.parent.metadata_store.get(self.project_name, old_tag_string)
+        fields = ",".join(f"{key}={value}" for key, value in metadata.as_dict().items())
+        new_tag_string, ok = QInputDialog.getText(self.parent, "Edit Tag", "Enter new tag (e.g., sarayu/tag1/topic1|m/s|sample_rate=4096):",
+                                                  text=f"{old_tag_string}|{metadata.unit}|{fields}")
         if ok and new_tag_string:
+            try:
+                new_tag_string, new_metadata = split_tag_string(new_tag_string)
+            except ValueError as e:
+                QMessageBox.warning(self.parent, "Error", str(e))
+                return
             new_tag_data = self.db.parse_tag_string(new_tag_string)
             if new_tag_data is None:
                 return
             if self.parent.mqtt_handler:
-                self.parent.mqtt_handler.client.unsubscribe(tag["tag_name"])
-                self.parent.mqtt_handler.client.subscribe(new_tag_data["tag_name"])
+                self.parent.mqtt_handler.unsubscribe([tag["tag_name"]])
+                self.parent.mqtt_handler.subscribe([new_tag_data["tag_name"]])
             success, message = self.db.edit_tag(self.project_name, row, new_tag_data)
             if success:
+                self.parent.metadata_store.invalidate(self.project_name, old_tag_string)
+                self.parent.metadata_store.set(self.project_name, new_tag_data["tag_name"], new_metadata)
                 self.update_table()
             else:
                 QMessageBox.warning(self.parent, "Error", message)
@@ -135,15 +260,61 @@ class CreateTagsFeature:
             tags_data = list(self.db.tags_collection.find({"project_name": self.project_name}))
             tag = tags_data[row]
             if self.parent.mqtt_handler:
-                self.parent.mqtt_handler.client.unsubscribe(tag["tag_name"])
+                self.parent.mqtt_handler.unsubscribe([tag["tag_name"]])
             success, message = self.db.delete_tag(self.project_name, row)
             if success:
                 self.update_table()
             else:
                 QMessageBox.warning(self.parent, "Error", message)
 
+    def import_tags(self):
+        path, _ = QFileDialog.getOpenFileName(self.parent, "Import Tags", "", "Tag files (*.csv *.json);;All files (*)")
+        if not path:
+            return
+        try:
+            tag_strings = read_tag_file(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self.parent, "Error", f"Could not read {path}: {str(e)}")
+            return
+        success, message, added, errors = import_tags(self.db, self.project_name, tag_strings)
+        if added:
+            if self.parent.mqtt_handler:
+                self.parent.mqtt_handler.subscribe(added)
+            self.parent.metadata_store.invalidate(self.project_name)
+            self.update_table()
+        if errors:
+            details = "\n".join(f"{'line ' + str(line) if line else 'insert'}: {tag_string} ({reason})"
+                                for line, tag_string, reason in errors[:MAX_REPORTED_ERRORS])
+            if len(errors) > MAX_REPORTED_ERRORS:
+                details += f"\n... and {len(errors) - MAX_REPORTED_ERRORS} more"
+            message = f"{message}\n\n{details}"
+        if success:
+            QMessageBox.information(self.parent, "Import Tags", message)
+        else:
+            QMessageBox.warning(self.parent, "Import Tags", message)
+
+    def delete_selected_tags(self):
+        rows = sorted({index.row() for index in self.tags_table.selectionModel().selectedRows()})
+        if not rows:
+            QMessageBox.information(self.parent, "Delete Tags", "Select the tags to delete first.")
+            return
+        reply = QMessageBox.question(self.parent, "Confirm Delete", f"Are you sure you want to delete {len(rows)} tags?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        tag_names = [self.tags_model.tags[row] for row in rows]
+        if self.parent.mqtt_handler:
+            self.parent.mqtt_handler.unsubscribe(tag_names)
+        success, message = delete_tags(self.db, self.project_name, tag_names)
+        if success:
+            self.parent.metadata_store.invalidate(self.project_name)
+            self.update_table()
+        else:
+            QMessageBox.warning(self.parent, "Error", message)
+
     def on_data_received(self, tag_name, values):
-        self.update_table()
+        if len(values):
+            self.tags_model.set_value(tag_name, values[-1])
 
     def get_widget(self):
         return self.widget
\ No newline at end of file
@@ -1,12 +1,20 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QPushButton, QTextEdit,QMessageBox
 from PyQt5.QtCore import Qt, QTimer
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
+from features.plot_backend import create_plot_backend
 import numpy as np
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+def compute_fft(token, frame_store, project_name, tag_name, metadata):
+    data = frame_store.tag_values(project_name, tag_name, 1)
+    if not data or token.cancelled:
+        return None
+    latest_values = data[-1]["values"]
+    fft_data = np.abs(np.fft.rfft(latest_values))
+    freqs = np.fft.rfftfreq(len(latest_values), metadata.sample_spacing)
+    return {"latest_values": latest_values[-10:], "freqs": freqs, "magnitude": fft_data}
+
 class FFTViewFeature:
     def __init__(self, parent, db, project_name):
         self.parent = parent
@@ -16,8 +24,9 @@ class FFTViewFeature:
         self.mqtt_tag = None
         self.timer = QTimer(self.widget)
         self.timer.timeout.connect(self.update_plot)
-        self.figure = plt.Figure(figsize=(10, 6))
-        self.canvas = FigureCanvas(self.figure)
+        self.plot = create_plot_backend("FFT")
+        self.fft_line = None
+        self.metadata = None
         self.initUI()
 
     def initUI(self):
@@ -60,7 +69,7 @@ class FFTViewFeature:
         button_layout.addStretch()
         self.feature_layout.addLayout(button_layout)
 
-        self.feature_layout.addWidget(self.canvas)
+        self.feature_layout.addWidget(self.plot.widget)
 
         self.feature_result = QTextEdit()
         self.feature_result.setReadOnly(True)
@@ -76,6 +85,13 @@ class FFTViewFeature:
             QMessageBox.warning(self.parent, "Error", "No project or valid tag selected for FFT plotting!")
             return
         self.mqtt_tag = tag_name
+        self.plot.reset()
+        self.fft_line = self.plot.line("fft", 'b')
+        self.metadata = self.parent.metadata_store.get(self.project_name, self.mqtt_tag)
+        self.plot.set_labels('Frequency (Hz)', f'Magnitude ({self.metadata.unit})' if self.metadata.unit else 'Magnitude')
+        self.plot.set_title(f'FFT for {self.mqtt_tag}')
+        self.plot.set_xlim(0, self.metadata.sample_rate / 2)
+        self.plot.grid()
         self.timer.stop()
         self.timer.setInterval(1000)
         self.timer.start()
@@ -85,25 +101,18 @@ class FFTViewFeature:
             self.feature_result.setText("No project or tag selected for FFT plotting.")
             return
 
-        data = self.db.get_tag_values(self.project_name, self.mqtt_tag)
-        if not data:
+        self.parent.compute_pool.submit(f"fft:{id(self)}", compute_fft, self.parent.frame_store,
+                                        self.project_name, self.mqtt_tag, self.metadata, on_result=self.apply_fft)
+
+    def apply_fft(self, result):
+        if result is None:
             self.feature_result.setText(f"No MQTT data received for {self.mqtt_tag} yet.")
             return
 
-        latest_values = data[-1]["values"]
-        self.feature_result.setText(f"FFT Data for {self.mqtt_tag}:\nLatest 10 values: {latest_values[-10:]}")
-
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        fft_data = np.abs(np.fft.fft(latest_values))[:512]
-        freqs = np.fft.fftfreq(1024, 0.01)[:512]
-        ax.plot(freqs, fft_data, 'b-')
-        ax.set_xlabel('Frequency (Hz)')
-        ax.set_ylabel('Magnitude')
-        ax.set_title(f'FFT for {self.mqtt_tag}')
-        ax.set_xlim(0, 50)
-        ax.grid(True)
-        self.canvas.draw()
+        self.feature_result.setText(f"FFT Data for {self.mqtt_tag}:\nLatest 10 values: {result['latest_values']}")
+        self.fft_line.set_data(result["freqs"], result["magnitude"])
+        self.plot.autoscale(x=False, y=True)
+        self.plot.draw()
 
     def on_data_received(self, tag_name, values):
         if tag_name == self.mqtt_tag:
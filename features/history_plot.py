@@ -1,11 +1,74 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QPushButton, QTextEdit,QMessageBox
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QPushButton, QTextEdit, QMessageBox, QCheckBox
 from PyQt5.QtCore import Qt, QTimer
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, NavigationToolbar2QT
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import numpy as np
+from frame_reduce import decimate, find_gaps, metrics_fill
+from memory_budget import figure_nbytes
+from timeutil import now_ns, to_ns, to_datetime64, format_ns, LOCAL_TZ, NS_PER_SECOND, NS_PER_HOUR
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+MAX_RAW_SAMPLES = 500000  # Above this many samples in a fetch, use min/max rollups instead
+SUMMARY_SPAN_NS = 7 * 24 * NS_PER_HOUR  # Fetches longer than this read the hourly summaries
+INITIAL_SPAN_NS = NS_PER_HOUR
+DEBOUNCE_MS = 250
+ZOOM_FACTOR = 1.5
+
+
+def fetch_history(token, frame_store, summary_store, metrics_store, project_name, tag_name, start, end, points,
+                  metadata):
+    # Picks the cheapest source that still gives about `points` points over [start, end]:
+    # raw samples when zoomed in, per-frame min/max rolled up by the database in between,
+    # and the hourly summaries for months of history. Where the raw and per-frame tiers
+    # have no frames (triggered capture mode stores them only around events), the gaps are
+    # filled from the per-frame min/max metrics.
+    span = end - start
+    frame_ns = int(metadata.frame_length * NS_PER_SECOND / metadata.sample_rate)
+    if span * metadata.sample_rate / NS_PER_SECOND <= MAX_RAW_SAMPLES:
+        frame_times, times, values = [], [], []
+        for timestamp, frame in frame_store.read_frames(project_name, tag_name, start - frame_ns, end):
+            if token.cancelled:
+                return None
+            frame_times.append(timestamp)
+            times.append(timestamp + (metadata.frame_times(len(frame)) * NS_PER_SECOND).astype(np.int64))
+            values.append(frame)
+        times = np.concatenate(times) if times else np.empty(0, dtype=np.int64)
+        values = np.concatenate(values) if values else np.empty(0)
+        keep = (times >= start) & (times <= end)
+        times, values = times[keep], values[keep]
+        full = len(values) <= 2 * points
+        times, values = decimate(times, values, 2 * points)
+        resolution = int(NS_PER_SECOND / metadata.sample_rate) if full else span // points
+        result = {"tier": "raw", "start": start, "end": end, "resolution": resolution, "full": full,
+                  "last": int(times[-1]) if len(times) else start, "times": times, "values": values}
+        frame_times = np.array(frame_times, dtype=np.int64) + frame_ns // 2
+        return with_metrics_fill(result, metrics_store, project_name, tag_name, frame_times,
+                                 max(span // points, frame_ns))
+    if span <= SUMMARY_SPAN_NS:
+        bucket = max(span // points, frame_ns)
+        times, mins, maxs = frame_store.envelope_buckets(project_name, tag_name, start, end, bucket)
+        result = {"tier": "frames", "start": start, "end": end, "resolution": bucket, "full": False,
+                  "last": int(times[-1]) if len(times) else start, "times": times, "mins": mins, "maxs": maxs}
+        return with_metrics_fill(result, metrics_store, project_name, tag_name, times + bucket // 2, bucket)
+    # Hourly summaries are kept for every frame, stored raw or not
+    times, mins, maxs = summary_store.window_envelope(project_name, tag_name, start, end)
+    return {"tier": "hourly", "start": start, "end": end, "resolution": NS_PER_HOUR, "full": False,
+            "last": int(times[-1]) if len(times) else start, "times": times, "mins": mins, "maxs": maxs, "gaps": []}
+
+
+def with_metrics_fill(result, metrics_store, project_name, tag_name, centres, bucket):
+    # Marks the stretches without frames, up to now, and adds the metrics' min/max there as
+    # fill_times/fill_mins/fill_maxs, bucket starts on a grid of `bucket`
+    result["gaps"] = find_gaps(centres, bucket, result["start"], min(result["end"], now_ns()))
+    result["fill_resolution"] = bucket
+    result["fill_times"], result["fill_mins"], result["fill_maxs"] = metrics_fill(
+        metrics_store, project_name, tag_name, result["gaps"], result["start"], bucket)
+    return result
+
+
 class HistoryPlotFeature:
     def __init__(self, parent, db, project_name):
         self.parent = parent
@@ -13,10 +76,20 @@ class HistoryPlotFeature:
         self.project_name = project_name
         self.widget = QWidget()
         self.mqtt_tag = None
-        self.timer = QTimer(self.widget)
-        self.timer.timeout.connect(self.update_plot)
+        self.metadata = None
+        self.loaded = None
+        self.fill = None
+        self.gap_artists = []
+        self.ax = None
+        self.line = None
+        # Zoom and pan fire many xlim changes; only the last one in DEBOUNCE_MS fetches
+        self.debounce = QTimer(self.widget)
+        self.debounce.setSingleShot(True)
+        self.debounce.timeout.connect(self.request_view)
         self.figure = plt.Figure(figsize=(10, 6))
         self.canvas = FigureCanvas(self.figure)
+        self.canvas.mpl_connect("scroll_event", self.on_scroll)
+        self.canvas.mpl_connect("button_release_event", self.on_release)
         self.initUI()
 
     def initUI(self):
@@ -55,16 +128,25 @@ class HistoryPlotFeature:
             QPushButton:hover { background-color: #e67e22; }
         """)
         mqtt_btn.clicked.connect(self.start_history_plotting)
+        self.follow_check = QCheckBox("Follow live data")
+        self.follow_check.setChecked(True)
+        self.follow_check.toggled.connect(self.on_follow_toggled)
+        self.follow_check.setStyleSheet("color: white; font-size: 14px;")
         button_layout.addWidget(mqtt_btn)
+        button_layout.addWidget(self.follow_check)
         button_layout.addStretch()
         self.feature_layout.addLayout(button_layout)
 
+        self.toolbar = NavigationToolbar2QT(self.canvas, self.widget)
+        self.feature_layout.addWidget(self.toolbar)
         self.feature_layout.addWidget(self.canvas)
 
         self.feature_result = QTextEdit()
         self.feature_result.setReadOnly(True)
+        self.feature_result.setMaximumHeight(90)
         self.feature_result.setStyleSheet("background-color: #34495e; color: white; border-radius: 5px; padding: 10px;")
-        self.feature_result.setText(f"History Plot data for {self.project_name}: Select a tag to begin.")
+        self.feature_result.setText(f"History Plot data for {self.project_name}: Select a tag to begin. "
+                                    "Zoom with the mouse wheel or the toolbar; drag to pan.")
         self.feature_layout.addWidget(self.feature_result)
 
         layout.addWidget(self.feature_widget)
@@ -75,37 +157,225 @@ class HistoryPlotFeature:
             QMessageBox.warning(self.parent, "Error", "No project or valid tag selected for History Plot!")
             return
         self.mqtt_tag = tag_name
-        self.timer.stop()
-        self.timer.setInterval(1000)
-        self.timer.start()
+        self.metadata = self.parent.metadata_store.get(self.project_name, tag_name)
+        self.loaded = None
+        self.figure.clear()
+        self.ax = self.figure.add_subplot(111)
+        self.line, = self.ax.plot([], [], 'b-', linewidth=0.8)
+        self.fill = None
+        self.gap_artists = []
+        self.ax.xaxis_date(LOCAL_TZ)
+        self.ax.set_xlabel('Timestamp')
+        self.ax.set_ylabel(f"Value ({self.metadata.unit})" if self.metadata.unit else "Value")
+        self.ax.set_title(f'History Plot for {self.mqtt_tag}')
+        self.ax.grid(True)
+        self.ax.tick_params(axis='x', rotation=45)
+        end = now_ns()
+        self.set_view(end - INITIAL_SPAN_NS, end)
+        self.ax.callbacks.connect("xlim_changed", self.on_xlim_changed)
+        self.request_view()
+
+    def view_range(self):
+        low, high = self.ax.get_xlim()
+        return to_ns(mdates.num2date(low)), to_ns(mdates.num2date(high))
+
+    def set_view(self, start, end):
+        self.ax.set_xlim(mdates.date2num(to_datetime64([start, end])))
+
+    def view_points(self):
+        return max(self.canvas.width(), 200)
+
+    def on_xlim_changed(self, ax):
+        self.debounce.start(DEBOUNCE_MS)
+
+    def on_scroll(self, event):
+        if self.ax is None or event.inaxes is not self.ax or event.xdata is None:
+            return
+        start, end = self.view_range()
+        center = to_ns(mdates.num2date(event.xdata))
+        factor = 1 / ZOOM_FACTOR if event.button == "up" else ZOOM_FACTOR
+        self.follow_check.setChecked(False)
+        self.set_view(center - int((center - start) * factor), center + int((end - center) * factor))
+        self.canvas.draw_idle()
+
+    def on_release(self, event):
+        # A toolbar pan or zoom means the user wants to look elsewhere than the live edge
+        if self.toolbar.mode:
+            self.follow_check.setChecked(False)
+
+    def covers(self, start, end):
+        # The loaded data can serve this view as is: same range, and neither too coarse nor
+        # far more detailed than the screen can show
+        if self.loaded is None:
+            return False
+        desired = (end - start) / self.view_points()
+        resolution = self.loaded["resolution"]
+        return (self.loaded["start"] <= start and end <= self.loaded["end"] and resolution <= 2 * desired
+                and (resolution >= desired / 4 or self.loaded["full"]))
 
-    def update_plot(self):
-        if not self.project_name or not self.mqtt_tag:
-            self.feature_result.setText("No project or tag selected for History Plot.")
+    def request_view(self):
+        if not self.mqtt_tag or self.ax is None:
             return
+        start, end = self.view_range()
+        if self.covers(start, end):
+            return
+        # Fetch one view width either side as well, so panning shows data straight away
+        span = end - start
+        self.feature_result.setText(f"Loading {format_ns(start)} to {format_ns(end)}...")
+        self.parent.compute_pool.submit(f"history:{id(self)}", fetch_history, self.parent.frame_store,
+                                        self.parent.summary_store, self.parent.metrics_store, self.project_name,
+                                        self.mqtt_tag, start - span, end + span, 3 * self.view_points(), self.metadata,
+                                        on_result=self.apply_history,
+                                        on_error=lambda message: self.feature_result.setText(f"Error: {message}"))
 
-        data = self.db.get_tag_values(self.project_name, self.mqtt_tag)
-        if not data:
-            self.feature_result.setText(f"No data available for {self.mqtt_tag} yet.")
+    def apply_history(self, result):
+        if result is None:
             return
+        self.loaded = result
+        self.redraw()
 
-        timestamps = [entry["timestamp"] for entry in data]
-        values = [val for entry in data for val in entry["values"]]
-        self.feature_result.setText(f"History Plot Data for {self.mqtt_tag}:\nTotal values: {len(values)}")
+    def redraw(self):
+        result = self.loaded
+        x = mdates.date2num(to_datetime64(result["times"])) if len(result["times"]) else []
+        if self.fill is not None:
+            self.fill.remove()
+            self.fill = None
+        for artist in self.gap_artists:
+            artist.remove()
+        self.gap_artists = []
+        if result["tier"] == "raw":
+            self.line.set_data(x, result["values"])
+            low, high = (result["values"].min(), result["values"].max()) if len(result["values"]) else (np.inf, -np.inf)
+        else:
+            self.line.set_data(x, (result["mins"] + result["maxs"]) / 2)
+            self.fill = self.ax.fill_between(x, result["mins"], result["maxs"], color='b', alpha=0.3, linewidth=0)
+            low, high = (result["mins"].min(), result["maxs"].max()) if len(result["times"]) else (np.inf, -np.inf)
+        for gap_start, gap_end in result["gaps"]:
+            self.gap_artists.append(self.ax.axvspan(*mdates.date2num(to_datetime64([gap_start, gap_end])),
+                                                    color='grey', alpha=0.2, linewidth=0))
+        if len(result.get("fill_times", ())):
+            # Metrics stand in where frames were not stored; each covers its bucket, and the
+            # NaN after each one keeps buckets that are not adjacent from being joined
+            bucket_ends = result["fill_times"] + result["fill_resolution"]
+            fill_x = mdates.date2num(to_datetime64(np.column_stack([result["fill_times"], bucket_ends,
+                                                                    bucket_ends]).ravel()))
+            nan = np.full(len(bucket_ends), np.nan)
+            fill_low = np.column_stack([result["fill_mins"], result["fill_mins"], nan]).ravel()
+            fill_high = np.column_stack([result["fill_maxs"], result["fill_maxs"], nan]).ravel()
+            self.gap_artists.append(self.ax.fill_between(fill_x, fill_low, fill_high, color='orange', alpha=0.4,
+                                                         linewidth=0))
+            low, high = min(low, result["fill_mins"].min()), max(high, result["fill_maxs"].max())
+        if not np.isfinite(low):
+            low, high = 0, 1
+        pad = (high - low) * 0.05 or 1
+        self.ax.set_ylim(low - pad, high + pad)
+        self.canvas.draw_idle()
+        tier = {"raw": "raw samples" if result["full"] else "decimated samples",
+                "frames": "per-frame min/max", "hourly": "hourly min/max"}[result["tier"]]
+        text = (f"History Plot Data for {self.mqtt_tag}: {len(result['times'])} points "
+                f"({tier}, {result['resolution'] / NS_PER_SECOND:.3g} s resolution)\n"
+                f"Loaded {format_ns(result['start'])} to {format_ns(result['end'])}")
+        if result["gaps"]:
+            text += f"; {len(result['gaps'])} gaps without frames (shaded)"
+            if len(result.get("fill_times", ())):
+                text += f", {len(result['fill_times'])} buckets drawn from min/max metrics (orange)"
+        self.feature_result.setText(text)
 
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        ax.plot(timestamps, values[:len(timestamps)], 'b-')
-        ax.set_xlabel('Timestamp')
-        ax.set_ylabel('Value (m/s)')
-        ax.set_title(f'History Plot for {self.mqtt_tag}')
-        ax.grid(True)
-        ax.tick_params(axis='x', rotation=45)
-        self.canvas.draw()
-
-    def on_data_received(self, tag_name, values):
-        if tag_name == self.mqtt_tag:
-            self.update_plot()
+    def on_frames_received(self, tag_name, frames):
+        # New frames extend the loaded data at its own resolution while following: raw
+        # samples are decimated to the loaded density, and rollup tiers fold frames into
+        # their newest bucket. Data more than a view width behind the view is dropped.
+        # When not following, frames are ignored; turning follow back on refetches.
+        if tag_name != self.mqtt_tag or self.loaded is None or not self.follow_check.isChecked():
+            return
+        result = self.loaded
+        for timestamp, values in frames:
+            values = np.asarray(values, dtype=np.float64)
+            if not len(values) or timestamp <= result["last"]:
+                continue
+            result["last"] = timestamp
+            if result["tier"] == "raw":
+                self.append_samples(result, timestamp, values)
+            else:
+                self.append_bucket(result, timestamp, values)
+            result["end"] = max(result["end"], timestamp + int(len(values) * NS_PER_SECOND / self.metadata.sample_rate))
+        start, end = self.view_range()
+        span = end - start
+        self.set_view(result["end"] - span, result["end"])
+        self.trim_loaded(result["end"] - 2 * span)
+        self.redraw()
+
+    def append_samples(self, result, timestamp, values):
+        times = timestamp + (self.metadata.frame_times(len(values)) * NS_PER_SECOND).astype(np.int64)
+        if not result["full"]:
+            frame_span = int(len(values) * NS_PER_SECOND / self.metadata.sample_rate)
+            times, values = decimate(times, values, max(2 * frame_span // max(result["resolution"], 1), 2))
+        result["times"] = np.concatenate((result["times"], times))
+        result["values"] = np.concatenate((result["values"], values))
+
+    def append_bucket(self, result, timestamp, values):
+        resolution = result["resolution"]
+        if result["tier"] == "hourly":
+            bucket = self.parent.summary_store.window_key(timestamp)
+        else:
+            origin = int(result["times"][-1]) if len(result["times"]) else result["start"]
+            bucket = origin + (timestamp - origin) // resolution * resolution
+        if len(result["times"]) and bucket == result["times"][-1]:
+            result["mins"][-1] = min(result["mins"][-1], values.min())
+            result["maxs"][-1] = max(result["maxs"][-1], values.max())
+            return
+        result["times"] = np.append(result["times"], bucket)
+        result["mins"] = np.append(result["mins"], values.min())
+        result["maxs"] = np.append(result["maxs"], values.max())
+
+    def trim_loaded(self, start):
+        result = self.loaded
+        if start <= result["start"]:
+            return
+        keep = result["times"] >= start
+        for key in ("times", "values", "mins", "maxs"):
+            if key in result:
+                result[key] = result[key][keep]
+        self.trim_gaps(result, start, result["end"])
+        result["start"] = start
+
+    def on_follow_toggled(self, checked):
+        # Frames that arrived while not following were not kept; fetch the live edge again
+        if checked and self.ax is not None:
+            start, end = self.view_range()
+            now = now_ns()
+            self.loaded = None
+            self.set_view(now - (end - start), now)
+            self.debounce.stop()
+            self.request_view()
+
+    def memory_usage(self):
+        total = figure_nbytes(self.figure)
+        if self.loaded is not None:
+            total += sum(value.nbytes for value in self.loaded.values() if isinstance(value, np.ndarray))
+        return total
+
+    def release_memory(self):
+        # Over the memory budget: drop the data fetched either side of the view
+        if self.loaded is None or self.ax is None:
+            return
+        start, end = self.view_range()
+        result = self.loaded
+        keep = (result["times"] >= start) & (result["times"] <= end)
+        for key in ("times", "values", "mins", "maxs"):
+            if key in result:
+                result[key] = result[key][keep].copy()
+        self.trim_gaps(result, start, end)
+        result["start"], result["end"] = max(result["start"], start), min(result["end"], end)
+
+    def trim_gaps(self, result, start, end):
+        # Gaps and their metrics fill are cut to [start, end] along with the data
+        result["gaps"] = [(max(gap_start, start), min(gap_end, end)) for gap_start, gap_end in result["gaps"]
+                          if gap_end >= start and gap_start <= end]
+        if "fill_times" in result:
+            keep = (result["fill_times"] + result["fill_resolution"] >= start) & (result["fill_times"] <= end)
+            for key in ("fill_times", "fill_mins", "fill_maxs"):
+                result[key] = result[key][keep].copy()
 
     def get_widget(self):
-        return self.widget
\ No newline at end of file
+        return self.widget
@@ -1,12 +1,15 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QPushButton, QTextEdit,QMessageBox
 from PyQt5.QtCore import Qt, QTimer
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
+from features.plot_backend import create_plot_backend
+from metrics import METRIC_NAMES, METRIC_LABELS, MetricSeries
+from timeutil import to_seconds, format_ns, NS_PER_HOUR
 import numpy as np
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+TREND_SPAN_NS = 24 * NS_PER_HOUR  # Time shown; only new points are read on each tick
+
 class MultiTrendFeature:
     def __init__(self, parent, db, project_name):
         self.parent = parent
@@ -16,8 +19,9 @@ class MultiTrendFeature:
         self.selected_tags = []
         self.timer = QTimer(self.widget)
         self.timer.timeout.connect(self.update_plot)
-        self.figure = plt.Figure(figsize=(10, 6))
-        self.canvas = FigureCanvas(self.figure)
+        self.plot = create_plot_backend("Multiple Trend View", time_axis=True)
+        self.trend_lines = {}
+        self.series = {}
         self.initUI()
 
     def initUI(self):
@@ -52,9 +56,18 @@ class MultiTrendFeature:
         """)
         add_btn.clicked.connect(self.add_tag)
 
+        metric_label = QLabel("Metric:")
+        metric_label.setStyleSheet("color: white; font-size: 14px;")
+        self.metric_combo = QComboBox()
+        for name in METRIC_NAMES:
+            self.metric_combo.addItem(METRIC_LABELS[name], name)
+        self.metric_combo.setStyleSheet("background-color: #34495e; color: white; border: 1px solid #1a73e8; padding: 5px;")
+
         tag_layout.addWidget(tag_label)
         tag_layout.addWidget(self.tag_combo)
         tag_layout.addWidget(add_btn)
+        tag_layout.addWidget(metric_label)
+        tag_layout.addWidget(self.metric_combo)
         tag_layout.addStretch()
         self.feature_layout.addLayout(tag_layout)
 
@@ -69,7 +82,7 @@ class MultiTrendFeature:
         button_layout.addStretch()
         self.feature_layout.addLayout(button_layout)
 
-        self.feature_layout.addWidget(self.canvas)
+        self.feature_layout.addWidget(self.plot.widget)
 
         self.feature_result = QTextEdit()
         self.feature_result.setReadOnly(True)
@@ -89,6 +102,14 @@ class MultiTrendFeature:
         if not self.project_name or not self.selected_tags:
             QMessageBox.warning(self.parent, "Error", "No project or tags selected for Multiple Trend plotting!")
             return
+        self.plot.reset()
+        colors = ['b', 'r', 'g', 'y', 'm', 'c']
+        self.trend_lines = {tag: self.plot.line(tag, colors[i % len(colors)], label=tag)
+                            for i, tag in enumerate(self.selected_tags)}
+        self.plot.set_labels('Timestamp', self.metric_combo.currentText())
+        self.plot.set_title('Multiple Trend View')
+        self.plot.legend()
+        self.plot.grid()
         self.timer.stop()
         self.timer.setInterval(1000)
         self.timer.start()
@@ -98,29 +119,26 @@ class MultiTrendFeature:
             self.feature_result.setText("No project or tags selected for Multiple Trend plotting.")
             return
 
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        for tag in self.selected_tags:
-            data = self.db.get_tag_values(self.project_name, tag)
-            if data:
-                timestamps = [entry["timestamp"] for entry in data]
-                values = [entry["values"][-1] for entry in data]
-                ax.plot(timestamps, values, label=tag)
-                self.feature_result.setText(f"Multiple Trend Data:\nLatest {tag}: {values[-1]} at {timestamps[-1]}")
+        metric = self.metric_combo.currentData()
+        self.plot.set_labels('Timestamp', METRIC_LABELS[metric])
+        for tag, line in self.trend_lines.items():
+            series = self.series.get(tag)
+            if series is None or series.metric != metric:
+                series = self.series[tag] = MetricSeries(self.parent.metrics_store, self.project_name, tag, metric,
+                                                         TREND_SPAN_NS)
+            timestamps, values = series.refresh()
+            if len(timestamps):
+                line.set_data(to_seconds(timestamps), values)
+                self.feature_result.setText(f"Multiple Trend Data:\nLatest {tag} {METRIC_LABELS[metric]}: "
+                                            f"{values[-1]:.3f} at {format_ns(timestamps[-1])}")
             else:
                 self.feature_result.setText(f"No MQTT data received for {tag} yet.")
-        
-        ax.set_xlabel('Timestamp')
-        ax.set_ylabel('Value (m/s)')
-        ax.set_title('Multiple Trend View')
-        ax.legend()
-        ax.grid(True)
-        ax.tick_params(axis='x', rotation=45)
-        self.canvas.draw()
+
+        self.plot.autoscale()
+        self.plot.draw()
 
     def on_data_received(self, tag_name, values):
-        if tag_name in self.selected_tags:
-            self.update_plot()
+        pass  # The timer polls the metric store once a second
 
     def get_widget(self):
         return self.widget
\ No newline at end of file
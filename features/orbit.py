@@ -2,10 +2,13 @@ from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox
 from PyQt5.QtCore import Qt, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import matplotlib.pyplot as plt
+from timeutil import NS_PER_SECOND
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+ALIGN_FRAMES = 5
+
 class OrbitFeature:
     def __init__(self, parent, db, project_name):
         self.parent = parent
@@ -84,26 +87,40 @@ class OrbitFeature:
             self.feature_result.setText("No project selected for Orbit plotting.")
             return
 
-        x_data = self.db.get_tag_values(self.project_name, "tag2")
-        y_data = self.db.get_tag_values(self.project_name, "tag3")
-        if x_data and y_data:
-            x_values = x_data[-1]["values"]
-            y_values = y_data[-1]["values"]
-            self.feature_result.setText(f"Orbit Data:\nX (tag2): {x_values[-10:]}\nY (tag3): {y_values[-10:]}")
+        x_frames = self.parent.frame_store.latest_frames(self.project_name, "tag2", ALIGN_FRAMES)
+        y_frames = self.parent.frame_store.latest_frames(self.project_name, "tag3", ALIGN_FRAMES)
+        pair = self.align_frames(x_frames, y_frames)
+        if pair:
+            x_values, y_values = pair
+            self.feature_result.setText(f"Orbit Data:\nX (tag2): {x_values[-10:].tolist()}\nY (tag3): {y_values[-10:].tolist()}")
 
             self.figure.clear()
             ax = self.figure.add_subplot(111)
             ax.plot(x_values, y_values, 'b-')
-            ax.set_xlabel('X Value (m/s)')
-            ax.set_ylabel('Y Value (m/s)')
+            x_meta = self.parent.metadata_store.get(self.project_name, "tag2")
+            y_meta = self.parent.metadata_store.get(self.project_name, "tag3")
+            ax.set_xlabel(f'X Value ({x_meta.unit})' if x_meta.unit else 'X Value')
+            ax.set_ylabel(f'Y Value ({y_meta.unit})' if y_meta.unit else 'Y Value')
             ax.set_title('Orbit Plot')
-            ax.set_xlim(16390, 46537)
-            ax.set_ylim(16390, 46537)
+            ax.set_xlim(*x_meta.value_range())
+            ax.set_ylim(*y_meta.value_range())
             ax.grid(True)
             ax.set_aspect('equal')
             self.canvas.draw()
         else:
-            self.feature_result.setText("Orbit requires data from tag2 and tag3.")
+            self.feature_result.setText("Orbit requires time-aligned frames from tag2 and tag3.")
+
+    def align_frames(self, x_frames, y_frames):
+        # Pair the newest X and Y frames whose source times agree to within half a frame,
+        # so the orbit is drawn from simultaneous samples rather than the latest of each
+        sample_rate = self.parent.metadata_store.get(self.project_name, "tag2").sample_rate
+        for x_time, x_values in reversed(x_frames):
+            tolerance = NS_PER_SECOND * len(x_values) / sample_rate / 2
+            for y_time, y_values in reversed(y_frames):
+                if abs(int(x_time) - int(y_time)) <= tolerance:
+                    length = min(len(x_values), len(y_values))
+                    return x_values[:length], y_values[:length]
+        return None
 
     def on_data_received(self, tag_name, values):
         if tag_name in ["tag2", "tag3"]:
@@ -0,0 +1,149 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from itertools import islice
+from frame_reduce import find_gaps
+from timeutil import to_ns, to_ns_array, to_datetime, NS_PER_SECOND, NS_PER_HOUR
+import os
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ENVELOPE_CHUNK = 10000
+
+
+def describe_gaps(gaps, decoded, hourly):
+    notes = []
+    if gaps:
+        total = sum(gap_end - gap_start for gap_start, gap_end in gaps) / NS_PER_SECOND
+        duration = f"{total / 3600:.2f} h" if total >= 3600 else f"{total:.0f} s"
+        notes.append(f"{len(gaps)} gaps without frames (shaded), {duration} in total")
+    if hourly is not None:
+        notes.append(f"{len(hourly[0])} hours inside gaps drawn from hourly summaries (orange)")
+    if decoded:
+        notes.append(f"{decoded} frames without stored min/max were decoded")
+    return "; ".join(notes)
+
+
+class TimeReportPdfExporter(QThread):
+    progress = pyqtSignal(int, int, str)  # Signal: pages done, total pages, tag_name
+    export_finished = pyqtSignal(str)  # Signal: output path
+    export_failed = pyqtSignal(str)  # Signal: error message
+    export_cancelled = pyqtSignal()
+
+    def __init__(self, frame_store, project_name, tags, from_dt, to_dt, path, bins=2000, summary_store=None):
+        super().__init__()
+        self.frame_store = frame_store
+        self.summary_store = summary_store
+        self.project_name = project_name
+        self.tags = list(tags)
+        self.from_dt = from_dt
+        self.to_dt = to_dt
+        self.path = path
+        self.bins = bins
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def decimate(self, tag_name):
+        # Fixed number of min/max bins over the requested range keeps memory flat no matter
+        # how many frames the range holds. The database rolls up frames that carry min/max;
+        # frames stored without them are decoded here.
+        start, end = to_ns(self.from_dt), to_ns(self.to_dt)
+        bucket = max((end - start) // self.bins, 1)
+        bins = (end - start) // bucket + 1
+        mins = np.full(bins, np.inf)
+        maxs = np.full(bins, -np.inf)
+        frames = self.frame_store.count_frames(self.project_name, tag_name, start, end)
+        times, bucket_mins, bucket_maxs = self.frame_store.envelope_buckets(self.project_name, tag_name, start, end,
+                                                                            bucket)
+        index = (times - start) // bucket
+        mins[index], maxs[index] = bucket_mins, bucket_maxs
+        decoded = 0
+        envelope = self.frame_store.decode_envelope(self.project_name, tag_name, start, end)
+        while True:
+            chunk = list(islice(envelope, ENVELOPE_CHUNK))
+            if not chunk or self.cancelled:
+                break
+            timestamps, chunk_mins, chunk_maxs = (np.asarray(column) for column in zip(*chunk))
+            index = np.clip((to_ns_array(timestamps) - start) // bucket, 0, bins - 1)
+            np.minimum.at(mins, index, chunk_mins.astype(np.float64))
+            np.maximum.at(maxs, index, chunk_maxs.astype(np.float64))
+            decoded += len(chunk)
+        if self.cancelled:
+            return None
+        filled = np.isfinite(mins)
+        centres = start + np.arange(bins) * bucket + bucket // 2
+        gaps = find_gaps(centres[filled], bucket, start, end)
+        return {"times": centres[filled], "mins": mins[filled], "maxs": maxs[filled], "frames": frames,
+                "decoded": decoded, "gaps": gaps, "hourly": self.summary_fill(tag_name, start, end, gaps)}
+
+    def summary_fill(self, tag_name, start, end, gaps):
+        # Hourly summary windows that fall inside gaps in the frames (pruned or never
+        # stored raw); drawn separately so the page still shows the range of the data
+        if self.summary_store is None or not gaps:
+            return None
+        windows, mins, maxs = self.summary_store.window_envelope(self.project_name, tag_name, start, end)
+        centres = windows + NS_PER_HOUR // 2
+        inside = np.zeros(len(windows), dtype=bool)
+        for gap_start, gap_end in gaps:
+            inside |= (centres >= gap_start) & (centres <= gap_end)
+        if not inside.any():
+            return None
+        return windows[inside], mins[inside], maxs[inside]
+
+    def run(self):
+        figure = Figure(figsize=(11.69, 8.27))
+        FigureCanvasAgg(figure)
+        try:
+            with PdfPages(self.path) as pdf:
+                for page, tag_name in enumerate(self.tags):
+                    if self.cancelled:
+                        break
+                    result = self.decimate(tag_name)
+                    if self.cancelled:
+                        break
+                    figure.clear()
+                    ax = figure.add_subplot(111)
+                    if len(result["times"]):
+                        times = [to_datetime(t) for t in result["times"]]
+                        ax.fill_between(times, result["mins"], result["maxs"], color='b', alpha=0.4, linewidth=0)
+                        ax.plot(times, (result["mins"] + result["maxs"]) / 2, 'b-', linewidth=0.8)
+                    if result["hourly"] is not None:
+                        windows, hourly_mins, hourly_maxs = result["hourly"]
+                        for window, low, high in zip(windows, hourly_mins, hourly_maxs):
+                            ax.fill_between([to_datetime(window), to_datetime(window + NS_PER_HOUR)], low, high,
+                                            color='orange', alpha=0.4, linewidth=0)
+                    elif not len(result["times"]):
+                        ax.text(0.5, 0.5, "No data in selected time range.", ha='center', va='center', transform=ax.transAxes)
+                    if len(result["times"]):
+                        for gap_start, gap_end in result["gaps"]:
+                            ax.axvspan(to_datetime(gap_start), to_datetime(gap_end), color='grey', alpha=0.2, linewidth=0)
+                    ax.set_title(f"{tag_name} ({self.from_dt.isoformat()} to {self.to_dt.isoformat()}, "
+                                 f"{result['frames']} messages)")
+                    note = describe_gaps(result["gaps"] if len(result["times"]) else [], result["decoded"],
+                                         result["hourly"])
+                    if note:
+                        figure.text(0.01, 0.01, note, fontsize=8)
+                    ax.set_xlabel("Time")
+                    ax.set_ylabel("Values")
+                    ax.grid(True, linestyle='--', alpha=0.7)
+                    ax.tick_params(axis='x', rotation=45)
+                    figure.tight_layout()
+                    pdf.savefig(figure)
+                    self.progress.emit(page + 1, len(self.tags), tag_name)
+            if self.cancelled:
+                os.remove(self.path)
+                logging.info(f"Time report PDF export cancelled: {self.path}")
+                self.export_cancelled.emit()
+            else:
+                logging.info(f"Exported time report for {self.project_name} to {self.path}")
+                self.export_finished.emit(self.path)
+        except Exception as e:
+            logging.error(f"Failed to export time report to PDF: {str(e)}")
+            self.export_failed.emit(str(e))
+        finally:
+            figure.clear()
@@ -0,0 +1,265 @@
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+import numpy as np
+import settings
+from timeutil import LOCAL_TZ
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+try:
+    import pyqtgraph as pg
+except ImportError:
+    pg = None
+
+SECONDS_PER_DAY = 86400.0
+COLOR_NAMES = {"darkblue": "#00008b", "b": "#1f3fbf", "y": "#c8b400"}
+
+
+# Time axes take epoch seconds on every backend
+class MatplotlibBackend:
+    name = "matplotlib"
+
+    def __init__(self, time_axis=False):
+        self.time_axis = time_axis
+        self.figure = Figure(figsize=(10, 6))
+        self.canvas = FigureCanvas(self.figure)
+        self.widget = self.canvas
+        self.reset()
+
+    def reset(self):
+        self.figure.clear()
+        self.ax = self.figure.add_subplot(111)
+        if self.time_axis:
+            # Label in local time, as pyqtgraph's DateAxisItem does
+            self.ax.xaxis_date(LOCAL_TZ)
+        self.lines = {}
+        self.annotation = None
+
+    def to_x(self, values):
+        return np.asarray(values, dtype=np.float64) / SECONDS_PER_DAY if self.time_axis else values
+
+    def from_x(self, value):
+        return value * SECONDS_PER_DAY if self.time_axis else value
+
+    def line(self, key, color='b', label=None, width=1.5):
+        artist, = self.ax.plot([], [], '-', color=color, label=label, linewidth=width)
+        self.lines[key] = artist
+        return MatplotlibLine(self, artist)
+
+    def remove_line(self, key):
+        artist = self.lines.pop(key, None)
+        if artist is not None:
+            artist.remove()
+
+    def set_title(self, title):
+        self.ax.set_title(title)
+
+    def set_labels(self, xlabel, ylabel):
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+
+    def set_y_axis_right(self):
+        self.ax.yaxis.set_label_position("right")
+        self.ax.yaxis.tick_right()
+        self.figure.subplots_adjust(left=0.05, right=0.85, top=0.95, bottom=0.15)
+
+    def grid(self):
+        self.ax.grid(True, linestyle='--', alpha=0.7)
+
+    def legend(self):
+        if self.lines:
+            self.ax.legend()
+
+    def set_xlim(self, left, right):
+        self.ax.set_xlim(self.to_x(left), self.to_x(right))
+
+    def get_xlim(self):
+        left, right = self.ax.get_xlim()
+        return self.from_x(left), self.from_x(right)
+
+    def set_ylim(self, bottom, top):
+        self.ax.set_ylim(bottom, top)
+
+    def autoscale(self, x=True, y=True):
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=x, scaley=y)
+
+    def set_xticks(self, positions, labels=None, rotation=0):
+        self.ax.set_xticks(positions)
+        if labels is not None:
+            self.ax.set_xticklabels(labels, rotation=rotation)
+        else:
+            self.ax.tick_params(axis='x', rotation=rotation)
+
+    def set_yticks(self, positions):
+        self.ax.set_yticks(positions)
+
+    def show_annotation(self, x, y, text):
+        if self.annotation is None:
+            self.annotation = self.ax.annotate("", xy=(0, 0), xytext=(20, 20), textcoords="offset points",
+                                               bbox=dict(boxstyle="round", fc="w"), arrowprops=dict(arrowstyle="->"))
+        self.annotation.xy = (x, y)
+        self.annotation.set_text(text)
+        self.annotation.set_visible(True)
+        self.canvas.draw_idle()
+
+    def hide_annotation(self):
+        if self.annotation is not None and self.annotation.get_visible():
+            self.annotation.set_visible(False)
+            self.canvas.draw_idle()
+
+    def on_mouse_move(self, callback):
+        def handler(event):
+            if event.inaxes == self.ax and event.xdata is not None and event.ydata is not None:
+                callback(self.from_x(event.xdata), event.ydata)
+            else:
+                callback(None, None)
+        self.canvas.mpl_connect('motion_notify_event', handler)
+
+    def enable_zoom_pan(self, on_scroll, on_press, on_release, on_drag):
+        self.canvas.mpl_connect('scroll_event', on_scroll)
+        self.canvas.mpl_connect('button_press_event', on_press)
+        self.canvas.mpl_connect('button_release_event', on_release)
+        self.canvas.mpl_connect('motion_notify_event', on_drag)
+
+    def draw(self):
+        self.canvas.draw_idle()
+
+
+class MatplotlibLine:
+    def __init__(self, backend, artist):
+        self.backend = backend
+        self.artist = artist
+
+    def set_data(self, x, y):
+        self.artist.set_data(self.backend.to_x(x), y)
+
+
+# Draws straight into Qt's scene graph; zoom and pan are handled natively by the
+# ViewBox, and peak-mode downsampling with clip-to-view keeps per-frame cost flat.
+class PyQtGraphBackend:
+    name = "pyqtgraph"
+
+    def __init__(self, time_axis=False):
+        self.time_axis = time_axis
+        axis_items = {"bottom": pg.DateAxisItem()} if time_axis else {}
+        self.widget = pg.PlotWidget(axisItems=axis_items, background='w')
+        self.plot_item = self.widget.getPlotItem()
+        self.plot_item.setClipToView(True)
+        self.plot_item.setDownsampling(auto=True, mode='peak')
+        self.legend_item = None
+        self.annotation = None
+        self.mouse_callbacks = []
+        self.widget.scene().sigMouseMoved.connect(self.on_scene_mouse_moved)
+        self.reset()
+
+    def reset(self):
+        self.plot_item.clear()
+        if self.legend_item is not None:
+            self.legend_item.clear()
+        self.lines = {}
+        self.annotation = None
+
+    def line(self, key, color='b', label=None, width=1.5):
+        pen = pg.mkPen(color=COLOR_NAMES.get(color, color), width=width)
+        item = self.plot_item.plot([], [], pen=pen, name=label, skipFiniteCheck=True)
+        if self.legend_item is not None and label:
+            self.legend_item.addItem(item, label)
+        self.lines[key] = item
+        return item
+
+    def remove_line(self, key):
+        item = self.lines.pop(key, None)
+        if item is not None:
+            self.plot_item.removeItem(item)
+            if self.legend_item is not None:
+                self.legend_item.removeItem(item)
+
+    def set_title(self, title):
+        self.plot_item.setTitle(title)
+
+    def set_labels(self, xlabel, ylabel):
+        self.plot_item.setLabel('bottom', xlabel)
+        self.plot_item.setLabel('left', ylabel)
+
+    def set_y_axis_right(self):
+        self.plot_item.showAxis('right')
+        self.plot_item.getAxis('right').setLabel(self.plot_item.getAxis('left').labelText)
+        self.plot_item.hideAxis('left')
+
+    def grid(self):
+        self.plot_item.showGrid(x=True, y=True, alpha=0.3)
+
+    def legend(self):
+        if self.legend_item is None:
+            self.legend_item = self.plot_item.addLegend()
+            for item in self.lines.values():
+                if item.name():
+                    self.legend_item.addItem(item, item.name())
+
+    def set_xlim(self, left, right):
+        self.plot_item.setXRange(left, right, padding=0)
+
+    def get_xlim(self):
+        left, right = self.plot_item.viewRange()[0]
+        return left, right
+
+    def set_ylim(self, bottom, top):
+        self.plot_item.setYRange(bottom, top, padding=0)
+
+    def autoscale(self, x=True, y=True):
+        if x:
+            self.plot_item.enableAutoRange(axis='x')
+        if y:
+            self.plot_item.enableAutoRange(axis='y')
+
+    def set_xticks(self, positions, labels=None, rotation=0):
+        labels = labels if labels is not None else [f"{p:g}" for p in positions]
+        self.plot_item.getAxis('bottom').setTicks([list(zip(positions, labels))])
+
+    def set_yticks(self, positions):
+        ticks = [[(p, f"{p:g}") for p in positions]]
+        self.plot_item.getAxis('left').setTicks(ticks)
+        self.plot_item.getAxis('right').setTicks(ticks)
+
+    def show_annotation(self, x, y, text):
+        if self.annotation is None:
+            self.annotation = pg.TextItem(color='k', fill=pg.mkBrush(255, 255, 255, 220), anchor=(0, 1))
+            self.plot_item.addItem(self.annotation, ignoreBounds=True)
+        self.annotation.setText(text)
+        self.annotation.setPos(x, y)
+        self.annotation.setVisible(True)
+
+    def hide_annotation(self):
+        if self.annotation is not None:
+            self.annotation.setVisible(False)
+
+    def on_mouse_move(self, callback):
+        self.mouse_callbacks.append(callback)
+
+    def on_scene_mouse_moved(self, pos):
+        if self.plot_item.sceneBoundingRect().contains(pos):
+            point = self.plot_item.vb.mapSceneToView(pos)
+            x, y = point.x(), point.y()
+        else:
+            x, y = None, None
+        for callback in self.mouse_callbacks:
+            callback(x, y)
+
+    def enable_zoom_pan(self, on_scroll, on_press, on_release, on_drag):
+        pass  # ViewBox already zooms on wheel and pans on drag
+
+    def draw(self):
+        pass  # Items repaint themselves when their data changes
+
+
+def create_plot_backend(feature_name, time_axis=False):
+    name = settings.plot_backend_for(feature_name)
+    if name == "pyqtgraph":
+        if pg is not None:
+            return PyQtGraphBackend(time_axis)
+        logging.warning(f"pyqtgraph is not installed, {feature_name} falls back to matplotlib")
+    elif name != "matplotlib":
+        logging.warning(f"Unknown plot backend {name} for {feature_name}, using matplotlib")
+    return MatplotlibBackend(time_axis)
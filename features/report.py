@@ -1,5 +1,6 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QPushButton, QTextEdit,QMessageBox
 from PyQt5.QtCore import Qt
+from timeutil import format_ns
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -49,19 +50,30 @@ class ReportFeature:
             QMessageBox.warning(self.parent, "Error", "No project selected for Report!")
             return
 
-        tags_data = list(self.db.tags_collection.find({"project_name": self.project_name}))
+        tags_data = list(self.db.tags_collection.find({"project_name": self.project_name}, {"tag_name": 1}))
+        summaries = self.parent.summary_store.get_project_summaries(self.project_name)
         report = f"Project Report for {self.project_name}:\n"
         report += f"Total Tags: {len(tags_data)}\n"
         for tag in tags_data:
             tag_name = tag["tag_name"]
-            data = self.db.get_tag_values(self.project_name, tag_name)
+            summary = summaries.get(tag_name, {}).get("overall")
             report += f"\nTag: {tag_name}\n"
-            report += f"  Total Messages: {len(data)}\n"
-            if data:
-                report += f"  Latest Timestamp: {data[-1]['timestamp']}\n"
-                report += f"  Latest Values: {data[-1]['values'][-5:]}\n"
-            else:
+            if not summary:
+                report += "  Total Messages: 0\n"
                 report += "  No data available.\n"
+                continue
+            report += f"  Total Messages: {summary['frames']}\n"
+            report += f"  First Timestamp: {format_ns(summary['first_timestamp'])}\n"
+            report += f"  Latest Timestamp: {format_ns(summary['latest_timestamp'])}\n"
+            report += f"  Latest Value: {summary['latest_value']:.2f}\n"
+            report += (f"  Min: {summary['min']:.2f}  Max: {summary['max']:.2f}  "
+                       f"Mean: {summary['mean']:.2f}  RMS: {summary['rms']:.2f}\n")
+            windows = summaries[tag_name]["windows"]
+            if windows:
+                report += "  Hourly Statistics:\n"
+                for window in windows:
+                    report += (f"    {format_ns(window['window'], '%Y-%m-%d %H:%M')}  Messages: {window['frames']}  Min: {window['min']:.2f}  "
+                               f"Max: {window['max']:.2f}  Mean: {window['mean']:.2f}  RMS: {window['rms']:.2f}\n")
         self.feature_result.setText(report)
 
     def on_data_received(self, tag_name, values):
@@ -0,0 +1,335 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QPushButton, QDateTimeEdit,
+                             QTableView, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt, QDateTime, QAbstractTableModel, QModelIndex
+from collections import OrderedDict
+import numpy as np
+from timeutil import to_ns, format_ns, NS_PER_SECOND
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PAGE_FRAMES = 4  # Frames fetched per page (4 x 4096 samples by default)
+PREFETCH_PAGES = 2  # Pages kept loaded on either side of the visible rows
+ROW_HEIGHT = 22
+
+
+def load_index(token, frame_store, project_name, tag_name, start, end):
+    return frame_store.frame_index(project_name, tag_name, start, end)
+
+
+def load_page(token, frame_store, project_name, tag_name, start, end, expected):
+    values = [frame for _, frame in frame_store.read_frames(project_name, tag_name, start, end)]
+    if token.cancelled:
+        return None
+    values = np.concatenate(values) if values else np.empty(0)
+    if len(values) != expected:
+        # The range changed under us (frames added or removed); keep row numbers stable
+        values = np.concatenate((values, np.full(expected - len(values), np.nan))) if len(values) < expected \
+            else values[:expected]
+    return values
+
+
+# Rows are individual samples. Timestamps come straight from the frame index (frame start
+# + offset / sample rate), so only values need fetching, a page of PAGE_FRAMES frames at
+# a time. Pages outside the visible rows plus a prefetch window are dropped again, so
+# memory stays flat no matter how far the user scrolls.
+class SampleTableModel(QAbstractTableModel):
+    HEADERS = ["#", "TIMESTAMP", "VALUE"]
+
+    def __init__(self, parent, project_name):
+        super().__init__()
+        self.parent = parent
+        self.project_name = project_name
+        self.tag_name = None
+        self.unit = ""
+        self.generation = 0
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.rates = np.empty(0)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.pages = OrderedDict()
+        self.pending = set()
+        self.window = (0, -1)
+
+    def set_index(self, tag_name, metadata, timestamps, counts, rates):
+        self.beginResetModel()
+        self.cancel_pending()
+        self.generation += 1
+        self.tag_name = tag_name
+        self.unit = metadata.unit
+        self.timestamps = timestamps
+        self.counts = counts
+        self.rates = np.where(rates > 0, rates, metadata.sample_rate)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.pages.clear()
+        self.window = (0, -1)
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.cancel_pending()
+        self.generation += 1
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.pages.clear()
+        self.endResetModel()
+
+    def cancel_pending(self):
+        for page in self.pending:
+            self.parent.compute_pool.cancel(self.page_key(page))
+        self.pending.clear()
+
+    def page_key(self, page):
+        return f"samples:{id(self)}:{page}"
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else int(self.offsets[-1])
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            if section == 2 and self.unit:
+                return f"VALUE ({self.unit})"
+            return self.HEADERS[section]
+        return None
+
+    def frame_of(self, row):
+        return int(np.searchsorted(self.offsets, row, side="right")) - 1
+
+    def sample_time(self, row):
+        frame = self.frame_of(row)
+        return int(self.timestamps[frame]) + int((row - self.offsets[frame]) * NS_PER_SECOND / self.rates[frame])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.TextAlignmentRole and index.column() != 1:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role != Qt.DisplayRole:
+            return None
+        row = index.row()
+        if index.column() == 0:
+            return str(row)
+        if index.column() == 1:
+            return format_ns(self.sample_time(row))
+        page = self.frame_of(row) // PAGE_FRAMES
+        values = self.pages.get(page)
+        if values is None:
+            # Painted before the window caught up, e.g. while dragging the scrollbar
+            self.request(page)
+            return "…"
+        return f"{values[row - self.offsets[page * PAGE_FRAMES]]:.6g}"
+
+    def row_for_time(self, timestamp_ns):
+        # Binary search on the frame index, then offset within the frame by sample rate
+        if not len(self.timestamps):
+            return 0
+        frame = max(int(np.searchsorted(self.timestamps, timestamp_ns, side="right")) - 1, 0)
+        offset = int((timestamp_ns - self.timestamps[frame]) * self.rates[frame] / NS_PER_SECOND)
+        return int(self.offsets[frame]) + max(min(offset, int(self.counts[frame]) - 1), 0)
+
+    def set_visible_rows(self, first, last):
+        if not len(self.timestamps):
+            return
+        first_page = max(self.frame_of(first) // PAGE_FRAMES - PREFETCH_PAGES, 0)
+        last_page = min(self.frame_of(last) // PAGE_FRAMES + PREFETCH_PAGES, (len(self.timestamps) - 1) // PAGE_FRAMES)
+        self.window = (first_page, last_page)
+        for page in list(self.pages):
+            if not first_page <= page <= last_page:
+                del self.pages[page]
+        for page in list(self.pending):
+            if not first_page <= page <= last_page:
+                self.parent.compute_pool.cancel(self.page_key(page))
+                self.pending.discard(page)
+        for page in range(first_page, last_page + 1):
+            self.request(page)
+
+    def request(self, page):
+        if page in self.pages or page in self.pending:
+            return
+        first_frame = page * PAGE_FRAMES
+        last_frame = min(first_frame + PAGE_FRAMES, len(self.timestamps)) - 1
+        expected = int(self.offsets[last_frame + 1] - self.offsets[first_frame])
+        generation = self.generation
+        self.pending.add(page)
+        self.parent.compute_pool.submit(self.page_key(page), load_page, self.parent.frame_store, self.project_name,
+                                        self.tag_name, int(self.timestamps[first_frame]),
+                                        int(self.timestamps[last_frame]), expected,
+                                        on_result=lambda values: self.page_loaded(generation, page, values))
+
+    def page_loaded(self, generation, page, values):
+        if generation != self.generation or values is None:
+            return
+        self.pending.discard(page)
+        self.pages[page] = values
+        # Pages painted outside the window (the view resized, say) stay only until space is needed
+        first, last = self.window
+        for stale in [stale for stale in self.pages if stale != page and not first <= stale <= last]:
+            if len(self.pages) <= last - first + 1:
+                break
+            del self.pages[stale]
+        first_row = int(self.offsets[page * PAGE_FRAMES])
+        last_row = first_row + len(values) - 1
+        self.dataChanged.emit(self.index(first_row, 2), self.index(last_row, 2), [Qt.DisplayRole])
+
+    def loaded_bytes(self):
+        return sum(values.nbytes for values in self.pages.values())
+
+
+class SampleBrowserFeature:
+    def __init__(self, parent, db, project_name):
+        self.parent = parent
+        self.db = db
+        self.project_name = project_name
+        self.widget = QWidget()
+        self.model = SampleTableModel(parent, project_name)
+        self.new_frames = 0
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+        self.widget.setLayout(layout)
+
+        header = QLabel(f"SAMPLE BROWSER FOR {self.project_name.upper()}")
+        header.setStyleSheet("color: white; font-size: 26px; font-weight: bold; padding: 8px;")
+        layout.addWidget(header, alignment=Qt.AlignCenter)
+
+        browser_widget = QWidget()
+        browser_layout = QVBoxLayout()
+        browser_widget.setLayout(browser_layout)
+        browser_widget.setStyleSheet("background-color: #2c3e50; border-radius: 5px; padding: 10px;")
+
+        input_style = "background-color: #34495e; color: white; border: 1px solid #1a73e8; padding: 5px;"
+        button_style = "background-color: #1a73e8; color: white; border-radius: 5px; padding: 5px 12px;"
+        filter_layout = QHBoxLayout()
+        tag_label = QLabel("Select Tag:")
+        tag_label.setStyleSheet("color: white; font-size: 14px;")
+        self.tag_combo = QComboBox()
+        for tag in self.db.tags_collection.find({"project_name": self.project_name}, {"tag_name": 1}):
+            self.tag_combo.addItem(tag["tag_name"])
+        self.tag_combo.setStyleSheet(input_style)
+        from_label = QLabel("From:")
+        from_label.setStyleSheet("color: white; font-size: 14px;")
+        self.from_date = QDateTimeEdit()
+        self.from_date.setCalendarPopup(True)
+        self.from_date.setDateTime(QDateTime.currentDateTime().addDays(-1))
+        self.from_date.setStyleSheet(input_style)
+        to_label = QLabel("To:")
+        to_label.setStyleSheet("color: white; font-size: 14px;")
+        self.to_date = QDateTimeEdit()
+        self.to_date.setCalendarPopup(True)
+        self.to_date.setDateTime(QDateTime.currentDateTime())
+        self.to_date.setStyleSheet(input_style)
+        load_button = QPushButton("Load")
+        load_button.setStyleSheet(button_style)
+        load_button.clicked.connect(self.load_index)
+        for widget in (tag_label, self.tag_combo, from_label, self.from_date, to_label, self.to_date, load_button):
+            filter_layout.addWidget(widget)
+        filter_layout.addStretch()
+        browser_layout.addLayout(filter_layout)
+
+        jump_layout = QHBoxLayout()
+        jump_label = QLabel("Jump to:")
+        jump_label.setStyleSheet("color: white; font-size: 14px;")
+        self.jump_date = QDateTimeEdit()
+        self.jump_date.setDisplayFormat("yyyy-MM-dd HH:mm:ss.zzz")
+        self.jump_date.setCalendarPopup(True)
+        self.jump_date.setDateTime(QDateTime.currentDateTime().addDays(-1))
+        self.jump_date.setStyleSheet(input_style)
+        jump_button = QPushButton("Go")
+        jump_button.setStyleSheet(button_style)
+        jump_button.clicked.connect(self.jump_to_time)
+        self.status_label = QLabel("Select a tag and time range, then press Load.")
+        self.status_label.setStyleSheet("color: white; font-size: 13px;")
+        jump_layout.addWidget(jump_label)
+        jump_layout.addWidget(self.jump_date)
+        jump_layout.addWidget(jump_button)
+        jump_layout.addStretch()
+        jump_layout.addWidget(self.status_label)
+        browser_layout.addLayout(jump_layout)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setStyleSheet("""
+            QTableView { background-color: #34495e; color: white; border: none; gridline-color: #2c3e50; }
+            QHeaderView::section { background-color: #1a73e8; color: white; border: none; padding: 10px; font-size: 14px; }
+        """)
+        # Fixed row heights and no content-based sizing: Qt never has to measure millions of rows
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(ROW_HEIGHT)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.table.verticalScrollBar().valueChanged.connect(self.update_window)
+        browser_layout.addWidget(self.table)
+
+        layout.addWidget(browser_widget)
+
+    def load_index(self):
+        tag_name = self.tag_combo.currentText()
+        if not tag_name:
+            self.status_label.setText("No tags available.")
+            return
+        start = to_ns(self.from_date.dateTime().toPyDateTime())
+        end = to_ns(self.to_date.dateTime().toPyDateTime())
+        self.model.clear()
+        self.new_frames = 0
+        self.status_label.setText(f"Loading frame index for {tag_name}...")
+        self.parent.compute_pool.submit(f"samples_index:{id(self)}", load_index, self.parent.frame_store,
+                                        self.project_name, tag_name, start, end,
+                                        on_result=lambda index: self.apply_index(tag_name, index),
+                                        on_error=lambda message: self.status_label.setText(f"Error: {message}"))
+
+    def apply_index(self, tag_name, index):
+        timestamps, counts, rates = index
+        metadata = self.parent.metadata_store.get(self.project_name, tag_name)
+        self.model.set_index(tag_name, metadata, timestamps, counts, rates)
+        self.table.scrollToTop()
+        self.update_window()
+        self.update_status()
+
+    def jump_to_time(self):
+        if not self.model.rowCount():
+            return
+        row = self.model.row_for_time(to_ns(self.jump_date.dateTime().toPyDateTime()))
+        index = self.model.index(row, 0)
+        self.table.scrollTo(index, QAbstractItemView.PositionAtTop)
+        self.table.selectRow(row)
+        self.update_window()
+
+    def update_window(self, *args):
+        rows = self.model.rowCount()
+        if not rows:
+            return
+        first = self.table.rowAt(0)
+        last = self.table.rowAt(self.table.viewport().height() - 1)
+        first = max(first, 0)
+        last = rows - 1 if last < 0 else last
+        self.model.set_visible_rows(first, last)
+        self.update_status()
+
+    def update_status(self):
+        rows = self.model.rowCount()
+        text = (f"{rows:,} samples in {len(self.model.timestamps):,} frames, "
+                f"{len(self.model.pages)} pages loaded ({self.model.loaded_bytes() / 1e6:.1f} MB)")
+        if self.new_frames:
+            text += f"  |  {self.new_frames} new frames, press Load to include"
+        self.status_label.setText(text)
+
+    def memory_usage(self):
+        # Loaded pages are bounded by the visible window plus prefetch, so nothing to release
+        model = self.model
+        return (model.loaded_bytes() + model.timestamps.nbytes + model.counts.nbytes + model.rates.nbytes
+                + model.offsets.nbytes)
+
+    def on_data_received(self, tag_name, values):
+        if tag_name == self.model.tag_name:
+            self.new_frames += 1
+            self.update_status()
+
+    def get_widget(self):
+        return self.widget
@@ -1,5 +1,6 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QTableWidget, QTableWidgetItem,QHeaderView
 from PyQt5.QtCore import Qt
+from timeutil import format_ns
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -63,10 +64,10 @@ class TabularViewFeature:
         self.tabular_table.setRowCount(len(filtered_tags))
         for row, tag in enumerate(filtered_tags):
             self.tabular_table.setItem(row, 0, QTableWidgetItem(tag["tag_name"]))
-            latest_data = self.db.get_tag_values(self.project_name, tag["tag_name"])
+            latest_data = self.parent.frame_store.tag_values(self.project_name, tag["tag_name"])
             timestamp = latest_data[-1]["timestamp"] if latest_data else "N/A"
             value = latest_data[-1]["values"][-1] if latest_data else "N/A"
-            self.tabular_table.setItem(row, 1, QTableWidgetItem(timestamp))
+            self.tabular_table.setItem(row, 1, QTableWidgetItem(format_ns(timestamp)))
             self.tabular_table.setItem(row, 2, QTableWidgetItem(str(value)))
 
     def on_data_received(self, tag_name, values):
@@ -1,14 +1,89 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, QHBoxLayout, QDateTimeEdit, QListWidget, 
-                             QListWidgetItem, QPushButton, QTextEdit, QSizePolicy)
+                             QListWidgetItem, QPushButton, QTextEdit, QSizePolicy, QProgressBar, QFileDialog)
 from PyQt5.QtCore import Qt, QDateTime
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from features.pdf_export import TimeReportPdfExporter, describe_gaps
 import logging
-from datetime import datetime
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
+from frame_reduce import get_process_pool, decode_and_reduce, GridReduction
+from timeutil import to_ns, to_datetime64, now_ns, LOCAL_TZ
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+MAX_POINTS_PER_TAG = 20000
+CHUNK_FRAMES = 500
+# Chunks submitted to the process pool and not yet merged, across all tags of a report:
+# each result holds up to MAX_POINTS_PER_TAG / 2 buckets until it is merged
+IN_FLIGHT = threading.BoundedSemaphore(2 * (os.cpu_count() or 2))
+
+
+def fetch_and_reduce_tag(token, frame_store, metrics_store, project_name, tag, start, end, sample_rate):
+    # Runs on an I/O thread: streams encoded frames in chunks and hands each chunk to
+    # the process pool, so decoding of one chunk overlaps with fetching the next. Every
+    # chunk reduces into the same min/max grid over [start, end], merged as results arrive.
+    # Stretches without raw frames (triggered capture mode) are filled from the metrics.
+    process_pool = get_process_pool()
+    pending = deque()
+    grid = GridReduction(start, end, MAX_POINTS_PER_TAG // 2)
+
+    def merge_oldest():
+        future = pending.popleft()
+        try:
+            grid.add(future.result())
+        finally:
+            IN_FLIGHT.release()
+
+    def submit(chunk):
+        # Without a free slot, make room by merging our own oldest chunk; only wait for
+        # other tags when nothing of ours is outstanding
+        while not IN_FLIGHT.acquire(blocking=not pending):
+            merge_oldest()
+        pending.append(process_pool.submit(decode_and_reduce, chunk, grid.start, grid.bucket_ns, grid.buckets,
+                                           sample_rate))
+        while pending and pending[0].done():
+            merge_oldest()
+
+    try:
+        chunk = []
+        for doc in frame_store.read_raw(project_name, tag, start, end, batch_size=CHUNK_FRAMES):
+            if token.cancelled:
+                return tag, None
+            chunk.append(doc)
+            if len(chunk) >= CHUNK_FRAMES:
+                submit(chunk)
+                chunk = []
+        if chunk:
+            submit(chunk)
+        while pending:
+            merge_oldest()
+        grid.fill_gaps(metrics_store, project_name, tag, now_ns())
+        return tag, grid.result()
+    finally:
+        for future in pending:
+            future.cancel()
+            IN_FLIGHT.release()
+
+
+def compute_time_report(token, frame_store, metrics_store, project_name, selected_tags, from_dt, to_dt, sample_rates):
+    start, end = to_ns(from_dt), to_ns(to_dt)
+    with ThreadPoolExecutor(max_workers=min(len(selected_tags), 8)) as io_pool:
+        futures = [io_pool.submit(fetch_and_reduce_tag, token, frame_store, metrics_store, project_name, tag, start,
+                                  end, sample_rates.get(tag)) for tag in selected_tags]
+        for future in as_completed(futures):
+            if token.cancelled:
+                break
+            try:
+                token.report(future.result())
+            except Exception as e:
+                logging.error(f"Time report failed for a tag: {str(e)}")
+    return selected_tags, from_dt, to_dt
+
+
 class TimeReportFeature:
     def __init__(self, parent, db, project_name):
         self.parent = parent
@@ -19,6 +94,7 @@ class TimeReportFeature:
         self.canvas = FigureCanvas(self.figure)
         self.dragging = False
         self.press_x = None
+        self.exporter = None
         self.initUI()
 
     def initUI(self):
@@ -99,8 +175,22 @@ class TimeReportFeature:
         """)
         reset_btn.clicked.connect(self.reset_view)
 
+        self.cancel_export_btn = QPushButton("Cancel Export")
+        self.cancel_export_btn.setStyleSheet("""
+            QPushButton { background-color: #e74c3c; color: white; border: none; padding: 5px; border-radius: 5px; }
+            QPushButton:hover { background-color: #c0392b; }
+        """)
+        self.cancel_export_btn.clicked.connect(self.cancel_export)
+        self.cancel_export_btn.setVisible(False)
+
+        self.export_progress = QProgressBar()
+        self.export_progress.setStyleSheet("QProgressBar { color: white; }")
+        self.export_progress.setVisible(False)
+
         button_layout.addWidget(pdf_btn)
         button_layout.addWidget(reset_btn)
+        button_layout.addWidget(self.export_progress)
+        button_layout.addWidget(self.cancel_export_btn)
         button_layout.addStretch()
         self.time_report_layout.addLayout(button_layout)
 
@@ -123,6 +213,7 @@ class TimeReportFeature:
     def update_plot(self):
         selected_tags = [item.text() for item in self.time_report_tag_list.selectedItems()]
         if not selected_tags or "No Tags Available" in selected_tags:
+            self.parent.compute_pool.cancel(f"time_report:{id(self)}")
             self.time_report_result.setText("No valid tags selected.")
             self.figure.clear()
             self.canvas.draw()
@@ -132,51 +223,61 @@ class TimeReportFeature:
         to_dt = self.time_to_date.dateTime().toPyDateTime()
 
         self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        colors = ['b', 'r', 'g', 'y', 'm', 'c']  # Color cycle for multiple tags
+        self.report_ax = self.figure.add_subplot(111)
+        self.report_ax.grid(True, linestyle='--', alpha=0.7)
+        self.report_ax.set_xlabel("Time")
+        self.report_ax.set_ylabel("Values")
+        self.report_ax.tick_params(axis='x', rotation=45)
+        self.report_sections = {}
+        self.report_header = (f"Time Report for {self.project_name} ({from_dt.isoformat()} to {to_dt.isoformat()}):\n"
+                              f"Selected Tags: {', '.join(selected_tags)}\n\n")
+        self.report_tags = selected_tags
+        self.time_report_result.setText(self.report_header + "Loading...")
+        self.parent.compute_pool.submit(f"time_report:{id(self)}", compute_time_report, self.parent.frame_store,
+                                        self.parent.metrics_store, self.project_name, selected_tags, from_dt, to_dt,
+                                        {tag: self.parent.metadata_store.get(self.project_name, tag).sample_rate
+                                         for tag in selected_tags},
+                                        on_partial=self.apply_tag_result, on_result=self.finish_time_report)
 
-        report = f"Time Report for {self.project_name} ({from_dt.isoformat()} to {to_dt.isoformat()}):\n"
-        report += f"Selected Tags: {', '.join(selected_tags)}\n\n"
+    def apply_tag_result(self, tag_result):
+        # Called as each tag finishes; tags are merged into the plot in completion order
+        tag, reduced = tag_result
+        colors = ['b', 'r', 'g', 'y', 'm', 'c']  # Color cycle for multiple tags
+        i = self.report_tags.index(tag)
+        if reduced:
+            color = colors[i % len(colors)]
+            if len(reduced["values"]):
+                self.report_ax.plot(reduced["times"], reduced["values"], f'{color}-', label=tag, linewidth=1.5)
+            if len(reduced["fill_values"]):
+                # Min/max metrics where raw frames were not stored, dotted so they read as a stand-in
+                self.report_ax.plot(reduced["fill_times"], reduced["fill_values"], f'{color}:',
+                                    label=f"{tag} (min/max metrics)", linewidth=1.0)
+            for gap_start, gap_end in reduced["gaps"]:
+                self.report_ax.axvspan(*to_datetime64([gap_start, gap_end]), color='grey', alpha=0.15, linewidth=0)
+            # datetime64 values are UTC; label the axis in local time like the pickers
+            self.report_ax.xaxis_date(LOCAL_TZ)
+            section = f"Tag: {tag}\n"
+            section += f"  Messages in Range: {reduced['frames']}\n"
+            section += f"  Latest Value: {reduced['latest_value']}\n"
+            if reduced["gaps"]:
+                section += f"  {describe_gaps(reduced['gaps'], 0, None)}"
+                section += "; min/max metrics drawn dotted\n" if len(reduced["fill_values"]) else "\n"
+            section += f"  Sample Data (last 5 entries):\n"
+            for timestamp, values in reduced["recent"]:
+                section += f"    {timestamp}: {values}\n"
+        else:
+            section = f"Tag: {tag}\n  No data in selected time range.\n"
+        self.report_sections[tag] = section
+        self.time_report_result.setText(self.report_header + "".join(
+            self.report_sections[t] for t in self.report_tags if t in self.report_sections))
+        self.canvas.draw_idle()
 
-        for i, tag in enumerate(selected_tags):
-            data = self.db.get_tag_values(self.project_name, tag)
-            try:
-                filtered_data = [
-                    entry for entry in data
-                    if from_dt <= datetime.strptime(entry["timestamp"], "%Y-%m-%dT%H:%M:%S.%f") <= to_dt
-                ]
-            except ValueError as e:
-                logging.error(f"Error parsing timestamp for tag {tag}: {e}")
-                continue
-
-            if filtered_data:
-                timestamps = []
-                values = []
-                for entry in filtered_data:
-                    dt = datetime.strptime(entry["timestamp"], "%Y-%m-%dT%H:%M:%S.%f")
-                    timestamps.extend([dt] * len(entry["values"]))
-                    values.extend(entry["values"])
-
-                if timestamps and values:
-                    ax.plot(timestamps, values, f'{colors[i % len(colors)]}-', label=tag, linewidth=1.5)
-
-                report += f"Tag: {tag}\n"
-                report += f"  Messages in Range: {len(filtered_data)}\n"
-                report += f"  Latest Value: {filtered_data[-1]['values'][-1]}\n"
-                report += f"  Sample Data (last 5 entries):\n"
-                for entry in filtered_data[-5:]:
-                    report += f"    {entry['timestamp']}: {entry['values'][-5:]}\n"
-            else:
-                report += f"Tag: {tag}\n  No data in selected time range.\n"
-
-        ax.grid(True, linestyle='--', alpha=0.7)
-        ax.set_xlabel("Time")
-        ax.set_ylabel("Values")
-        ax.legend()
-        ax.tick_params(axis='x', rotation=45)
+    def finish_time_report(self, result):
+        selected_tags = result[0]
+        if self.report_ax.lines:
+            self.report_ax.legend()
         self.figure.tight_layout()
         self.canvas.draw()
-        self.time_report_result.setText(report)
         logging.debug(f"Time report and plot updated for tags: {selected_tags}")
 
     def reset_view(self):
@@ -217,15 +318,56 @@ class TimeReportFeature:
                 logging.debug(f"Panned: new xlim [{xlim[0] + dx:.2f}, {xlim[1] + dx:.2f}]")
 
     def export_time_report_to_pdf(self, project_name):
-        try:
-            report_text = self.time_report_result.toPlainText()
-            logging.info(f"Exporting time report for {project_name} to PDF:\n{report_text[:100]}...")
-            # Add basic PDF export (requires reportlab or similar library)
-            # For now, just append a message
-            self.time_report_result.setText(f"{report_text}\n\n[Export to PDF functionality not fully implemented yet.]")
-        except Exception as e:
-            logging.error(f"Failed to export time report to PDF: {str(e)}")
-            self.time_report_result.setText(f"Error exporting to PDF: {str(e)}")
+        if self.exporter and self.exporter.isRunning():
+            self.time_report_result.append("A PDF export is already running.")
+            return
+        selected_tags = [item.text() for item in self.time_report_tag_list.selectedItems()]
+        if not selected_tags or "No Tags Available" in selected_tags:
+            self.time_report_result.setText("No valid tags selected for PDF export.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self.widget, "Export Time Report", f"{project_name}_time_report.pdf",
+                                              "PDF Files (*.pdf)")
+        if not path:
+            return
+
+        self.exporter = TimeReportPdfExporter(self.parent.frame_store, project_name, selected_tags,
+                                              self.time_from_date.dateTime().toPyDateTime(),
+                                              self.time_to_date.dateTime().toPyDateTime(), path,
+                                              summary_store=self.parent.summary_store)
+        self.exporter.progress.connect(self.on_export_progress)
+        self.exporter.export_finished.connect(self.on_export_finished)
+        self.exporter.export_failed.connect(self.on_export_failed)
+        self.exporter.export_cancelled.connect(self.on_export_cancelled)
+        self.export_progress.setRange(0, len(selected_tags))
+        self.export_progress.setValue(0)
+        self.export_progress.setVisible(True)
+        self.cancel_export_btn.setVisible(True)
+        self.exporter.start()
+        logging.info(f"Exporting time report for {project_name} to {path}")
+
+    def cancel_export(self):
+        if self.exporter:
+            self.exporter.cancel()
+
+    def on_export_progress(self, done, total, tag_name):
+        self.export_progress.setValue(done)
+        self.export_progress.setFormat(f"{done}/{total} {tag_name}")
+
+    def end_export(self):
+        self.export_progress.setVisible(False)
+        self.cancel_export_btn.setVisible(False)
+
+    def on_export_finished(self, path):
+        self.end_export()
+        self.time_report_result.append(f"\nTime report exported to {path}")
+
+    def on_export_failed(self, message):
+        self.end_export()
+        self.time_report_result.append(f"\nError exporting to PDF: {message}")
+
+    def on_export_cancelled(self):
+        self.end_export()
+        self.time_report_result.append("\nPDF export cancelled.")
 
     def get_widget(self):
         return self.widget
@@ -1,9 +1,9 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QPushButton, QTextEdit, QMessageBox
 from PyQt5.QtCore import Qt, QTimer
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
+from features.plot_backend import create_plot_backend
 import numpy as np
-from datetime import datetime, timedelta
+from timeutil import now_ns, to_ns, format_ns, NS_PER_SECOND
+from tag_metadata import TagMetadata
 from collections import deque
 import logging
 
@@ -16,13 +16,14 @@ class TimeViewFeature:
         self.project_name = project_name
         self.widget = QWidget()
         self.mqtt_tag = None
-        self.max_buffer_size = 8192  # Increased buffer size to handle rapid data bursts
+        self.metadata = TagMetadata(None)
+        self.max_buffer_size = 2 * self.metadata.frame_length  # Two frames absorb rapid data bursts
         self.time_view_buffer = deque(maxlen=self.max_buffer_size)
         self.time_view_timestamps = deque(maxlen=self.max_buffer_size)
         self.timer = QTimer(self.widget)
         self.timer.timeout.connect(self.update_time_view_plot)
-        self.figure = plt.Figure(figsize=(10, 6))
-        self.canvas = FigureCanvas(self.figure)
+        self.plot = create_plot_backend("Time View")
+        self.line = None
         self.dragging = False
         self.press_x = None
         self.initUI()
@@ -67,13 +68,10 @@ class TimeViewFeature:
         tag_layout.addStretch()
         self.time_layout.addLayout(tag_layout)
 
-        self.time_layout.addWidget(self.canvas)
+        self.time_layout.addWidget(self.plot.widget)
 
-        self.canvas.mpl_connect('motion_notify_event', self.on_mouse_move)
-        self.canvas.mpl_connect('scroll_event', self.on_scroll)
-        self.canvas.mpl_connect('button_press_event', self.on_press)
-        self.canvas.mpl_connect('button_release_event', self.on_release)
-        self.canvas.mpl_connect('motion_notify_event', self.on_drag)
+        self.plot.on_mouse_move(self.on_mouse_move)
+        self.plot.enable_zoom_pan(self.on_scroll, self.on_press, self.on_release, self.on_drag)
 
         self.time_result = QTextEdit()
         self.time_result.setReadOnly(True)
@@ -100,46 +98,47 @@ class TimeViewFeature:
         self.mqtt_tag = tag_name
         self.timer.stop()
         self.timer.setInterval(100)  # Adjust interval for faster updates
-        self.time_view_buffer.clear()
-        self.time_view_timestamps.clear()
+        self.metadata = self.parent.metadata_store.get(self.project_name, tag_name)
+        self.max_buffer_size = 2 * self.metadata.frame_length
+        self.time_view_buffer = deque(maxlen=self.max_buffer_size)
+        self.time_view_timestamps = deque(maxlen=self.max_buffer_size)
 
-        data = self.db.get_tag_values(self.project_name, self.mqtt_tag)
+        data = self.parent.frame_store.tag_values(self.project_name, self.mqtt_tag, 2)
         if data:
-            for entry in data[-2:]:
+            for entry in data:
                 self.time_view_buffer.extend(entry["values"])
-                self.time_view_timestamps.extend([entry["timestamp"]] * len(entry["values"]))
-
-        self.figure.clear()
-        self.ax = self.figure.add_subplot(111)
-        self.line, = self.ax.plot([], [], 'b-', linewidth=1.5, color='darkblue')
-        self.ax.grid(True, linestyle='--', alpha=0.7)
-        self.ax.set_ylabel("Values", rotation=90, labelpad=10)
-        self.ax.yaxis.set_label_position("right")
-        self.ax.yaxis.tick_right()
-        self.ax.set_xlabel("Time (HH:MM:SSS)")
-        self.ax.set_xlim(0, 1)
-        self.ax.set_xticks(np.linspace(0, 1, 10))
-
-        self.annotation = self.ax.annotate("", xy=(0, 0), xytext=(20, 20), textcoords="offset points",
-                                           bbox=dict(boxstyle="round", fc="w"), arrowprops=dict(arrowstyle="->"))
-        self.annotation.set_visible(False)
-
-        self.figure.subplots_adjust(left=0.05, right=0.85, top=0.95, bottom=0.15)
-        self.canvas.setMinimumSize(1000, 600)
-        self.canvas.draw()
+                self.time_view_timestamps.extend(self.sample_times(to_ns(entry["timestamp"]), len(entry["values"])))
+
+        self.plot.reset()
+        self.line = self.plot.line("values", 'darkblue', width=1.5)
+        self.plot.grid()
+        self.plot.set_labels("Time (HH:MM:SS.mmm)", f"Values ({self.metadata.unit})" if self.metadata.unit else "Values")
+        self.plot.set_y_axis_right()
+        self.plot.set_xlim(0, 1)
+        self.plot.set_xticks(np.linspace(0, 1, 10))
+        self.plot.widget.setMinimumSize(1000, 600)
+        self.plot.draw()
         self.timer.start()
 
+    def sample_times(self, frame_timestamp, count):
+        # Epoch ns of each sample; the frame timestamp is the time of its first sample
+        return frame_timestamp + (self.metadata.frame_times(count) * NS_PER_SECOND).astype(np.int64)
+
+    def padding(self, y_min, y_max):
+        low, high = self.metadata.value_range()
+        return (y_max - y_min) * 0.1 if y_max != y_min else (high - low) / 6
+
     def generate_y_ticks(self, values):
-        if not values:
-            return np.arange(16390, 46538, 5000)
-        y_max = max(values, default=46537)
-        y_min = min(values, default=16390)
-        padding = (y_max - y_min) * 0.1 if y_max != y_min else 5000
+        low, high = self.metadata.value_range()
+        y_max = max(values, default=high)
+        y_min = min(values, default=low)
+        padding = self.padding(y_min, y_max)
         y_max += padding
         y_min -= padding
         range_val = y_max - y_min
-        step = max(range_val / 10, 1)
-        step = np.ceil(step / 500) * 500
+        # Round the step to 1, 2 or 5 times a power of ten, whatever the engineering unit
+        magnitude = 10 ** np.floor(np.log10(range_val / 10))
+        step = magnitude * next(m for m in (1, 2, 5, 10) if m * magnitude >= range_val / 10)
         ticks = []
         current = np.floor(y_min / step) * step
         while current <= y_max:
@@ -159,78 +158,63 @@ class TimeViewFeature:
             )
             return
 
-        xlim = self.ax.get_xlim()
+        xlim = self.plot.get_xlim()
         window_size = xlim[1] - xlim[0]
 
         # Calculate samples based on current buffer size and window
-        samples_per_window = min(current_buffer_size, int(self.max_buffer_size * window_size))
+        samples_per_window = min(current_buffer_size, int(self.metadata.sample_rate * window_size))
         if samples_per_window < 2:
             samples_per_window = 2  # Ensure at least 2 points for plotting
 
         window_values = list(self.time_view_buffer)[-samples_per_window:]
-        window_timestamps = list(self.time_view_timestamps)[-samples_per_window:]
 
         time_points = np.linspace(xlim[0], xlim[1], samples_per_window)
         self.line.set_data(time_points, window_values)
 
         y_max = max(window_values)
         y_min = min(window_values)
-        padding = (y_max - y_min) * 0.1 if y_max != y_min else 5000
-        self.ax.set_ylim(y_min - padding, y_max + padding)
-        self.ax.set_yticks(self.generate_y_ticks(window_values))
+        padding = self.padding(y_min, y_max)
+        self.plot.set_ylim(y_min - padding, y_max + padding)
+        self.plot.set_yticks(self.generate_y_ticks(window_values))
 
-        if window_timestamps:
-            latest_dt = datetime.strptime(window_timestamps[-1], "%Y-%m-%dT%H:%M:%S.%f")
-            time_labels = []
+        if self.time_view_timestamps:
             tick_positions = np.linspace(xlim[0], xlim[1], 10)
-            for tick in tick_positions:
-                delta_seconds = tick - xlim[1]
-                tick_dt = latest_dt + timedelta(seconds=delta_seconds)
-                milliseconds = tick_dt.microsecond // 1000
-                time_labels.append(f"{tick_dt.strftime('%H:%M:')}{milliseconds:03d}")
-            self.ax.set_xticks(tick_positions)
-            self.ax.set_xticklabels(time_labels, rotation=0)
-
-        for txt in self.ax.texts:
-            txt.remove()
-
-        self.canvas.draw_idle()  # Use draw_idle for better performance
+            tick_ns = int(self.time_view_timestamps[-1]) + ((tick_positions - xlim[1]) * NS_PER_SECOND).astype(np.int64)
+            time_labels = [format_ns(int(tick), '%H:%M:%S.%f')[:-3] for tick in tick_ns]
+            self.plot.set_xticks(tick_positions, time_labels)
+
+        self.plot.draw()
         self.time_result.setText(
             f"Time View Data for {self.mqtt_tag}, Latest value: {window_values[-1]}, "
             f"Window: {window_size:.2f}s, Buffer: {current_buffer_size}"
         )
 
     def reset_time_view(self):
-        if hasattr(self, 'ax'):
-            self.ax.set_xlim(0, 1)
-            self.ax.set_xticks(np.linspace(0, 1, 10))
-            self.canvas.draw()
+        if self.line is not None:
+            self.plot.set_xlim(0, 1)
+            self.plot.set_xticks(np.linspace(0, 1, 10))
+            self.plot.draw()
             logging.debug("Time View reset to default 1-second window with 10 ticks")
 
-    def on_mouse_move(self, event):
-        if event.inaxes == self.ax:
-            x, y = event.xdata, event.ydata
-            if x is not None and y is not None:
-                xlim = self.ax.get_xlim()
-                window_size = xlim[1] - xlim[0]
-                current_buffer_size = len(self.time_view_buffer)
-                samples_per_window = min(current_buffer_size, int(self.max_buffer_size * window_size))
-                idx = int(round((x - xlim[0]) / window_size * (samples_per_window - 1)))
-                window_values = list(self.time_view_buffer)[-samples_per_window:]
-                if 0 <= idx < len(window_values):
-                    value = window_values[idx]
-                    self.annotation.xy = (x, y)
-                    self.annotation.set_text(f"Value: {value:.2f}")
-                    self.annotation.set_visible(True)
-                    self.canvas.draw_idle()
-            else:
-                self.annotation.set_visible(False)
-                self.canvas.draw_idle()
+    def on_mouse_move(self, x, y):
+        if self.line is None:
+            return
+        if x is not None and y is not None:
+            xlim = self.plot.get_xlim()
+            window_size = xlim[1] - xlim[0]
+            current_buffer_size = len(self.time_view_buffer)
+            samples_per_window = min(current_buffer_size, int(self.metadata.sample_rate * window_size))
+            idx = int(round((x - xlim[0]) / window_size * (samples_per_window - 1)))
+            window_values = list(self.time_view_buffer)[-samples_per_window:]
+            if 0 <= idx < len(window_values):
+                value = window_values[idx]
+                self.plot.show_annotation(x, y, f"Value: {value:.2f}")
+        else:
+            self.plot.hide_annotation()
 
     def on_scroll(self, event):
         if event.inaxes:
-            ax = event.inaxes
-            xlim = ax.get_xlim()
+            xlim = self.plot.get_xlim()
             x_range = xlim[1] - xlim[0]
             center = event.xdata if event.xdata is not None else (xlim[0] + xlim[1]) / 2
             scale = 1.1 if event.button == 'down' else 0.9
@@ -239,8 +223,8 @@ class TimeViewFeature:
                 new_range = 0.1
             elif new_range > 10:
                 new_range = 10
-            ax.set_xlim(center - new_range / 2, center + new_range / 2)
-            self.canvas.draw_idle()
+            self.plot.set_xlim(center - new_range / 2, center + new_range / 2)
+            self.plot.draw()
             logging.debug(f"Zoomed: new window size {new_range:.2f}s")
 
     def on_press(self, event):
@@ -253,25 +237,29 @@ class TimeViewFeature:
 
     def on_drag(self, event):
         if self.dragging and event.inaxes:
-            ax = event.inaxes
             if self.press_x is not None and event.xdata is not None:
                 dx = self.press_x - event.xdata
-                xlim = ax.get_xlim()
+                xlim = self.plot.get_xlim()
                 new_left = xlim[0] + dx
                 new_right = xlim[1] + dx
                 if new_left < 0:
                     new_left = 0
                     new_right = new_left + (xlim[1] - xlim[0])
-                ax.set_xlim(new_left, new_right)
+                self.plot.set_xlim(new_left, new_right)
                 self.press_x = event.xdata
-                self.canvas.draw_idle()
+                self.plot.draw()
                 logging.debug(f"Panned: new xlim [{new_left:.2f}, {new_right:.2f}]")
 
-    def on_data_received(self, tag_name, values):
+    def on_data_received(self, tag_name, values, timestamp=None):
         if tag_name == self.mqtt_tag:
             self.time_view_buffer.extend(values)
-            self.time_view_timestamps.extend([datetime.now().isoformat()] * len(values))
+            self.time_view_timestamps.extend(self.sample_times(timestamp or now_ns(), len(values)))
             logging.debug(f"Time View - Received {len(values)} values for {tag_name}")
 
+    def on_frames_received(self, tag_name, frames):
+        # The scrolling buffer needs every frame, not just the newest, stamped with source time
+        for timestamp, values in frames:
+            self.on_data_received(tag_name, values, timestamp)
+
     def get_widget(self):
         return self.widget
\ No newline at end of file
@@ -1,12 +1,15 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QPushButton, QTextEdit,QMessageBox
 from PyQt5.QtCore import Qt, QTimer
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
+from features.plot_backend import create_plot_backend
+from metrics import METRIC_NAMES, METRIC_LABELS, MetricSeries
+from timeutil import to_seconds, format_ns, NS_PER_HOUR
 import numpy as np
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+TREND_SPAN_NS = 24 * NS_PER_HOUR  # Time shown; only new points are read on each tick
+
 class TrendViewFeature:
     def __init__(self, parent, db, project_name):
         self.parent = parent
@@ -16,8 +19,9 @@ class TrendViewFeature:
         self.mqtt_tag = None
         self.timer = QTimer(self.widget)
         self.timer.timeout.connect(self.update_plot)
-        self.figure = plt.Figure(figsize=(10, 6))
-        self.canvas = FigureCanvas(self.figure)
+        self.plot = create_plot_backend("Trend View", time_axis=True)
+        self.trend_line = None
+        self.series = None
         self.initUI()
 
     def initUI(self):
@@ -44,8 +48,17 @@ class TrendViewFeature:
             for tag in tags_data:
                 self.tag_combo.addItem(tag["tag_name"])
         self.tag_combo.setStyleSheet("background-color: #34495e; color: white; border: 1px solid #1a73e8; padding: 5px;")
+        metric_label = QLabel("Metric:")
+        metric_label.setStyleSheet("color: white; font-size: 14px;")
+        self.metric_combo = QComboBox()
+        for name in METRIC_NAMES:
+            self.metric_combo.addItem(METRIC_LABELS[name], name)
+        self.metric_combo.setStyleSheet("background-color: #34495e; color: white; border: 1px solid #1a73e8; padding: 5px;")
+        self.metric_combo.currentIndexChanged.connect(self.update_plot)
         tag_layout.addWidget(tag_label)
         tag_layout.addWidget(self.tag_combo)
+        tag_layout.addWidget(metric_label)
+        tag_layout.addWidget(self.metric_combo)
         tag_layout.addStretch()
         self.feature_layout.addLayout(tag_layout)
 
@@ -60,7 +73,7 @@ class TrendViewFeature:
         button_layout.addStretch()
         self.feature_layout.addLayout(button_layout)
 
-        self.feature_layout.addWidget(self.canvas)
+        self.feature_layout.addWidget(self.plot.widget)
 
         self.feature_result = QTextEdit()
         self.feature_result.setReadOnly(True)
@@ -76,6 +89,11 @@ class TrendViewFeature:
             QMessageBox.warning(self.parent, "Error", "No project or valid tag selected for Trend View plotting!")
             return
         self.mqtt_tag = tag_name
+        self.plot.reset()
+        self.trend_line = self.plot.line("trend", 'b')
+        self.plot.set_labels('Timestamp', self.metric_combo.currentText())
+        self.plot.set_title(f'Trend View for {self.mqtt_tag}')
+        self.plot.grid()
         self.timer.stop()
         self.timer.setInterval(1000)
         self.timer.start()
@@ -85,28 +103,25 @@ class TrendViewFeature:
             self.feature_result.setText("No project or tag selected for Trend View plotting.")
             return
 
-        data = self.db.get_tag_values(self.project_name, self.mqtt_tag)
-        if not data:
+        metric = self.metric_combo.currentData()
+        if self.series is None or (self.series.tag_name, self.series.metric) != (self.mqtt_tag, metric):
+            self.series = MetricSeries(self.parent.metrics_store, self.project_name, self.mqtt_tag, metric,
+                                       TREND_SPAN_NS)
+        timestamps, values = self.series.refresh()
+        if not len(timestamps):
             self.feature_result.setText(f"No MQTT data received for {self.mqtt_tag} yet.")
             return
 
-        timestamps = [entry["timestamp"] for entry in data]
-        values = [entry["values"][-1] for entry in data]
-        self.feature_result.setText(f"Trend Data for {self.mqtt_tag}:\nLatest value: {values[-1]} at {timestamps[-1]}")
+        self.feature_result.setText(f"Trend Data for {self.mqtt_tag}:\n"
+                                    f"Latest {METRIC_LABELS[metric]}: {values[-1]:.3f} at {format_ns(timestamps[-1])}")
+        self.plot.set_labels('Timestamp', METRIC_LABELS[metric])
 
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        ax.plot(timestamps, values, 'b-')
-        ax.set_xlabel('Timestamp')
-        ax.set_ylabel('Value (m/s)')
-        ax.set_title(f'Trend View for {self.mqtt_tag}')
-        ax.grid(True)
-        ax.tick_params(axis='x', rotation=45)
-        self.canvas.draw()
+        self.trend_line.set_data(to_seconds(timestamps), values)
+        self.plot.autoscale()
+        self.plot.draw()
 
     def on_data_received(self, tag_name, values):
-        if tag_name == self.mqtt_tag:
-            self.update_plot()
+        pass  # The timer polls the metric store once a second
 
     def get_widget(self):
         return self.widget
\ No newline at end of file
@@ -7,6 +7,18 @@ import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
+WATERFALL_FRAMES = 10
+
+def compute_waterfall(token, frame_store, project_name, tag_name, metadata):
+    data = frame_store.tag_values(project_name, tag_name, WATERFALL_FRAMES)
+    if not data or token.cancelled:
+        return None
+    frames = [d["values"] for d in data]
+    length = min(min(len(frame) for frame in frames), metadata.frame_length)
+    Z = np.array([frame[:length] for frame in frames])
+    X, Y = np.meshgrid(metadata.frame_times(length), np.arange(Z.shape[0]))
+    return {"X": X, "Y": Y, "Z": Z, "unit": metadata.unit}
+
 class WaterfallFeature:
     def __init__(self, parent, db, project_name):
         self.parent = parent
@@ -85,24 +97,24 @@ class WaterfallFeature:
             self.feature_result.setText("No project or tag selected for Waterfall plotting.")
             return
 
-        data = self.db.get_tag_values(self.project_name, self.mqtt_tag)
-        if not data:
+        self.parent.compute_pool.submit(f"waterfall:{id(self)}", compute_waterfall, self.parent.frame_store,
+                                        self.project_name, self.mqtt_tag,
+                                        self.parent.metadata_store.get(self.project_name, self.mqtt_tag),
+                                        on_result=self.apply_waterfall)
+
+    def apply_waterfall(self, result):
+        if result is None:
             self.feature_result.setText(f"No MQTT data received for {self.mqtt_tag} yet.")
             return
 
-        waterfall_data = [d["values"] for d in data[-10:]]
-        self.feature_result.setText(f"Waterfall Data for {self.mqtt_tag}:\nLatest message count: {len(waterfall_data)}")
+        self.feature_result.setText(f"Waterfall Data for {self.mqtt_tag}:\nLatest message count: {len(result['Z'])}")
 
         self.figure.clear()
         ax = self.figure.add_subplot(111, projection='3d')
-        X = np.linspace(0, 10.24, 1024)
-        Y = np.arange(len(waterfall_data))
-        X, Y = np.meshgrid(X, Y)
-        Z = np.array(waterfall_data)
-        ax.plot_surface(X, Y, Z, cmap='viridis')
+        ax.plot_surface(result["X"], result["Y"], result["Z"], cmap='viridis')
         ax.set_xlabel('Time (s)')
         ax.set_ylabel('Message Index')
-        ax.set_zlabel('Value (m/s)')
+        ax.set_zlabel(f"Value ({result['unit']})" if result["unit"] else "Value")
         ax.set_title(f'Waterfall for {self.mqtt_tag}')
         self.canvas.draw()
 
@@ -0,0 +1,119 @@
+import json
+import threading
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Frames are published as a small JSON envelope:
+#   {"seq": 41, "ts": 1738332000000000000, "sr": 4096, "epoch": 1738331959000000000, "values": [...]}
+# seq counts frames per topic from publisher start, ts is the source time of the first
+# sample in epoch ns and sr the sample rate. epoch identifies the publisher run (its start
+# time in ns), so seq 0 of a new run is not mistaken for seq 0 of the last one; it is
+# optional for older publishers. Bare CSV payloads are still accepted and come back
+# without a header.
+
+
+def encode_envelope(seq, timestamp_ns, sample_rate, values, epoch=None):
+    message = {"seq": int(seq), "ts": int(timestamp_ns), "sr": sample_rate, "values": values}
+    if epoch is not None:
+        message["epoch"] = int(epoch)
+    return json.dumps(message, separators=(",", ":"))
+
+
+def decode_payload(payload):
+    # Returns (header, values); header is None for legacy CSV payloads
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    payload = payload.strip()
+    if payload.startswith("{"):
+        message = json.loads(payload)
+        values = [float(x) for x in message.pop("values", [])]
+        if "seq" not in message or "ts" not in message:
+            raise ValueError("Envelope is missing seq or ts")
+        epoch = message.get("epoch")
+        return {"seq": int(message["seq"]), "ts": int(message["ts"]), "sr": message.get("sr"),
+                "epoch": None if epoch is None else int(epoch)}, values
+    return None, [float(x.strip()) for x in payload.split(",") if x.strip()]
+
+
+class SequenceTracker:
+    # Per-tag bookkeeping of the last accepted sequence number. A frame at or below it is a
+    # redelivery, unless its source time moved forward, which means the publisher restarted
+    # and began counting from zero again. Each run of a publisher is a stream with its own
+    # epoch: the envelope's when it has one, otherwise the source time of the first frame
+    # after the restart. Stored frames are keyed by (epoch, seq).
+    NEW, GAP, RESET, DUPLICATE = "new", "gap", "reset", "duplicate"
+
+    def __init__(self, seed=None):
+        self.seed = seed  # callable(tag_name) -> (last_seq, last_ts, epoch) or None, used on first sight
+        self.lock = threading.Lock()
+        self.last = {}
+        self.counters = {}
+
+    def check(self, tag_name, seq, timestamp_ns, epoch=None):
+        with self.lock:
+            known = tag_name in self.last
+        last = self.last.get(tag_name) if known else self.seed_for(tag_name)
+        with self.lock:
+            counters = self.counters.setdefault(tag_name, {"frames": 0, "gaps": 0, "missing": 0, "duplicates": 0,
+                                                           "resets": 0})
+            if last is None:
+                status = self.NEW
+            elif epoch is not None and epoch != last[2]:
+                counters["resets"] += 1
+                status = self.RESET
+            elif seq <= last[0]:
+                if epoch is not None or timestamp_ns <= last[1]:
+                    counters["duplicates"] += 1
+                    self.last[tag_name] = last
+                    return self.DUPLICATE
+                counters["resets"] += 1
+                status = self.RESET
+                epoch = timestamp_ns if epoch is None else epoch
+            elif seq > last[0] + 1:
+                counters["gaps"] += 1
+                counters["missing"] += seq - last[0] - 1
+                status = self.GAP
+            else:
+                status = self.NEW
+            if epoch is None and last is not None:
+                epoch = last[2]
+            counters["frames"] += 1
+            self.last[tag_name] = (seq, timestamp_ns, epoch)
+        if status == self.GAP:
+            logging.warning(f"Sequence gap on {tag_name}: expected {last[0] + 1}, got {seq}")
+        elif status == self.RESET:
+            logging.info(f"Publisher restart detected on {tag_name} (seq {last[0]} -> {seq})")
+        return status
+
+    def epoch(self, tag_name):
+        # Epoch of the stream the last accepted frame of tag_name belongs to
+        with self.lock:
+            last = self.last.get(tag_name)
+        return last[2] if last else None
+
+    def seed_for(self, tag_name):
+        if not self.seed:
+            return None
+        try:
+            return self.seed(tag_name)
+        except Exception as e:
+            # Storage may be down; carry on without history rather than lose the frame
+            logging.warning(f"Could not load last sequence for {tag_name}: {str(e)}")
+            return None
+
+    def reset(self):
+        # Forget the last sequence numbers but keep the counters, e.g. when a replay loops
+        with self.lock:
+            self.last.clear()
+            self.seed = None
+
+    def stats(self, tag_name=None):
+        with self.lock:
+            if tag_name is not None:
+                return dict(self.counters.get(tag_name, {}))
+            totals = {"gaps": 0, "missing": 0, "duplicates": 0, "resets": 0}
+            for counters in self.counters.values():
+                for key in totals:
+                    totals[key] += counters[key]
+            return totals
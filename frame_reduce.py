@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from codec import decode_engineering
+from timeutil import to_datetime64, format_ns
+
+# Kept free of Qt/matplotlib imports: spawned worker processes import this module.
+
+GAP_SPACINGS = 5  # No data for this many typical point spacings is reported as a gap
+
+_process_pool = None
+
+
+def get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # spawn rather than fork: forking a process that runs Qt and MQTT threads is unsafe
+        _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        GAP_SPACINGS = 5  # No data for this many typical point spacings is reported as a gap
+
+_process_pool = None
+
+
+def decimate(times, values, max_points):
+    # Min/max per bucket keeps peaks visible while bounding the points handed to the plot
+    if len(values) <= max_points:
+        return times, values
+    bucket = int(np.ceil(len(values) / (max_points // 2)))
+    buckets = len(values) // bucket
+    head_values = values[:buckets * bucket].reshape(buckets, bucket)
+    head_times = times[:buckets * bucket].reshape(buckets, bucket)
+    rows = np.arange(buckets)
+    lo, hi = head_values.argmin(axis=1), head_values.argmax(axis=1)
+    first, second = np.minimum(lo, hi), np.maximum(lo, hi)
+    out_values = np.column_stack([head_values[rows, first], head_values[rows, second]]).ravel()
+    out_times = np.column_stack([head_times[rows, first], head_times[rows, second]]).ravel()
+    return out_times, out_values
+
+
+def find_gaps(times, bucket, start, end):
+    # (gap start, gap end) of the stretches of [start, end] without data
+    if not len(times):
+        return [(start, end)]
+    spacing = np.median(np.diff(times)) if len(times) > 1 else bucket
+    threshold = max(GAP_SPACINGS * spacing, 2 * bucket)
+    edges = np.concatenate(([start - bucket // 2], times, [end + bucket // 2]))
+    wide = np.flatnonzero(np.diff(edges) > threshold)
+    return [(max(int(edges[i]) + bucket // 2, start), min(int(edges[i + 1]) - bucket // 2, end)) for i in wide]
+
+
+def metrics_fill(metrics_store, project_name, tag_name, gaps, origin, bucket_ns):
+    # Per-frame min/max metrics inside the gaps, as (bucket starts, mins, maxs) on the grid
+    # origin + k * bucket_ns. Metrics are kept for every frame, also the ones the triggered
+    # capture mode never stored raw, so they stand in where frames are missing.
+    empty = np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    if metrics_store is None or not gaps:
+        return empty
+    first, last = gaps[0][0], gaps[-1][1]
+    times, mins = metrics_store.get_series(project_name, tag_name, "min", first, last)
+    max_times, maxs = metrics_store.get_series(project_name, tag_name, "max", first, last)
+    if not len(times) or len(max_times) != len(times):
+        return empty
+    inside = np.zeros(len(times), dtype=bool)
+    for gap_start, gap_end in gaps:
+        inside |= (times >= gap_start) & (times <= gap_end)
+    if not inside.any():
+        return empty
+    index, inverse = np.unique((times[inside] - origin) // bucket_ns, return_inverse=True)
+    bucket_mins = np.full(len(index), np.inf)
+    bucket_maxs = np.full(len(index), -np.inf)
+    np.minimum.at(bucket_mins, inverse, mins[inside])
+    np.maximum.at(bucket_maxs, inverse, maxs[inside])
+    return origin + index * bucket_ns, bucket_mins, bucket_maxs
+
+
+def decode_and_reduce(docs, start, bucket_ns, buckets, sample_rate=None):
+    # docs: encoded frames from FrameStore.read_raw. Sample i sits i/sample_rate seconds
+    # after the frame timestamp; without a rate each frame is taken to span one second.
+    # Reduces the chunk to min/max per bucket of the grid shared by the whole report, so
+    # chunks can be combined in any order without losing resolution (see GridReduction).
+    if not docs:
+        return None
+    frame_times = np.array([doc["timestamp"] for doc in docs], dtype=np.int64)
+    frames = [decode_engineering(doc) for doc in docs]
+    lengths = np.array([len(frame) for frame in frames])
+    values = np.concatenate(frames)
+    offsets = np.concatenate([np.arange(n) * (1e9 / (sample_rate or max(n, 1))) for n in lengths]).astype(np.int64)
+    times = np.repeat(frame_times, lengths) + offsets
+    index = np.clip((times - start) // bucket_ns, 0, buckets - 1)
+    index, inverse = np.unique(index, return_inverse=True)
+    mins = np.full(len(index), np.inf)
+    maxs = np.full(len(index), -np.inf)
+    np.minimum.at(mins, inverse, values)
+    np.maximum.at(maxs, inverse, values)
+    last = next((i for i in range(len(frames) - 1, -1, -1) if len(frames[i])), None)
+    return {
+        "frames": len(docs),
+        "index": index,
+        "mins": mins,
+        "maxs": maxs,
+        "latest": None if last is None else (int(frame_times[last]), float(frames[last][-1])),
+        "recent": [(int(doc["timestamp"]), frame[-5:].tolist()) for doc, frame in zip(docs[-5:], frames[-5:])],
+    }
+
+
+# Min/max of every bucket of a fixed grid over [start, end] for one tag. Chunk results from
+# decode_and_reduce are folded in as they arrive; earlier chunks keep their resolution
+# however many follow.
+class GridReduction:
+    def __init__(self, start, end, buckets):
+        self.start = start
+        self.buckets = buckets
+        self.end = end
+        self.bucket_ns = max(-(-(end - start) // buckets), 1)
+        self.mins = np.full(buckets, np.inf)
+        self.maxs = np.full(buckets, -np.inf)
+        self.frames = 0
+        self.latest = None
+        self.recent = []
+        self.gaps = []
+        self.fill = None
+
+    def add(self, part):
+        if not part:
+            return
+        np.minimum.at(self.mins, part["index"], part["mins"])
+        np.maximum.at(self.maxs, part["index"], part["maxs"])
+        self.frames += part["frames"]
+        if part["latest"] and (self.latest is None or part["latest"][0] >= self.latest[0]):
+            self.latest = part["latest"]
+        self.recent = sorted(self.recent + part["recent"], key=lambda entry: entry[0])[-5:]
+
+    def centres(self, index):
+        return self.start + index * self.bucket_ns + self.bucket_ns // 2
+
+    def fill_gaps(self, metrics_store, project_name, tag_name, end=None):
+        # Once all chunks are in: finds the stretches without frames up to `end` (the
+        # report end, or now when the report reaches into the future) and fills the empty
+        # buckets there from the per-frame min/max metrics
+        end = self.end if end is None else min(end, self.end)
+        filled = np.flatnonzero(np.isfinite(self.mins))
+        self.gaps = find_gaps(self.centres(filled), self.bucket_ns, self.start, end)
+        times, mins, maxs = metrics_fill(metrics_store, project_name, tag_name, self.gaps, self.start, self.bucket_ns)
+        index = (times - self.start) // self.bucket_ns
+        keep = (index >= 0) & (index < self.buckets)
+        keep[keep] = ~np.isfinite(self.mins[index[keep]])
+        if keep.any():
+            self.fill = index[keep], mins[keep], maxs[keep]
+
+    def result(self):
+        # Plot-ready (min, max) pairs at the bucket centres, or None without any data
+        if not self.frames and self.fill is None:
+            return None
+        filled = np.flatnonzero(np.isfinite(self.mins))
+        fill_index, fill_mins, fill_maxs = self.fill or (np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+        return {
+            "frames": self.frames,
+            "times": to_datetime64(np.repeat(self.centres(filled), 2)),
+            "values": np.column_stack([self.mins[filled], self.maxs[filled]]).ravel(),
+            "fill_times": to_datetime64(np.repeat(self.centres(fill_index), 2)),
+            "fill_values": np.column_stack([fill_mins, fill_maxs]).ravel(),
+            "gaps": self.gaps,
+            "latest_value": self.latest[1] if self.latest else None,
+            "recent": [(format_ns(timestamp), values) for timestamp, values in self.recent],
+        }
@@ -0,0 +1,216 @@
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, WTimeoutError
+import numpy as np
+from codec import DEFAULT_CODEC, CODECS, encode_frame, decode_engineering
+from timeutil import to_ns
+from query_cache import QueryCache
+import settings
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Errors that mean the database is unreachable or too slow right now, as opposed to a
+# write it rejected; the first kind is worth retrying later
+TRANSIENT_ERRORS = (ConnectionFailure, ExecutionTimeout, WTimeoutError)
+LEGACY_SEQ_INDEX = "project_name_1_tag_name_1_seq_1"  # Unique on seq alone; clashes across publisher runs
+
+class FrameStore:
+    def __init__(self, db):
+        self.db = db
+        self.frames_collection = db.tags_collection.database["tag_frames"]
+        self.frames_collection.create_index([("project_name", ASCENDING), ("tag_name", ASCENDING), ("timestamp", ASCENDING)])
+        # Frames from an envelope carry a per-tag sequence number and the epoch of the
+        # publisher run; the unique index makes their write idempotent so a QoS 1
+        # redelivery cannot be stored twice, while a restarted publisher starts a new key range
+        if LEGACY_SEQ_INDEX in self.frames_collection.index_information():
+            self.frames_collection.drop_index(LEGACY_SEQ_INDEX)
+        self.frames_collection.create_index([("project_name", ASCENDING), ("tag_name", ASCENDING), ("epoch", ASCENDING),
+                                             ("seq", ASCENDING)],
+                                            unique=True, partialFilterExpression={"seq": {"$exists": True}})
+        self.codec_cache = {}
+        self.cache = QueryCache(int(settings.get("query_cache_mb") * 1024 * 1024))
+
+    def get_codec(self, project_name, tag_name):
+        key = (project_name, tag_name)
+        if key not in self.codec_cache:
+            tag = self.db.tags_collection.find_one({"project_name": project_name, "tag_name": tag_name}, {"codec": 1})
+            self.codec_cache[key] = (tag or {}).get("codec", DEFAULT_CODEC)
+        return self.codec_cache[key]
+
+    def set_codec(self, project_name, tag_name, codec_name):
+        if codec_name not in CODECS:
+            return False, f"Unknown codec {codec_name}. Available: {', '.join(CODECS)}"
+        self.db.tags_collection.update_one({"project_name": project_name, "tag_name": tag_name},
+                                           {"$set": {"codec": codec_name}})
+        self.codec_cache[(project_name, tag_name)] = codec_name
+        return True, f"Codec for {tag_name} set to {codec_name}"
+
+    def write_frame(self, project_name, tag_name, values, timestamp, seq=None, sample_rate=None, epoch=None,
+                    scale=None, offset=None):
+        # values are raw counts when scale/offset are given (engineering = raw * scale + offset),
+        # otherwise already in engineering units
+        try:
+            values = np.asarray(values, dtype=np.float64)
+            doc = encode_frame(values, self.get_codec(project_name, tag_name))
+            doc.update({"project_name": project_name, "tag_name": tag_name, "timestamp": to_ns(timestamp)})
+            if scale is not None:
+                # Not "scale": the delta codec keeps its own fixed-point scale under that key
+                doc.update({"eng_scale": float(scale), "eng_offset": float(offset or 0.0)})
+                values = values * doc["eng_scale"] + doc["eng_offset"]
+            if len(values):
+                # Per-frame envelope lets plots of long ranges skip decoding entirely
+                doc.update({"min": float(values.min()), "max": float(values.max())})
+            if sample_rate:
+                doc["sample_rate"] = float(sample_rate)
+            if seq is None:
+                self.frames_collection.insert_one(doc)
+            else:
+                doc["seq"] = int(seq)
+                doc["epoch"] = None if epoch is None else int(epoch)
+                result = self.frames_collection.update_one(
+                    {"project_name": project_name, "tag_name": tag_name, "epoch": doc["epoch"], "seq": doc["seq"]},
+                    {"$setOnInsert": doc}, upsert=True)
+                if result.upserted_id is None:
+                    return True, f"Frame {seq} for {tag_name} already stored"
+            self.cache.append(project_name, tag_name, doc["timestamp"], values)
+            return True, f"Stored {doc['n']} values for {tag_name} ({len(doc['data'])} bytes, {doc['codec']})"
+        except TRANSIENT_ERRORS:
+            # Left to the caller, which can keep the frame for later
+            raise
+        except Exception as e:
+            logging.error(f"Failed to store frame for {tag_name}: {str(e)}")
+            return False, str(e)
+
+    def last_sequence(self, project_name, tag_name):
+        # (seq, timestamp, epoch) of the newest sequenced frame, to resume duplicate detection after a restart
+        doc = self.frames_collection.find_one({"project_name": project_name, "tag_name": tag_name, "seq": {"$exists": True}},
+                                              {"seq": 1, "timestamp": 1, "epoch": 1}, sort=[("timestamp", DESCENDING)])
+        return (doc["seq"], doc["timestamp"], doc.get("epoch")) if doc else None
+
+    def write_frames(self, project_name, tag_name, frames):
+        docs = []
+        for timestamp, values in frames:
+            values = np.asarray(values, dtype=np.float64)
+            doc = encode_frame(values, self.get_codec(project_name, tag_name))
+            doc.update({"project_name": project_name, "tag_name": tag_name, "timestamp": to_ns(timestamp)})
+            if len(values):
+                doc.update({"min": float(values.min()), "max": float(values.max())})
+            docs.append(doc)
+        if not docs:
+            return True, "No frames to store"
+        try:
+            self.frames_collection.insert_many(docs, ordered=False)
+            # Bulk loads usually land in the past; cheaper to drop cached ranges than merge
+            self.cache.invalidate(project_name, tag_name)
+            return True, f"Stored {len(docs)} frames for {tag_name}"
+        except Exception as e:
+            logging.error(f"Failed to bulk store frames for {tag_name}: {str(e)}")
+            return False, str(e)
+
+    def range_query(self, project_name, tag_name, start, end):
+        query = {"project_name": project_name, "tag_name": tag_name}
+        time_range = {}
+        if start is not None:
+            time_range["$gte"] = to_ns(start)
+        if end is not None:
+            time_range["$lte"] = to_ns(end)
+        if time_range:
+            query["timestamp"] = time_range
+        return query
+
+    def count_frames(self, project_name, tag_name, start=None, end=None):
+        return self.frames_collection.count_documents(self.range_query(project_name, tag_name, start, end))
+
+    def read_frames(self, project_name, tag_name, start=None, end=None, limit=0, latest=False, batch_size=1000):
+        query = self.range_query(project_name, tag_name, start, end)
+        cursor = self.frames_collection.find(query).sort("timestamp", DESCENDING if latest else ASCENDING).limit(limit)
+        for doc in cursor.batch_size(batch_size):
+            yield doc["timestamp"], decode_engineering(doc)
+
+    def cached_frames(self, project_name, tag_name, start=None, end=None, limit=0):
+        # (int64 timestamps, list of read-only value arrays), oldest first; limit keeps the
+        # newest frames. Served from the query cache when the same range was read before.
+        start = to_ns(start) if start is not None else None
+        end = to_ns(end) if end is not None else None
+        cached = self.cache.get(project_name, tag_name, start, end, limit)
+        if cached is not None:
+            return cached
+        frames = list(self.read_frames(project_name, tag_name, start, end, limit, latest=bool(limit)))
+        if limit:
+            frames.reverse()
+        timestamps = [int(timestamp) for timestamp, _ in frames]
+        return self.cache.put(project_name, tag_name, start, end, limit, timestamps, [values for _, values in frames])
+
+    def tag_values(self, project_name, tag_name, count=1):
+        # Newest frames as [{"timestamp", "values"}], the shape Database.get_tag_values returns
+        timestamps, frames = self.cached_frames(project_name, tag_name, limit=count)
+        return [{"timestamp": int(timestamp), "values": values} for timestamp, values in zip(timestamps, frames)]
+
+    def read_raw(self, project_name, tag_name, start=None, end=None, batch_size=1000):
+        # Encoded frames straight from the cursor, for callers that decode elsewhere
+        query = self.range_query(project_name, tag_name, start, end)
+        cursor = self.frames_collection.find(query, {"_id": 0, "project_name": 0, "tag_name": 0, "min": 0, "max": 0})
+        return cursor.sort("timestamp", ASCENDING).batch_size(batch_size)
+
+    def latest_frames(self, project_name, tag_name, count=1):
+        frames = list(self.read_frames(project_name, tag_name, limit=count, latest=True))
+        frames.reverse()
+        return frames
+
+    def frame_index(self, project_name, tag_name, start=None, end=None, batch_size=10000):
+        # (timestamps, sample counts, sample rates) of every frame in the range, without the
+        # payloads; 0 means the frame carries no sample rate of its own
+        query = self.range_query(project_name, tag_name, start, end)
+        cursor = self.frames_collection.find(query, {"_id": 0, "timestamp": 1, "n": 1, "sample_rate": 1})
+        timestamps, counts, rates = [], [], []
+        for doc in cursor.sort("timestamp", ASCENDING).batch_size(batch_size):
+            timestamps.append(doc["timestamp"])
+            counts.append(doc.get("n", 0))
+            rates.append(doc.get("sample_rate", 0.0))
+        return (np.array(timestamps, dtype=np.int64), np.array(counts, dtype=np.int64),
+                np.array(rates, dtype=np.float64))
+
+    def decode_envelope(self, project_name, tag_name, start=None, end=None, batch_size=1000):
+        # (timestamp, min, max) of the frames that envelope_buckets cannot see because they
+        # were stored without min/max; each one has to be decoded
+        query = self.range_query(project_name, tag_name, start, end)
+        query["min"] = {"$exists": False}
+        for doc in self.frames_collection.find(query).sort("timestamp", ASCENDING).batch_size(batch_size):
+            values = decode_engineering(doc)
+            if len(values):
+                yield doc["timestamp"], float(values.min()), float(values.max())
+
+    def envelope_buckets(self, project_name, tag_name, start, end, bucket_ns):
+        # Server-side rollup of the per-frame min/max into fixed buckets starting at `start`;
+        # only one document per bucket comes back, however many frames the range holds
+        start, end, bucket_ns = to_ns(start), to_ns(end), int(bucket_ns)
+        query = self.range_query(project_name, tag_name, start, end)
+        query["min"] = {"$exists": True}
+        pipeline = [
+            {"$match": query},
+            {"$group": {"_id": {"$subtract": ["$timestamp", {"$mod": [{"$subtract": ["$timestamp", start]}, bucket_ns]}]},
+                        "min": {"$min": "$min"}, "max": {"$max": "$max"}}},
+            {"$sort": {"_id": ASCENDING}},
+        ]
+        docs = list(self.frames_collection.aggregate(pipeline, allowDiskUse=True))
+        return (np.array([doc["_id"] for doc in docs], dtype=np.int64), np.array([doc["min"] for doc in docs]),
+                np.array([doc["max"] for doc in docs]))
+
+    def migrate_legacy_timestamps(self, batch_size=1000):
+        # Frames written before timestamps became epoch ns carry ISO strings, which
+        # neither sort nor range-match together with the integers
+        return migrate_string_field(self.frames_collection, "timestamp", batch_size)
+
+
+def migrate_string_field(collection, field, batch_size=1000):
+    converted = 0
+    ops = []
+    for doc in collection.find({field: {"$type": "string"}}, {field: 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {field: to_ns(doc[field])}}))
+        if len(ops) >= batch_size:
+            converted += collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        converted += collection.bulk_write(ops, ordered=False).modified_count
+    logging.info(f"Converted {converted} {collection.name}.{field} values to epoch ns")
+    return converted
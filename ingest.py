@@ -0,0 +1,324 @@
+import paho.mqtt.client as mqtt
+import threading
+import numpy as np
+from timeutil import now_ns
+from frame_store import FrameStore, TRANSIENT_ERRORS
+from summaries import SummaryStore
+from replay import FrameRecorder, FrameReplayer
+from metrics import frame_metrics, MetricsStore
+from alarms import AlarmEngine
+from tag_metadata import TagMetadataStore
+from frame_envelope import decode_payload, SequenceTracker
+from spool import IngestSpool, SpoolFrame
+from capture import CapturePolicy
+import profiler
+import settings
+import os
+import re
+import socket
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
+
+SUBSCRIBE_BATCH = 200  # Topics per SUBSCRIBE/UNSUBSCRIBE packet
+
+def mqtt_client_id(client_name, project_name):
+    # Stable across restarts, so the persistent session survives, but different for every
+    # installation: two clients with the same id keep disconnecting each other
+    station = settings.get("station_id") or socket.gethostname()
+    return f"sarayu-{station}-{client_name}-{project_name}"
+
+
+# Receive -> parse -> store path for one project, with no Qt dependency so it can run
+# inside the dashboard (via MQTTHandler) or in the headless ingest daemon. Consumers hook
+# in through two plain callbacks: on_frame(tag_name, timestamp, values) and on_alarm(event),
+# both called on the MQTT (or replay) thread, and other processes through shared frame rings.
+class IngestService:
+    def __init__(self, db, project_name, frame_store=None, summary_store=None, metrics_store=None,
+                 metadata_store=None, tags=None, client_name="dashboard", on_frame=None, on_alarm=None, rings=None):
+        self.db = db
+        self.project_name = project_name
+        self.frame_store = frame_store or FrameStore(db)
+        self.summary_store = summary_store or SummaryStore(db)
+        self.metrics_store = metrics_store or MetricsStore(db)
+        self.metadata_store = metadata_store or TagMetadataStore(db)
+        self.alarm_engine = AlarmEngine(db, project_name)
+        self.tags = tags  # Explicit topic list; None subscribes to every tag of the project
+        self.on_frame = on_frame
+        self.on_alarm = on_alarm
+        self.rings = rings  # Optional FrameRingWriter shared with dashboards on this machine
+        self.legacy_tag_values = settings.get("legacy_tag_values")
+        self.lock = threading.Lock()
+        self.counters = {"received": 0, "stored": 0, "spooled": 0, "duplicates": 0, "rejected": 0, "errors": 0}
+        self.last_frame_ns = None
+        self.connected = False
+        self.sequence_tracker = SequenceTracker(lambda tag_name: self.frame_store.last_sequence(self.project_name, tag_name))
+        spool_dir = os.path.join(settings.get("spool_dir"), re.sub(r"[^A-Za-z0-9_.-]", "_", project_name))
+        self.spool = IngestSpool(spool_dir, self.store_batch, rate_limit=settings.get("spool_replay_rate"))
+        self.spool.start()
+        self.capture = CapturePolicy(db, project_name, self.write_raw)
+        # A persistent session lets the broker queue QoS 1 frames while we are disconnected
+        self.client = mqtt.Client(client_id=mqtt_client_id(client_name, project_name), clean_session=False)
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_message = self.on_message
+        self.broker = settings.get("mqtt_broker")
+        self.port = settings.get("mqtt_port")
+        self.subscribed_topics = set()
+        self.running = False
+        self.storing = True  # False while a recording is replayed only to drive the views
+        self.recorder = None
+        self.replayer = None
+
+    def connect(self):
+        try:
+            self.client.connect(self.broker, self.port, keepalive=60)
+            logging.info(f"Connected to MQTT broker at {self.broker}:{self.port}")
+        except Exception as e:
+            logging.error(f"Failed to connect to MQTT broker: {str(e)}")
+            raise
+
+    def start(self):
+        if not self.running:
+            self.connect()
+            self.client.loop_start()
+            self.running = True
+            logging.info("MQTT loop started")
+
+    def stop(self):
+        if self.replayer:
+            self.replayer.stop()
+            self.replayer = None
+            self.running = False
+            logging.info("Replay stopped")
+        if self.running:
+            self.client.loop_stop()
+            self.client.disconnect()
+            self.running = False
+            self.subscribed_topics.clear()
+            logging.info("MQTT loop stopped and client disconnected")
+        self.stop_recording()
+        self.spool.stop()
+        if self.rings:
+            self.rings.close()
+
+    def start_recording(self, path):
+        self.stop_recording()
+        self.recorder = FrameRecorder(path)
+
+    def stop_recording(self):
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+    def start_replay(self, path, speed=1.0, loop=False, store=False):
+        # Feeds a recording through on_message instead of connecting to the broker. Unless
+        # store is set, frames only reach the views: nothing is written, and duplicate
+        # detection starts afresh instead of from storage, which would hold every frame of a
+        # recording made from this project and drop them all.
+        if not self.running:
+            self.storing = store
+            if not store:
+                self.sequence_tracker.reset()
+            self.replayer = FrameReplayer(self, path, speed, loop)
+            self.replayer.start()
+            self.running = True
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            logging.info(f"Connected to MQTT broker with result code {rc}")
+            self.connected = True
+            self.subscribe_to_topics()
+        else:
+            logging.error(f"Connection failed with result code {rc}")
+
+    def on_disconnect(self, client, userdata, rc):
+        self.connected = False
+        if rc != 0:
+            # paho reconnects by itself; subscribe again once it does
+            logging.warning(f"Unexpected disconnect from MQTT broker (rc={rc}); reconnecting")
+            self.subscribed_topics.clear()
+
+    def subscribe_to_topics(self):
+        if self.tags is not None:
+            topics = list(self.tags)
+        else:
+            topics = [tag["tag_name"] for tag in self.db.tags_collection.find({"project_name": self.project_name},
+                                                                              {"tag_name": 1})]
+        if not topics:
+            # Keep what is subscribed: an empty read is more likely a hiccup than every tag deleted
+            logging.warning(f"No tags found for project {self.project_name}")
+            return
+        # Tags deleted since the last pass are dropped as well
+        wanted = set(topics)
+        self.unsubscribe([topic for topic in self.subscribed_topics if topic not in wanted])
+        self.subscribe(topics)
+
+    def subscribe(self, topics):
+        # Many topics per SUBSCRIBE packet instead of one round-trip each
+        topics = [topic for topic in dict.fromkeys(topics) if topic not in self.subscribed_topics]
+        for i in range(0, len(topics), SUBSCRIBE_BATCH):
+            batch = topics[i:i + SUBSCRIBE_BATCH]
+            result, mid = self.client.subscribe([(topic, 1) for topic in batch])
+            if result != mqtt.MQTT_ERR_SUCCESS:
+                logging.error(f"Failed to subscribe to {len(batch)} topics (rc={result})")
+                continue
+            self.subscribed_topics.update(batch)
+        if topics:
+            logging.info(f"Subscribed to {len(topics)} topics")
+
+    def unsubscribe(self, topics):
+        topics = [topic for topic in dict.fromkeys(topics) if topic in self.subscribed_topics]
+        for i in range(0, len(topics), SUBSCRIBE_BATCH):
+            batch = topics[i:i + SUBSCRIBE_BATCH]
+            self.client.unsubscribe(batch)
+            self.subscribed_topics.difference_update(batch)
+        if topics:
+            logging.info(f"Unsubscribed from {len(topics)} topics")
+
+    def on_message(self, client, userdata, msg):
+        session = profiler.session
+        if session is not None:
+            return session.run(self.handle_message, msg)
+        return self.handle_message(msg)
+
+    def handle_message(self, msg):
+        topic = msg.topic
+        if self.recorder:
+            self.recorder.record(topic, msg.payload)
+        logging.debug(f"Received message on {topic}: {msg.payload[:50]}...")
+        self.count("received")
+
+        try:
+            header, raw = decode_payload(msg.payload)
+            if not raw:
+                raise ValueError("Empty or invalid payload")
+            tag_name = topic
+            if header:
+                # Frames are placed by source time; receive-time jitter no longer leaks in
+                timestamp, seq = header["ts"], header["seq"]
+                if self.sequence_tracker.check(tag_name, seq, timestamp, header["epoch"]) == SequenceTracker.DUPLICATE:
+                    logging.debug(f"Dropped duplicate frame {seq} on {tag_name}")
+                    self.count("duplicates")
+                    return
+                epoch = self.sequence_tracker.epoch(tag_name)
+            else:
+                timestamp, seq, epoch = now_ns(), None, None
+            # Raw counts are what gets stored (and spooled); views, metrics and alarms work
+            # in engineering units
+            metadata = self.metadata_store.get(self.project_name, tag_name)
+            sample_rate = (header or {}).get("sr") or metadata.sample_rate
+            counts = np.asarray(raw, dtype=np.float64)
+            samples = metadata.to_engineering(counts)
+            values = raw if metadata.is_identity else samples.tolist()
+            metrics = frame_metrics(samples, sample_rate)
+            frame = SpoolFrame(tag_name, timestamp, seq, sample_rate, counts, epoch)
+            if self.storing:
+                store_raw = self.capture.accept(frame, metrics)
+                # While storage is down, frames go straight to the spool and are replayed later
+                # (in full: the spool does not know which ones the capture policy would skip)
+                if not (self.spool.available and self.store_frame(frame, metrics, values, store_raw, metadata)):
+                    self.spool.mark_unavailable()
+                    self.spool.append(frame)
+                    self.count("spooled")
+            self.last_frame_ns = now_ns()
+            if self.rings:
+                self.rings.write(tag_name, timestamp, samples, sample_rate)
+            if self.on_frame:
+                self.on_frame(tag_name, timestamp, values)
+            # A view-only replay shows its alarms but must not log them or trigger captures again
+            for event in self.alarm_engine.process(tag_name, metrics, timestamp, persist=self.storing):
+                if self.storing:
+                    self.capture.alarm(event)
+                if self.on_alarm:
+                    self.on_alarm(event)
+        except ValueError as ve:
+            self.count("errors")
+            logging.error(f"Invalid payload format on {topic}: {str(ve)}")
+        except Exception as e:
+            self.count("errors")
+            logging.error(f"Error processing message on {topic}: {str(e)}")
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def store_frame(self, frame, metrics=None, values=None, raw=True, metadata=None):
+        # The frame store goes first: sequenced writes are idempotent, so a frame that is
+        # spooled after a partial failure can be replayed safely. False means storage is
+        # unreachable and the frame should be kept for later; a frame the database rejects
+        # outright (e.g. its tag was deleted) is quarantined and counts as handled, so it
+        # cannot hold up everything behind it.
+        try:
+            # Spooled frames are scaled with the metadata in force when they are finally stored
+            metadata = metadata or self.metadata_store.get(self.project_name, frame.tag_name)
+            samples = metadata.to_engineering(frame.values)
+            if raw:
+                stored, frame_message = self.frame_store.write_frame(self.project_name, frame.tag_name, frame.values,
+                                                                     frame.timestamp, frame.seq, frame.sample_rate,
+                                                                     frame.epoch, metadata.scale, metadata.offset)
+                if not stored:
+                    return self.reject(frame, frame_message)
+                if self.legacy_tag_values:
+                    values = values if values is not None else samples.tolist()
+                    success, message = self.db.update_tag_value(self.project_name, frame.tag_name, values,
+                                                                frame.timestamp)
+                    if not success:
+                        return self.reject(frame, message)
+                logging.info(f"Stored {len(frame.values)} values for {frame.tag_name}")
+            else:
+                # Not persisted, but views in this process still read the newest frames
+                self.frame_store.cache.append(self.project_name, frame.tag_name, frame.timestamp, samples)
+            self.summary_store.update(self.project_name, frame.tag_name, samples, frame.timestamp)
+            if metrics is None:
+                metrics = frame_metrics(samples, frame.sample_rate or metadata.sample_rate)
+            self.metrics_store.append(self.project_name, frame.tag_name, frame.timestamp, metrics)
+            self.count("stored")
+            return True
+        except TRANSIENT_ERRORS as e:
+            logging.warning(f"Storage unavailable while storing frame for {frame.tag_name}: {str(e)}")
+            return False
+        except Exception as e:
+            return self.reject(frame, str(e))
+
+    def reject(self, frame, message):
+        logging.error(f"Quarantined frame for {frame.tag_name} at {frame.timestamp}: {message}")
+        self.count("rejected")
+        try:
+            self.spool.quarantine(frame)
+        except OSError as e:
+            logging.error(f"Failed to quarantine frame for {frame.tag_name}: {str(e)}")
+        return True
+
+    def write_raw(self, frame):
+        # Pre-trigger frames released by the capture policy; their metrics are already stored
+        try:
+            metadata = self.metadata_store.get(self.project_name, frame.tag_name)
+            stored, message = self.frame_store.write_frame(self.project_name, frame.tag_name, frame.values,
+                                                           frame.timestamp, frame.seq, frame.sample_rate, frame.epoch,
+                                                           metadata.scale, metadata.offset)
+        except TRANSIENT_ERRORS as e:
+            stored, message = False, str(e)
+        if not stored:
+            logging.error(f"Failed to store captured frame for {frame.tag_name}: {message}")
+        return stored
+
+    def store_batch(self, frames):
+        # Called by the spool's drain thread; a failure leaves the batch in the spool
+        for frame in frames:
+            if not self.store_frame(frame):
+                return False
+        return True
+
+    def health(self):
+        with self.lock:
+            counters = dict(self.counters)
+        counters.update({
+            "connected": self.connected or bool(self.replayer),
+            "subscribed": len(self.subscribed_topics),
+            "last_frame_age": (now_ns() - self.last_frame_ns) / 1e9 if self.last_frame_ns else None,
+            "sequence": self.sequence_tracker.stats(),
+            "spool": self.spool.stats(),
+            "capture": self.capture.stats(),
+        })
+        return counters
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+import logging
+from database import Database
+from frame_store import FrameStore
+from summaries import SummaryStore
+from metrics import MetricsStore
+from tag_metadata import TagMetadataStore
+from ingest import IngestService
+from shm_ring import FrameRingWriter
+import settings
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Headless ingest: receives, stores, spools and evaluates alarms for one or more projects
+# without any GUI. Run it under systemd or a container supervisor and set
+# "ingest_mode": "daemon" so dashboards only read what it stores.
+#
+# Config file (JSON), every key optional:
+#   {"email": "user@example.com", "broker": "192.168.1.173", "port": 1883,
+#    "projects": [{"name": "Plant A"}, {"name": "Plant B", "tags": ["sarayu/d1/topic1"]}],
+#    "health_file": "ingest_health.json", "health_interval": 10, "refresh_interval": 60,
+#    "capture_interval": 1}
+
+
+def load_config(path):
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_health(path, report):
+    # Write and rename so a monitor never reads a half-written file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+class IngestDaemon:
+    def __init__(self, config):
+        self.config = config
+        self.db = Database(email=config.get("email", "user@example.com"))
+        self.frame_store = FrameStore(self.db)
+        self.summary_store = SummaryStore(self.db)
+        self.metrics_store = MetricsStore(self.db)
+        self.metadata_store = TagMetadataStore(self.db)
+        self.health_file = config.get("health_file")
+        self.health_interval = config.get("health_interval", 10)
+        self.refresh_interval = config.get("refresh_interval", 60)
+        self.capture_interval = config.get("capture_interval", 1)
+        self.stop_event = threading.Event()
+        self.started = time.monotonic()
+        self.services = {}
+        for project in config.get("projects", []):
+            service = IngestService(self.db, project["name"], self.frame_store, self.summary_store,
+                                    self.metrics_store, self.metadata_store, tags=project.get("tags"),
+                                    client_name="ingest", rings=self.rings_for(project["name"]))
+            service.broker = config.get("broker", service.broker)
+            service.port = config.get("port", service.port)
+            self.services[project["name"]] = service
+
+    def rings_for(self, project_name):
+        if not self.config.get("shm_rings", settings.get("shm_rings")):
+            return None
+        return FrameRingWriter(project_name, self.config.get("shm_ring_slots", settings.get("shm_ring_slots")))
+
+    def start(self):
+        for name, service in self.services.items():
+            try:
+                service.start()
+            except Exception as e:
+                # paho keeps retrying once the loop runs; a broker that is down at boot is not fatal
+                logging.error(f"Failed to start ingest for {name}: {str(e)}")
+                service.client.connect_async(service.broker, service.port, keepalive=60)
+                service.client.loop_start()
+                service.running = True
+
+    def stop(self):
+        for name, service in self.services.items():
+            try:
+                service.stop()
+            except Exception as e:
+                logging.error(f"Failed to stop ingest for {name}: {str(e)}")
+
+    def health(self):
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.monotonic() - self.started, 1),
+            "projects": {name: service.health() for name, service in self.services.items()},
+        }
+
+    def report_health(self):
+        report = self.health()
+        for name, health in report["projects"].items():
+            age = health["last_frame_age"]
+            logging.info(f"[{name}] connected={health['connected']} received={health['received']} "
+                         f"stored={health['stored']} spooled={health['spooled']} "
+                         f"duplicates={health['duplicates']} errors={health['errors']} "
+                         f"last_frame={'never' if age is None else f'{age:.1f}s ago'} "
+                         f"spool_segments={health['spool']['segments']}")
+        if self.health_file:
+            try:
+                write_health(self.health_file, report)
+            except OSError as e:
+                logging.error(f"Failed to write health file {self.health_file}: {str(e)}")
+
+    def refresh_topics(self):
+        # Pick up tags created from a dashboard since the last pass
+        for name, service in self.services.items():
+            if service.connected and service.tags is None:
+                try:
+                    service.subscribe_to_topics()
+                except Exception as e:
+                    logging.error(f"Failed to refresh topics for {name}: {str(e)}")
+
+    def poll_captures(self):
+        # Capture requests from dashboards in reader mode
+        for name, service in self.services.items():
+            if service.capture.triggered:
+                try:
+                    service.capture.poll_requests()
+                except Exception as e:
+                    logging.error(f"Failed to poll capture requests for {name}: {str(e)}")
+
+    def run(self):
+        self.start()
+        next_health = next_refresh = next_capture = time.monotonic()
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            if now >= next_capture:
+                self.poll_captures()
+                next_capture = now + self.capture_interval
+            if now >= next_health:
+                self.report_health()
+                next_health = now + self.health_interval
+            if now >= next_refresh:
+                self.refresh_topics()
+                next_refresh = now + self.refresh_interval
+            self.stop_event.wait(max(min(next_health, next_refresh, next_capture) - time.monotonic(), 0.1))
+        logging.info("Shutting down ingest")
+        self.stop()
+        self.report_health()
+        self.db.close_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run MQTT ingest without the dashboard")
+    parser.add_argument("--config", help="JSON config file")
+    parser.add_argument("--email")
+    parser.add_argument("--project", action="append", help="Project to ingest; may be repeated")
+    parser.add_argument("--broker")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--health-file")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.email:
+        config["email"] = args.email
+    if args.project:
+        config["projects"] = [{"name": name} for name in args.project]
+    if args.broker:
+        config["broker"] = args.broker
+    if args.port:
+        config["port"] = args.port
+    if args.health_file:
+        config["health_file"] = args.health_file
+    config.setdefault("broker", settings.get("mqtt_broker"))
+    config.setdefault("port", settings.get("mqtt_port"))
+    if not config.get("projects"):
+        parser.error("No projects configured; pass --project or a config file with \"projects\"")
+
+    daemon = IngestDaemon(config)
+    signal.signal(signal.SIGINT, lambda signum, frame: daemon.stop_event.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop_event.set())
+    daemon.run()
@@ -1,9 +1,19 @@
 import sys
+import argparse
 from PyQt5.QtWidgets import QApplication
 from auth import AuthWindow
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    auth_window = AuthWindow()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", help="Record raw MQTT frames to this file")
+    parser.add_argument("--replay", help="Replay a recording instead of connecting to the broker")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed: 1 = real time, N = N x, 0 = as fast as possible")
+    parser.add_argument("--loop", action="store_true", help="Restart the replay when the recording ends")
+    parser.add_argument("--replay-store", action="store_true",
+                        help="Also store replayed frames the project does not hold yet (default: views only)")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    auth_window = AuthWindow(vars(args))
     auth_window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
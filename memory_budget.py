@@ -0,0 +1,159 @@
+import os
+import sys
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SAMPLE_ITEMS = 100  # Large containers are sized from this many items and scaled up
+SKIPPED_MODULES = ("PyQt5", "pymongo", "matplotlib")
+
+
+def figure_nbytes(figure):
+    # Agg keeps an RGBA buffer of the canvas, plus whatever data the artists hold
+    width, height = figure.get_size_inches()
+    total = int(width * height * figure.dpi ** 2 * 4)
+    for ax in figure.axes:
+        for line in ax.lines:
+            total += np.asarray(line.get_xdata(orig=True)).nbytes + np.asarray(line.get_ydata(orig=True)).nbytes
+        for collection in ax.collections:
+            total += sum(path.vertices.nbytes for path in collection.get_paths())
+        for image in ax.images:
+            total += np.asarray(image.get_array()).nbytes
+    return total
+
+
+def estimate_nbytes(obj, depth=4, seen=None):
+    # Rough size of what obj keeps alive: numpy arrays, containers, figures and the
+    # attributes of plain objects. Objects may report their own size with memory_usage().
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (str, bytes, bytearray, int, float, complex, bool)) or obj is None:
+        return sys.getsizeof(obj)
+    memory_usage = getattr(obj, "memory_usage", None)
+    if callable(memory_usage) and not isinstance(obj, type):
+        return memory_usage()
+    if hasattr(obj, "get_size_inches") and hasattr(obj, "axes"):
+        return figure_nbytes(obj)
+    if depth <= 0:
+        return 0
+    if isinstance(obj, dict):
+        items = list(obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        items = list(obj)
+    elif hasattr(obj, "__dict__") and not type(obj).__module__.startswith(SKIPPED_MODULES):
+        items = list(vars(obj).values())
+    else:
+        return 0
+    total = sys.getsizeof(obj)
+    if len(items) > SAMPLE_ITEMS:
+        step = len(items) // SAMPLE_ITEMS
+        sampled = sum(estimate_nbytes(item, depth - 1, seen) for item in items[::step][:SAMPLE_ITEMS])
+        return total + sampled * len(items) // SAMPLE_ITEMS
+    return total + sum(estimate_nbytes(item, depth - 1, seen) for item in items)
+
+
+def process_rss():
+    # Resident set size in bytes, or None where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+class MemoryEntry:
+    def __init__(self, key, size, release, label):
+        self.key = key
+        self.size = size  # callable() -> bytes
+        self.release = release  # callable() that frees what it can, or None if it cannot shrink
+        self.label = label or str(key)
+        self.nbytes = 0
+
+    def measure(self):
+        try:
+            self.nbytes = int(self.size())
+        except Exception as e:
+            logging.error(f"Failed to measure memory of {self.label}: {str(e)}")
+        return self.nbytes
+
+
+# Process-wide memory accountant for the dashboard. Caches, buffers and feature views
+# register a size callback and a release callback; enforce() measures everything and,
+# while the total is over budget, releases entries least recently used first. Owners call
+# touch() when an entry is used. Meant for the GUI thread (enforce runs on a timer there).
+class MemoryBudget:
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total = 0
+        self.evictions = 0
+        self.freed = 0
+
+    def register(self, key, size, release=None, label=None):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = MemoryEntry(key, size, release, label)
+
+    def unregister(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def touch(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+
+    def enforce(self):
+        # Returns the labels of the entries that were released
+        with self.lock:
+            entries = list(self.entries.values())
+        total = sum(entry.measure() for entry in entries)
+        released = []
+        for entry in entries:
+            if total <= self.budget_bytes:
+                break
+            if entry.release is None or not entry.nbytes:
+                continue
+            before = entry.nbytes
+            try:
+                entry.release()
+            except Exception as e:
+                logging.error(f"Failed to release {entry.label}: {str(e)}")
+                continue
+            with self.lock:
+                registered = self.entries.get(entry.key) is entry
+            after = entry.measure() if registered else 0
+            if after < before:
+                total -= before - after
+                self.evictions += 1
+                self.freed += before - after
+                released.append(entry.label)
+        if released:
+            logging.info(f"Memory budget {self.budget_bytes / 1e6:.0f} MB exceeded; released {', '.join(released)}")
+        self.total = total
+        return released
+
+    def usage(self):
+        # (label, bytes) of every entry, largest first, as of the last enforce()
+        with self.lock:
+            entries = list(self.entries.values())
+        return sorted(((entry.label, entry.nbytes) for entry in entries), key=lambda item: -item[1])
+
+    def stats(self):
+        return {
+            "tracked": self.total,
+            "budget": self.budget_bytes,
+            "rss": process_rss(),
+            "entries": len(self.entries),
+            "evictions": self.evictions,
+            "freed": self.freed,
+        }
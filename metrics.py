@@ -0,0 +1,189 @@
+from pymongo import ASCENDING, UpdateOne
+import numpy as np
+from timeutil import to_ns, to_ns_array, hour_bucket, now_ns
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+METRIC_NAMES = ["rms", "peak", "peak_to_peak", "crest_factor", "mean", "kurtosis", "band_energy", "min", "max"]
+METRIC_LABELS = {
+    "rms": "Overall RMS",
+    "peak": "Peak",
+    "peak_to_peak": "Peak-to-Peak",
+    "crest_factor": "Crest Factor",
+    "mean": "Mean (DC)",
+    "kurtosis": "Kurtosis",
+    "band_energy": "Band Energy",
+    "min": "Min",
+    "max": "Max",
+}
+
+DEFAULT_SAMPLE_RATE = 4096
+DEFAULT_BAND = (10.0, 1000.0)  # Hz
+
+
+def frame_metrics(values, sample_rate=DEFAULT_SAMPLE_RATE, band=DEFAULT_BAND):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return None
+    mean = values.mean()
+    # Vibration metrics are taken on the AC part; the raw counts ride on a large DC offset
+    ac = values - mean
+    power = np.dot(ac, ac) / len(ac)
+    rms = np.sqrt(power)
+    peak = np.abs(ac).max()
+    spectrum = np.fft.rfft(ac)
+    freqs = np.fft.rfftfreq(len(ac), 1.0 / sample_rate)
+    in_band = (freqs >= band[0]) & (freqs <= band[1])
+    return {
+        "rms": float(rms),
+        "peak": float(peak),
+        "peak_to_peak": float(values.max() - values.min()),
+        "crest_factor": float(peak / rms) if rms else 0.0,
+        "mean": float(mean),
+        "kurtosis": float(np.mean(ac ** 4) / power ** 2) if power else 0.0,
+        "band_energy": float(np.sum(np.abs(spectrum[in_band]) ** 2) / len(ac)),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+
+
+# One document per tag and hour holding parallel arrays of frame timestamps and metric
+# values, so a trend over days is a handful of small documents instead of raw frames.
+class MetricsStore:
+    def __init__(self, db):
+        self.db = db
+        self.metrics_collection = db.tags_collection.database["tag_metrics"]
+        self.metrics_collection.create_index([("project_name", ASCENDING), ("tag_name", ASCENDING), ("bucket", ASCENDING)],
+                                             unique=True)
+
+    def bucket_key(self, timestamp):
+        return hour_bucket(timestamp)
+
+    def append(self, project_name, tag_name, timestamp, metrics):
+        if metrics is None:
+            return False, "No metrics for empty frame"
+        timestamp = to_ns(timestamp)
+        push = {"timestamps": timestamp}
+        push.update({name: metrics[name] for name in METRIC_NAMES})
+        try:
+            self.metrics_collection.update_one(
+                {"project_name": project_name, "tag_name": tag_name, "bucket": self.bucket_key(timestamp)},
+                {"$push": push, "$inc": {"count": 1}}, upsert=True)
+            return True, f"Metrics stored for {tag_name}"
+        except Exception as e:
+            logging.error(f"Failed to store metrics for {tag_name}: {str(e)}")
+            return False, str(e)
+
+    def append_many(self, project_name, tag_name, entries):
+        # entries: (timestamp, metrics) pairs; one update per hourly bucket, sent together
+        buckets = {}
+        for timestamp, metrics in entries:
+            if metrics is None:
+                continue
+            timestamp = to_ns(timestamp)
+            push = buckets.setdefault(self.bucket_key(timestamp), {"timestamps": [], **{name: [] for name in METRIC_NAMES}})
+            push["timestamps"].append(timestamp)
+            for name in METRIC_NAMES:
+                push[name].append(metrics[name])
+        if not buckets:
+            return False, "No metrics for empty frames"
+        try:
+            self.metrics_collection.bulk_write([
+                UpdateOne({"project_name": project_name, "tag_name": tag_name, "bucket": bucket},
+                          {"$push": {name: {"$each": series} for name, series in push.items()},
+                           "$inc": {"count": len(push["timestamps"])}}, upsert=True)
+                for bucket, push in buckets.items()], ordered=False)
+            return True, f"Metrics stored for {tag_name}"
+        except Exception as e:
+            logging.error(f"Failed to store metrics for {tag_name}: {str(e)}")
+            return False, str(e)
+
+    def get_series(self, project_name, tag_name, metric, start=None, end=None):
+        # Returns (int64 epoch ns array, float64 values array)
+        start, end = to_ns(start), to_ns(end)
+        query = self.bucket_query(project_name, tag_name, start, end)
+        timestamps, values = [], []
+        for doc in self.metrics_collection.find(query, {"_id": 0, "timestamps": 1, metric: 1}).sort("bucket", ASCENDING):
+            timestamps.extend(doc.get("timestamps", []))
+            values.extend(doc.get(metric, []))
+        timestamps = to_ns_array(timestamps)
+        values = np.asarray(values, dtype=np.float64)
+        if len(timestamps) > 1 and np.any(np.diff(timestamps) < 0):
+            # Spool replays push older frames onto a bucket after newer ones
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, values = timestamps[order], values[order]
+        keep = np.ones(len(timestamps), dtype=bool)
+        if start is not None:
+            keep &= timestamps >= start
+        if end is not None:
+            keep &= timestamps <= end
+        return timestamps[keep], values[keep]
+
+    def bucket_counts(self, project_name, tag_name, start=None, end=None):
+        # {bucket: frame count} of the hourly documents overlapping the range; a count that
+        # grew means frames arrived for that hour, late ones included
+        query = self.bucket_query(project_name, tag_name, to_ns(start), to_ns(end))
+        return {doc["bucket"]: doc.get("count", 0)
+                for doc in self.metrics_collection.find(query, {"_id": 0, "bucket": 1, "count": 1})}
+
+    def bucket_query(self, project_name, tag_name, start, end):
+        query = {"project_name": project_name, "tag_name": tag_name}
+        bucket_range = {}
+        if start is not None:
+            bucket_range["$gte"] = self.bucket_key(start)
+        if end is not None:
+            bucket_range["$lte"] = self.bucket_key(end)
+        if bucket_range:
+            query["bucket"] = bucket_range
+        return query
+
+    def migrate_legacy_timestamps(self):
+        # Legacy buckets are keyed "YYYY-MM-DDTHH" and hold ISO strings
+        converted = 0
+        for doc in self.metrics_collection.find({"bucket": {"$type": "string"}}):
+            timestamps = to_ns_array(doc.get("timestamps", []))
+            bucket = self.bucket_key(to_ns(doc["bucket"] + ":00"))
+            fields = {name: doc.get(name, []) for name in METRIC_NAMES}
+            self.metrics_collection.update_one(
+                {"project_name": doc["project_name"], "tag_name": doc["tag_name"], "bucket": bucket},
+                {"$push": dict({"timestamps": {"$each": timestamps.tolist()}},
+                               **{name: {"$each": series} for name, series in fields.items()}),
+                 "$inc": {"count": doc.get("count", len(timestamps))}}, upsert=True)
+            self.metrics_collection.delete_one({"_id": doc["_id"]})
+            converted += 1
+        logging.info(f"Converted {converted} metric buckets to epoch ns")
+        return converted
+
+
+# The last span_ns of one metric of one tag, for live trends. The first refresh() reads
+# the whole span; later ones compare the frame count of each hourly bucket with the count
+# held and re-read from the oldest bucket that grew, so frames that arrive late (spool
+# replay, imports, another ingest process) show up as well as new ones.
+class MetricSeries:
+    def __init__(self, metrics_store, project_name, tag_name, metric, span_ns):
+        self.metrics_store = metrics_store
+        self.project_name = project_name
+        self.tag_name = tag_name
+        self.metric = metric
+        self.span_ns = span_ns
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0)
+        self.counts = None
+
+    def refresh(self):
+        now = now_ns()
+        since = now - self.span_ns
+        counts = self.metrics_store.bucket_counts(self.project_name, self.tag_name, since)
+        stale = [bucket for bucket, count in counts.items() if self.counts is None or self.counts.get(bucket) != count]
+        if stale or self.counts is None:
+            start = max(min(stale), since) if stale else since
+            timestamps, values = self.metrics_store.get_series(self.project_name, self.tag_name, self.metric, start)
+            held = self.timestamps < start
+            self.timestamps = np.concatenate((self.timestamps[held], timestamps))
+            self.values = np.concatenate((self.values[held], values))
+            self.counts = counts
+        keep = self.timestamps >= since
+        if not keep.all():
+            self.timestamps, self.values = self.timestamps[keep], self.values[keep]
+        return self.timestamps, self.values
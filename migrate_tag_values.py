@@ -0,0 +1,67 @@
+import argparse
+import numpy as np
+import logging
+from database import Database
+from frame_store import FrameStore
+from summaries import SummaryStore
+from metrics import MetricsStore, frame_metrics
+from tag_metadata import TagMetadataStore
+from timeutil import to_ns
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+BATCH_FRAMES = 500
+
+
+# One-off copy of the uncompressed history that older versions kept through
+# Database.update_tag_value into the compressed tag_frames collection, together with the
+# hourly summaries and metrics that reports and trends read. Frames whose timestamp is
+# already in tag_frames are skipped, so the script can be run again after an interruption.
+def migrate_tag(db, stores, project_name, tag_name):
+    frame_store, summary_store, metrics_store, metadata_store = stores
+    entries = db.get_tag_values(project_name, tag_name) or []
+    existing = set(frame_store.frame_index(project_name, tag_name)[0].tolist())
+    sample_rate = metadata_store.get(project_name, tag_name).sample_rate
+    batch, migrated = [], 0
+    for entry in entries:
+        timestamp = to_ns(entry["timestamp"])
+        values = np.asarray(entry.get("values") or [], dtype=np.float64)
+        if timestamp in existing or not len(values):
+            continue
+        existing.add(timestamp)
+        batch.append((timestamp, values))
+        if len(batch) >= BATCH_FRAMES:
+            migrated += store_batch(stores, project_name, tag_name, batch, sample_rate)
+            batch = []
+    if batch:
+        migrated += store_batch(stores, project_name, tag_name, batch, sample_rate)
+    logging.info(f"Migrated {migrated} of {len(entries)} legacy frames for {project_name}/{tag_name}")
+    return migrated
+
+
+def store_batch(stores, project_name, tag_name, batch, sample_rate):
+    frame_store, summary_store, metrics_store, _ = stores
+    success, message = frame_store.write_frames(project_name, tag_name, batch)
+    if not success:
+        logging.error(f"Failed to migrate frames for {tag_name}: {message}")
+        return 0
+    summary_store.update_many(project_name, tag_name, batch)
+    metrics_store.append_many(project_name, tag_name, [(timestamp, frame_metrics(values, sample_rate))
+                                                       for timestamp, values in batch])
+    return len(batch)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy legacy tag value history into the compressed frame store")
+    parser.add_argument("--email", default="user@example.com")
+    parser.add_argument("--project", action="append", help="Only these projects (repeatable); default all")
+    args = parser.parse_args()
+
+    db = Database(email=args.email)
+    stores = (FrameStore(db), SummaryStore(db), MetricsStore(db), TagMetadataStore(db))
+    query = {"project_name": {"$in": args.project}} if args.project else {}
+    total = 0
+    for tag in db.tags_collection.find(query, {"project_name": 1, "tag_name": 1}):
+        total += migrate_tag(db, stores, tag["project_name"], tag["tag_name"])
+    logging.info(f"Migrated {total} frames in total")
+    db.close_connection()
@@ -0,0 +1,22 @@
+import argparse
+import logging
+from database import Database
+from frame_store import FrameStore, migrate_string_field
+from summaries import SummaryStore
+from metrics import MetricsStore
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# One-off conversion of ISO-string timestamps written by older versions to epoch ns.
+# Readers accept both forms, but range queries only match the integer ones.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert stored ISO timestamps to int64 epoch nanoseconds")
+    parser.add_argument("--email", default="user@example.com")
+    args = parser.parse_args()
+
+    db = Database(email=args.email)
+    FrameStore(db).migrate_legacy_timestamps()
+    SummaryStore(db).migrate_legacy_timestamps()
+    MetricsStore(db).migrate_legacy_timestamps()
+    migrate_string_field(db.tags_collection.database["alarm_events"], "timestamp")
+    db.close_connection()
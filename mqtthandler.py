@@ -1,85 +1,50 @@
-import paho.mqtt.client as mqtt
 from PyQt5.QtCore import QObject, pyqtSignal
-from datetime import datetime
+from ingest import IngestService
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Embedded ingest for the dashboard: runs an IngestService in-process and turns its
+# callbacks into Qt delivery. With "ingest_mode": "daemon" the dashboard uses a
+# StoreFollower instead and never creates one of these.
 class MQTTHandler(QObject):
     data_received = pyqtSignal(str, list)  # Signal: tag_name, values
+    alarm_event = pyqtSignal(dict)  # Signal: raised/cleared alarm event
 
-    def __init__(self, db, project_name):
+    def __init__(self, db, project_name, frame_store=None, summary_store=None, metrics_store=None, coalescer=None,
+                 metadata_store=None):
         super().__init__()
-        self.db = db
-        self.project_name = project_name
-        self.client = mqtt.Client()
-        self.client.on_connect = self.on_connect
-        self.client.on_message = self.on_message
-        self.broker = "192.168.1.173"  # Replace with your actual broker IP
-        self.port = 1883  # Default MQTT port
-        self.subscribed_topics = set()
-        self.running = False
-
-    def connect(self):
-        try:
-            self.client.connect(self.broker, self.port, keepalive=60)
-            logging.info(f"Connected to MQTT broker at {self.broker}:{self.port}")
-        except Exception as e:
-            logging.error(f"Failed to connect to MQTT broker: {str(e)}")
-            raise
+        self.coalescer = coalescer
+        self.service = IngestService(db, project_name, frame_store, summary_store, metrics_store, metadata_store,
+                                     on_frame=self.deliver, on_alarm=self.alarm_event.emit)
+        self.client = self.service.client
+        self.sequence_tracker = self.service.sequence_tracker
+        self.spool = self.service.spool
+
+    def deliver(self, tag_name, timestamp, values):
+        if self.coalescer:
+            # Bounded hand-off; the GUI picks frames up on its own tick
+            self.coalescer.push(tag_name, timestamp, values)
+        else:
+            self.data_received.emit(tag_name, values)
 
     def start(self):
-        if not self.running:
-            self.connect()
-            self.client.loop_start()
-            self.running = True
-            logging.info("MQTT loop started")
+        self.service.start()
 
     def stop(self):
-        if self.running:
-            self.client.loop_stop()
-            self.client.disconnect()
-            self.running = False
-            self.subscribed_topics.clear()
-            logging.info("MQTT loop stopped and client disconnected")
+        self.service.stop()
 
-    def on_connect(self, client, userdata, flags, rc):
-        if rc == 0:
-            logging.info(f"Connected to MQTT broker with result code {rc}")
-            self.subscribe_to_topics()
-        else:
-            logging.error(f"Connection failed with result code {rc}")
+    def subscribe(self, topics):
+        self.service.subscribe(topics)
+
+    def unsubscribe(self, topics):
+        self.service.unsubscribe(topics)
 
-    def subscribe_to_topics(self):
-        tags = list(self.db.tags_collection.find({"project_name": self.project_name}))
-        if not tags:
-            logging.warning(f"No tags found for project {self.project_name}")
-            return
-        for tag in tags:
-            topic = tag["tag_name"]
-            if topic not in self.subscribed_topics:
-                self.client.subscribe(topic, qos=1)
-                self.subscribed_topics.add(topic)
-                logging.info(f"Subscribed to topic: {topic}")
+    def start_recording(self, path):
+        self.service.start_recording(path)
 
-    def on_message(self, client, userdata, msg):
-        topic = msg.topic
-        payload = msg.payload.decode("utf-8")
-        logging.debug(f"Received message on {topic}: {payload[:50]}...")
+    def stop_recording(self):
+        self.service.stop_recording()
 
-        try:
-            values = [float(x.strip()) for x in payload.split(",") if x.strip()]
-            if not values:
-                raise ValueError("Empty or invalid payload")
-            tag_name = topic
-            timestamp = datetime.now().isoformat()
-            success, message = self.db.update_tag_value(self.project_name, tag_name, values, timestamp)
-            if success:
-                logging.info(f"Stored {len(values)} values for {tag_name}")
-                self.data_received.emit(tag_name, values)
-            else:
-                logging.error(f"Failed to store values: {message}")
-        except ValueError as ve:
-            logging.error(f"Invalid payload format on {topic}: {str(ve)}")
-        except Exception as e:
-            logging.error(f"Error processing message on {topic}: {str(e)}")
\ No newline at end of file
+    def start_replay(self, path, speed=1.0, loop=False, store=False):
+        self.service.start_replay(path, speed, loop, store)
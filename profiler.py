@@ -0,0 +1,189 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+import settings
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# On-demand profiling for stations in the field. Nothing runs until start() is called:
+# the only cost left in the hot paths is the `profiler.session is not None` check that
+# ingest does per message.
+#   "cprofile": deterministic profile of the GUI thread, plus every call that goes
+#               through session.run() on other threads (the MQTT message callback).
+#               Writes one .prof per thread (snakeviz, gprof2dot, flameprof) and a text summary.
+#               From 3.12 cProfile sits on sys.monitoring, which allows one active profiler
+#               per process and sees every thread: a single profile covers the session.
+#   "sampling": a background thread samples the stacks of all threads every
+#               profile_sample_ms. Writes collapsed stacks (.folded) for flamegraph.pl,
+#               inferno or speedscope.
+CPROFILE, SAMPLING = "cprofile", "sampling"
+SUMMARY_LINES = 40
+SINGLE_PROFILE = sys.version_info >= (3, 12)
+
+session = None
+_lock = threading.Lock()
+
+
+def output_path(label, suffix):
+    directory = settings.get("profile_dir")
+    os.makedirs(directory, exist_ok=True)
+    safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in label)
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}{suffix}")
+
+
+class CProfileSession:
+    mode = CPROFILE
+
+    def __init__(self, label, restrict=None):
+        self.label = label
+        self.restrict = restrict  # Only list functions whose path matches this in the summary
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.owner = threading.get_ident()
+        self.owner_name = "all-threads" if SINGLE_PROFILE else threading.current_thread().name
+        self.profiles = {self.owner_name: cProfile.Profile()}
+
+    def start(self):
+        # Called on the GUI thread, which is profiled throughout
+        self.profiles[self.owner_name].enable()
+
+    def run(self, fn, *args):
+        # Profiles one call on another thread; the GUI thread is already covered
+        if SINGLE_PROFILE or threading.get_ident() == self.owner:
+            return fn(*args)
+        name = threading.current_thread().name
+        with self.lock:
+            profile = self.profiles.get(name)
+            if profile is None:
+                profile = self.profiles[name] = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Another profiler holds the interpreter's hook; never let that break the caller
+            logging.debug(f"Could not profile {name}: {str(e)}")
+            return fn(*args)
+        try:
+            return fn(*args)
+        finally:
+            profile.disable()
+
+    def stop(self):
+        with self.lock:
+            profiles = dict(self.profiles)
+        profiles[self.owner_name].disable()
+        paths = []
+        combined = None
+        for thread_name, profile in profiles.items():
+            path = output_path(f"{self.label}-{thread_name}", ".prof")
+            profile.dump_stats(path)
+            paths.append(path)
+            if combined is None:
+                combined = pstats.Stats(profile)
+            else:
+                combined.add(profile)
+        summary = io.StringIO()
+        combined.stream = summary
+        combined.sort_stats("cumulative")
+        summary.write(f"{self.label}: {time.monotonic() - self.started:.1f} s, threads: {', '.join(profiles)}\n")
+        if self.restrict:
+            combined.print_stats(self.restrict, SUMMARY_LINES)
+        else:
+            combined.print_stats(SUMMARY_LINES)
+        path = output_path(self.label, ".txt")
+        with open(path, "w") as f:
+            f.write(summary.getvalue())
+        paths.append(path)
+        return paths
+
+
+class SamplingSession:
+    mode = SAMPLING
+
+    def __init__(self, label, interval=None):
+        self.label = label
+        self.interval = (interval or settings.get("profile_sample_ms")) / 1000
+        self.started = time.monotonic()
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.sample_loop, name="profiler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self, fn, *args):
+        return fn(*args)
+
+    def sample_loop(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        path = output_path(self.label, ".folded")
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        logging.info(f"Profiler took {self.samples} samples over {time.monotonic() - self.started:.1f} s")
+        return [path]
+
+
+def start(mode=CPROFILE, label="dashboard", restrict=None):
+    # Call from the GUI thread
+    global session
+    with _lock:
+        if session is not None:
+            return False, f"A {session.mode} profile is already running"
+        try:
+            new_session = CProfileSession(label, restrict) if mode == CPROFILE else SamplingSession(label)
+            try:
+                new_session.start()
+            except ValueError as e:
+                if mode != CPROFILE:
+                    raise
+                # 3.12+: another tool (a debugger or coverage) already uses sys.monitoring
+                logging.warning(f"cProfile unavailable ({str(e)}), sampling instead")
+                mode = SAMPLING
+                new_session = SamplingSession(label)
+                new_session.start()
+        except Exception as e:
+            logging.error(f"Failed to start profiler: {str(e)}")
+            return False, str(e)
+        session = new_session
+    logging.info(f"Started {mode} profile '{label}'")
+    return True, f"Started {mode} profile"
+
+
+def stop():
+    # Returns (success, message, written paths)
+    global session
+    with _lock:
+        current, session = session, None
+    if current is None:
+        return False, "No profile is running", []
+    try:
+        paths = current.stop()
+    except Exception as e:
+        logging.error(f"Failed to write profile: {str(e)}")
+        return False, str(e), []
+    logging.info(f"Wrote profile to {', '.join(paths)}")
+    return True, f"Wrote {len(paths)} files to {settings.get('profile_dir')}", paths
@@ -3,6 +3,7 @@ import time
 import paho.mqtt.publish as publish
 from PyQt5.QtCore import QTimer, QObject
 from PyQt5.QtWidgets import QApplication
+from frame_envelope import encode_envelope
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,6 +22,7 @@ class MQTTPublisher(QObject):
         self.sample_rate = 4096
         self.time_per_message = 1.0
         self.current_time = 0.0
+        self.start_ns = time.time_ns()
 
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.publish_message)
@@ -28,6 +30,8 @@ class MQTTPublisher(QObject):
 
     def publish_message(self):
         if self.count < 50:
+            # Source time of the frame's first sample
+            timestamp_ns = self.start_ns + int(self.current_time * 1_000_000_000)
             values = []
             for i in range(self.sample_rate):
                 t = self.current_time + (i / self.sample_rate)
@@ -35,12 +39,12 @@ class MQTTPublisher(QObject):
                 values.append(round(value, 2))
 
             self.current_time += 1
-            message = ",".join(map(str, values))
+            message = encode_envelope(self.count, timestamp_ns, self.sample_rate, values, epoch=self.start_ns)
 
             for topic in self.topics:
                 try:
                     publish.single(topic, message, hostname=self.broker, qos=1)
-                    logging.info(f"[{self.count}] Published to {topic}: {message[:50]}... ({self.sample_rate} values)")
+                    logging.info(f"[{self.count}] Published seq {self.count} to {topic}: {message[:50]}... ({self.sample_rate} values)")
                 except Exception as e:
                     logging.error(f"Failed to publish to {topic}: {str(e)}")
 
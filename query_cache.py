@@ -0,0 +1,158 @@
+import bisect
+import threading
+from collections import OrderedDict
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class CachedRange:
+    # Decoded frames of one query, oldest first. limit > 0 keeps only the newest `limit`
+    # frames, like read_frames(latest=True).
+    def __init__(self, start, end, limit, timestamps, frames):
+        self.start = start
+        self.end = end
+        self.limit = limit
+        self.timestamps = list(timestamps)
+        self.frames = list(frames)
+        self.nbytes = sum(frame.nbytes for frame in self.frames) + 8 * len(self.timestamps)
+
+    @property
+    def open_ended(self):
+        return self.end is None
+
+    def covers(self, timestamp):
+        return (self.start is None or timestamp >= self.start) and (self.end is None or timestamp <= self.end)
+
+    def add(self, timestamp, values):
+        # Returns the change in bytes
+        if self.limit and len(self.frames) >= self.limit and self.timestamps and timestamp < self.timestamps[0]:
+            return 0
+        index = bisect.bisect_right(self.timestamps, timestamp)
+        if index and self.timestamps[index - 1] == timestamp:
+            return 0
+        self.timestamps.insert(index, timestamp)
+        self.frames.insert(index, values)
+        delta = values.nbytes + 8
+        while self.limit and len(self.frames) > self.limit:
+            delta -= self.frames.pop(0).nbytes + 8
+            self.timestamps.pop(0)
+        self.nbytes += delta
+        return delta
+
+
+# LRU of decoded frame queries with a byte budget, keyed by (project, tag, start, end,
+# resolution); resolution is None for raw frames. A limit is not part of the key: an
+# entry holding the newest N frames also serves any request for fewer. New frames are
+# appended to matching open-ended ranges as they are written, so a view that polls "the
+# newest N frames" or "everything since T" is served from memory for as long as it stays
+# hot. Cached arrays are shared with callers and read-only.
+class QueryCache:
+    def __init__(self, budget_bytes=256 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.by_tag = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.appends = 0
+        self.invalidations = 0
+
+    def get(self, project_name, tag_name, start=None, end=None, limit=0, resolution=None):
+        key = (project_name, tag_name, start, end, resolution)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (entry.limit and not 0 < limit <= entry.limit):
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            timestamps, frames = entry.timestamps, entry.frames
+            if limit:
+                timestamps, frames = timestamps[-limit:], frames[-limit:]
+            return np.array(timestamps, dtype=np.int64), list(frames)
+
+    def put(self, project_name, tag_name, start, end, limit, timestamps, frames, resolution=None):
+        frames = [self.freeze(values) for values in frames]
+        entry = CachedRange(start, end, limit, timestamps, frames)
+        result = np.array(entry.timestamps, dtype=np.int64), list(entry.frames)
+        if entry.nbytes > self.budget_bytes:
+            return result
+        key = (project_name, tag_name, start, end, resolution)
+        with self.lock:
+            self.remove(key)
+            self.entries[key] = entry
+            self.by_tag.setdefault((project_name, tag_name), set()).add(key)
+            self.nbytes += entry.nbytes
+            self.evict()
+        return result
+
+    def append(self, project_name, tag_name, timestamp, values):
+        # A frame was stored; extend open-ended ranges, drop closed ranges it falls in
+        values = self.freeze(values)
+        with self.lock:
+            for key in list(self.by_tag.get((project_name, tag_name), ())):
+                entry = self.entries[key]
+                if not entry.covers(timestamp):
+                    continue
+                if entry.open_ended:
+                    self.nbytes += entry.add(timestamp, values)
+                    self.appends += 1
+                else:
+                    self.remove(key)
+                    self.invalidations += 1
+            self.evict()
+
+    def invalidate(self, project_name=None, tag_name=None):
+        with self.lock:
+            if project_name is None:
+                keys = list(self.entries)
+            elif tag_name is None:
+                keys = [key for key in self.entries if key[0] == project_name]
+            else:
+                keys = list(self.by_tag.get((project_name, tag_name), ()))
+            for key in keys:
+                self.remove(key)
+            self.invalidations += len(keys)
+
+    def freeze(self, values):
+        # A read-only view, so a caller cannot scribble over what others are served
+        values = np.asarray(values, dtype=np.float64).view()
+        values.flags.writeable = False
+        return values
+
+    def remove(self, key):
+        # Called with the lock held
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.nbytes -= entry.nbytes
+        keys = self.by_tag.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_tag[key[:2]]
+
+    def evict(self):
+        # Called with the lock held
+        while self.nbytes > self.budget_bytes and self.entries:
+            self.remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+                "budget": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "appends": self.appends,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,130 @@
+import argparse
+import gzip
+import struct
+import threading
+import time
+from collections import namedtuple
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MAGIC = b"SARAYU-MQTT-REC1\n"
+RECORD_HEADER = struct.Struct("<qHI")  # receive time (ns), topic length, payload length
+
+ReplayMessage = namedtuple("ReplayMessage", ["topic", "payload"])
+
+
+class FrameRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, "wb", compresslevel=6)
+        self.file.write(MAGIC)
+        self.count = 0
+        logging.info(f"Recording MQTT frames to {path}")
+
+    def record(self, topic, payload):
+        topic_bytes = topic.encode("utf-8")
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD_HEADER.pack(time.time_ns(), len(topic_bytes), len(payload)))
+            self.file.write(topic_bytes)
+            self.file.write(payload)
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                logging.info(f"Recorded {self.count} MQTT frames to {self.path}")
+
+
+def read_recording(path):
+    with gzip.open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an MQTT frame recording")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            received_ns, topic_length, payload_length = RECORD_HEADER.unpack(header)
+            topic = f.read(topic_length).decode("utf-8")
+            yield received_ns, ReplayMessage(topic, f.read(payload_length))
+
+
+class FrameReplayer:
+    # speed: 1.0 is real time, N is N x real time, 0 replays as fast as possible
+    def __init__(self, handler, path, speed=1.0, loop=False):
+        self.handler = handler
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.count = 0
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="mqtt-replay", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+
+    def run(self):
+        logging.info(f"Replaying {self.path} at {'max' if not self.speed else f'{self.speed}x'} speed")
+        started = time.perf_counter()
+        while not self.stop_event.is_set():
+            self.replay_once()
+            if not self.loop:
+                break
+            # The next pass repeats the same sequence numbers. When only the views are fed
+            # they should see them again; when storing, the tracker keeps them out.
+            if not self.handler.storing:
+                self.handler.sequence_tracker.reset()
+        elapsed = time.perf_counter() - started
+        logging.info(f"Replay finished: {self.count} frames in {elapsed:.2f}s ({self.count / max(elapsed, 1e-9):.1f} frames/s)")
+
+    def replay_once(self):
+        first_ns = None
+        wall_start = time.perf_counter()
+        for received_ns, msg in read_recording(self.path):
+            if self.stop_event.is_set():
+                return
+            if first_ns is None:
+                first_ns = received_ns
+            if self.speed:
+                due = (received_ns - first_ns) / 1e9 / self.speed
+                delay = due - (time.perf_counter() - wall_start)
+                if delay > 0 and self.stop_event.wait(delay):
+                    return
+            self.handler.on_message(None, None, msg)
+            self.count += 1
+
+
+if __name__ == "__main__":
+    from database import Database
+    from ingest import IngestService
+
+    parser = argparse.ArgumentParser(description="Replay a recorded MQTT session into the ingest pipeline")
+    parser.add_argument("path")
+    parser.add_argument("--email", default="user@example.com")
+    parser.add_argument("--project", required=True)
+    parser.add_argument("--speed", type=float, default=0, help="1 = real time, N = N x real time, 0 = as fast as possible")
+    args = parser.parse_args()
+
+    db = Database(email=args.email)
+    # Stores what the project does not hold yet; frames already stored are dropped as duplicates
+    service = IngestService(db, args.project, client_name="replay")
+    replayer = FrameReplayer(service, args.path, args.speed)
+    replayer.start()
+    try:
+        replayer.thread.join()
+    except KeyboardInterrupt:
+        replayer.stop()
+    service.stop()
+    db.close_connection()
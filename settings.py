@@ -0,0 +1,71 @@
+import json
+import os
+import threading
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SETTINGS_PATH = os.environ.get("SARAYU_SETTINGS", "settings.json")
+
+DEFAULTS = {
+    "plot_backend": "matplotlib",
+    "plot_backends": {},  # Per-feature override, e.g. {"Time View": "pyqtgraph"}
+    "ingest_mode": "embedded",  # "daemon": ingest_daemon.py stores data and the dashboard only reads
+    "mqtt_broker": "192.168.1.173",
+    "mqtt_port": 1883,
+    # Part of the MQTT client id, which must be unique per broker; defaults to the host name.
+    # Set it when two dashboards on the same host open the same project.
+    "station_id": "",
+    "spool_dir": "spool",  # Frames that could not be stored wait here, one directory per project
+    "spool_replay_rate": 200,  # Max frames per second replayed from the spool
+    "shm_rings": True,  # Daemon ingest shares the newest frames with local dashboards via shm_ring.py
+    "shm_ring_slots": 16,  # Frames kept per tag in each ring
+    "legacy_tag_values": False,  # Also write frames uncompressed via Database.update_tag_value, for outside readers
+    "query_cache_mb": 256,  # Memory budget for decoded frames kept by the frame store's query cache
+    "memory_budget_mb": 2048,  # Dashboard caches and views are released, least recently used first, above this
+    "profile_dir": "profiles",  # Output of the profiling controls in the Settings menu
+    "profile_sample_ms": 5,  # Interval of the sampling profiler
+    "profile_feature_seconds": 10,  # Length of a "profile current feature" capture
+    "capture_mode": "continuous",  # "triggered": keep raw frames only around alarms and capture requests
+    "capture_pre_frames": 10,  # Raw frames per tag held in memory and stored when a capture triggers
+    "capture_post_frames": 30,  # Raw frames per tag stored after the trigger
+    "capture_scope": "tag",  # "project": a trigger on one tag captures every tag of the project
+    "capture_on_alarm": True,
+    "capture_change_triggers": [],  # [{"tag": ..., "metric": "rms", "change": 0.5}]
+}
+
+_lock = threading.Lock()
+_settings = None
+
+
+def load():
+    global _settings
+    with _lock:
+        if _settings is None:
+            _settings = json.loads(json.dumps(DEFAULTS))
+            if os.path.exists(SETTINGS_PATH):
+                try:
+                    with open(SETTINGS_PATH) as f:
+                        _settings.update(json.load(f))
+                except (OSError, ValueError) as e:
+                    logging.error(f"Failed to read settings from {SETTINGS_PATH}: {str(e)}")
+        return _settings
+
+
+def get(key, default=None):
+    return load().get(key, default)
+
+
+def put(key, value):
+    settings = load()
+    with _lock:
+        settings[key] = value
+        try:
+            with open(SETTINGS_PATH, "w") as f:
+                json.dump(settings, f, indent=2)
+        except OSError as e:
+            logging.error(f"Failed to write settings to {SETTINGS_PATH}: {str(e)}")
+
+
+def plot_backend_for(feature_name):
+    return get("plot_backends", {}).get(feature_name, get("plot_backend", "matplotlib"))
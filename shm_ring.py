@@ -0,0 +1,228 @@
+import hashlib
+import struct
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Per-tag ring of the newest frames in shared memory, written by the ingest process and
+# read by any number of dashboards on the same machine without touching the database.
+#
+# Layout: a 32-byte header (magic, version, slots, capacity, head, created) followed by
+# `slots` fixed-size slots of (seq, timestamp, count, sample_rate, capacity x float64).
+# head counts frames ever written; frame n lives in slot n % slots. Each slot carries a
+# seqlock: the writer sets seq to 2n+1 before touching the slot and 2n+2 once it is
+# complete, so a reader that sees the same even 2n+2 before and after copying knows the
+# copy is frame n and was not torn or overwritten meanwhile.
+MAGIC = 0x474E5253  # "SRNG"
+RETIRED = 0
+VERSION = 1
+HEADER = struct.Struct("<IIIIQq")
+SLOT_HEADER_BYTES = 32
+DEFAULT_SLOTS = 16
+
+
+def ring_name(project_name, tag_name):
+    # Tag names contain slashes; shared memory names must not (and stay short for macOS)
+    digest = hashlib.sha1(f"{project_name}\0{tag_name}".encode("utf-8")).hexdigest()[:20]
+    return f"sarayu_{digest}"
+
+
+# Before 3.13 every process that opens a segment registers it with the resource tracker,
+# which unlinks it when that process exits; rings outlive both sides. 3.13 can open without
+# tracking; older versions unregister right after opening.
+TRACK_OPTION = sys.version_info >= (3, 13)
+
+
+def open_segment(name, create=False, size=0):
+    if TRACK_OPTION:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def unlink_segment(shm):
+    # SharedMemory.unlink() unregisters the segment again before 3.13, and the tracker
+    # prints a KeyError for a name it no longer knows; register it back first
+    if not TRACK_OPTION:
+        resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+class FrameRing:
+    def __init__(self, shm):
+        self.shm = shm
+        buf = shm.buf
+        magic, version, self.slots, self.capacity, _, _ = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{shm.name} is not a frame ring")
+        self.slot_bytes = SLOT_HEADER_BYTES + self.capacity * 8
+        self.magic = np.ndarray((1,), "<u4", buf, 0)
+        self.head = np.ndarray((1,), "<u8", buf, 16)
+        strides = (self.slot_bytes,)
+        self.seqs = np.ndarray((self.slots,), "<u8", buf, HEADER.size, strides)
+        self.timestamps = np.ndarray((self.slots,), "<i8", buf, HEADER.size + 8, strides)
+        self.counts = np.ndarray((self.slots,), "<u4", buf, HEADER.size + 16, strides)
+        self.sample_rates = np.ndarray((self.slots,), "<f8", buf, HEADER.size + 24, strides)
+        self.values = np.ndarray((self.slots, self.capacity), "<f8", buf, HEADER.size + SLOT_HEADER_BYTES,
+                                 (self.slot_bytes, 8))
+
+    @classmethod
+    def create(cls, name, slots, capacity):
+        size = HEADER.size + slots * (SLOT_HEADER_BYTES + capacity * 8)
+        shm = open_segment(name, create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, slots, capacity, 0, time.time_ns())
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name):
+        shm = open_segment(name)
+        try:
+            return cls(shm)
+        except ValueError:
+            shm.close()
+            raise
+
+    @property
+    def retired(self):
+        return int(self.magic[0]) != MAGIC
+
+    def write(self, timestamp, values, sample_rate=None):
+        # Single writer per ring
+        values = np.asarray(values, dtype=np.float64)
+        count = min(len(values), self.capacity)
+        number = int(self.head[0])
+        slot = number % self.slots
+        self.seqs[slot] = 2 * number + 1
+        self.values[slot, :count] = values[:count]
+        self.timestamps[slot] = timestamp
+        self.counts[slot] = count
+        self.sample_rates[slot] = sample_rate or 0.0
+        self.seqs[slot] = 2 * number + 2
+        self.head[0] = number + 1
+
+    def frames_written(self):
+        return int(self.head[0])
+
+    def read(self, number):
+        # Copy of frame `number` as (timestamp, values, sample_rate), or None if the
+        # slot has moved on or was being rewritten while we copied it
+        slot = number % self.slots
+        expected = 2 * number + 2
+        if int(self.seqs[slot]) != expected:
+            return None
+        count = int(self.counts[slot])
+        timestamp = int(self.timestamps[slot])
+        sample_rate = float(self.sample_rates[slot]) or None
+        values = self.values[slot, :count].copy()
+        if int(self.seqs[slot]) != expected:
+            return None
+        return timestamp, values, sample_rate
+
+    def read_since(self, cursor, limit=None):
+        # Frames written after `cursor` (a previous return value, 0 to start), oldest
+        # first, as (number, timestamp, values, sample_rate). Returns (frames, cursor).
+        head = self.frames_written()
+        start = max(cursor, head - self.slots, head - limit if limit else 0)
+        frames = []
+        for number in range(start, head):
+            frame = self.read(number)
+            if frame is not None:
+                frames.append((number,) + frame)
+        return frames, head
+
+    def close(self):
+        self.magic = self.head = self.seqs = self.timestamps = self.counts = self.sample_rates = self.values = None
+        self.shm.close()
+
+
+class FrameRingWriter:
+    # Owned by the ingest process. Rings are created on a tag's first frame and left in
+    # place on exit, so a restarted ingest carries on in the same segments and open
+    # dashboards never notice. A ring that is too small is retired and replaced.
+    def __init__(self, project_name, slots=DEFAULT_SLOTS):
+        self.project_name = project_name
+        self.slots = slots
+        self.lock = threading.Lock()
+        self.rings = {}
+
+    def ring_for(self, tag_name, frame_length):
+        ring = self.rings.get(tag_name)
+        if ring is not None and ring.capacity >= frame_length:
+            return ring
+        name = ring_name(self.project_name, tag_name)
+        if ring is None:
+            try:
+                ring = FrameRing.attach(name)
+                if ring.slots == self.slots and ring.capacity >= frame_length:
+                    self.rings[tag_name] = ring
+                    return ring
+            except (FileNotFoundError, ValueError):
+                ring = None
+        if ring is not None:
+            # Tell readers to reattach, then make room for the new segment
+            ring.magic[0] = RETIRED
+            unlink_segment(ring.shm)
+            ring.close()
+        ring = FrameRing.create(name, self.slots, frame_length)
+        self.rings[tag_name] = ring
+        logging.info(f"Created shared frame ring {name} for {tag_name} ({self.slots} x {frame_length})")
+        return ring
+
+    def write(self, tag_name, timestamp, values, sample_rate=None):
+        # Live sharing must never get in the way of storing the frame
+        try:
+            with self.lock:
+                self.ring_for(tag_name, len(values)).write(timestamp, values, sample_rate)
+            return True
+        except Exception as e:
+            logging.error(f"Failed to write shared frame ring for {tag_name}: {str(e)}")
+            return False
+
+    def close(self, unlink=False):
+        with self.lock:
+            for ring in self.rings.values():
+                if unlink:
+                    ring.magic[0] = RETIRED
+                    unlink_segment(ring.shm)
+                ring.close()
+            self.rings.clear()
+
+
+class FrameRingReader:
+    # Used by dashboards. Rings are attached lazily; a tag whose ring does not exist
+    # yet is retried at most every retry_interval seconds.
+    def __init__(self, project_name, retry_interval=2.0):
+        self.project_name = project_name
+        self.retry_interval = retry_interval
+        self.rings = {}
+        self.missing = {}
+
+    def get(self, tag_name):
+        ring = self.rings.get(tag_name)
+        if ring is not None and ring.retired:
+            ring.close()
+            self.rings.pop(tag_name)
+            ring = None
+        if ring is None:
+            if time.monotonic() < self.missing.get(tag_name, 0):
+                return None
+            try:
+                ring = FrameRing.attach(ring_name(self.project_name, tag_name))
+                self.rings[tag_name] = ring
+                self.missing.pop(tag_name, None)
+            except (FileNotFoundError, ValueError):
+                self.missing[tag_name] = time.monotonic() + self.retry_interval
+                return None
+        return ring
+
+    def close(self):
+        for ring in self.rings.values():
+            ring.close()
+        self.rings.clear()
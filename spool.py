@@ -0,0 +1,249 @@
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# crc32, timestamp (ns), seq (-1 when absent), epoch (-1 when absent), sample rate,
+# topic length, value count
+RECORD_HEADER = struct.Struct("<IqqqdHI")
+SEGMENT_SUFFIX = ".seg2"
+# Segments from before the epoch field; still replayed after an upgrade
+LEGACY_RECORD_HEADER = struct.Struct("<IqqdHI")
+LEGACY_SEGMENT_SUFFIX = ".seg"
+QUARANTINE_FILE = "rejected.quarantine"  # Same record format; never replayed
+
+SpoolFrame = namedtuple("SpoolFrame", ["tag_name", "timestamp", "seq", "sample_rate", "values", "epoch"],
+                        defaults=(None,))
+
+
+def encode_record(frame):
+    topic = frame.tag_name.encode("utf-8")
+    values = np.asarray(frame.values, dtype="<f8")
+    body = topic + values.tobytes()
+    header = RECORD_HEADER.pack(0, int(frame.timestamp), -1 if frame.seq is None else int(frame.seq),
+                                -1 if frame.epoch is None else int(frame.epoch), float(frame.sample_rate or 0),
+                                len(topic), len(values))
+    crc = zlib.crc32(header[4:] + body)
+    return struct.pack("<I", crc) + header[4:] + body
+
+
+def read_records(path, offset, limit):
+    # Returns (frames, next_offset, complete). complete is False when the segment ends in
+    # a torn or corrupt record, e.g. after a crash between write and fsync.
+    legacy = path.endswith(LEGACY_SEGMENT_SUFFIX)
+    record_header = LEGACY_RECORD_HEADER if legacy else RECORD_HEADER
+    frames = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while len(frames) < limit:
+            header = f.read(record_header.size)
+            if not header:
+                return frames, offset, True
+            if len(header) < record_header.size:
+                return frames, offset, False
+            if legacy:
+                crc, timestamp, seq, sample_rate, topic_length, count = record_header.unpack(header)
+                epoch = -1
+            else:
+                crc, timestamp, seq, epoch, sample_rate, topic_length, count = record_header.unpack(header)
+            body = f.read(topic_length + count * 8)
+            if len(body) < topic_length + count * 8 or zlib.crc32(header[4:] + body) != crc:
+                return frames, offset, False
+            values = np.frombuffer(body, dtype="<f8", offset=topic_length).astype(np.float64)
+            frames.append(SpoolFrame(body[:topic_length].decode("utf-8"), timestamp, None if seq < 0 else seq,
+                                     sample_rate or None, values, None if epoch < 0 else epoch))
+            offset += record_header.size + len(body)
+    return frames, offset, True
+
+
+# Append-only store-and-forward buffer between receive and the database. Frames that
+# cannot be stored are appended to segment files (fsync'd in batches); a drain thread
+# replays closed segments oldest first in batches, paced to a frame-rate cap so a
+# backlog never crowds out live ingest. Progress within a segment is kept in a small
+# .offset file next to it, and fully replayed segments are deleted.
+class IngestSpool:
+    def __init__(self, directory, store_batch, rate_limit=200, batch_size=100, segment_bytes=64 * 1024 * 1024,
+                 fsync_every=50, fsync_interval=1.0, retry_interval=5.0):
+        self.directory = directory
+        self.store_batch = store_batch  # callable(list of SpoolFrame) -> bool
+        self.rate_limit = rate_limit  # frames per second
+        self.batch_size = batch_size
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.retry_interval = retry_interval
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.file = None
+        self.active_path = None
+        self.active_records = 0
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.available = True
+        self.spooled = 0
+        self.replayed = 0
+        self.quarantined = 0
+        self.replay_rate = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self.closed = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                             if name.endswith((SEGMENT_SUFFIX, LEGACY_SEGMENT_SUFFIX)))
+        if self.closed:
+            logging.info(f"Spool {directory} holds {len(self.closed)} segments from a previous run")
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="ingest-spool", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=10)
+            self.thread = None
+        with self.lock:
+            self.close_active()
+
+    def mark_unavailable(self):
+        if self.available:
+            logging.warning(f"Storage unavailable; spooling frames to {self.directory}")
+        self.available = False
+
+    def append(self, frame):
+        record = encode_record(frame)
+        with self.lock:
+            if self.file is None:
+                self.active_path = os.path.join(self.directory, f"{time.time_ns():020d}{SEGMENT_SUFFIX}")
+                self.file = open(self.active_path, "ab")
+                self.active_records = 0
+            self.file.write(record)
+            self.active_records += 1
+            self.unsynced += 1
+            self.spooled += 1
+            if self.file.tell() >= self.segment_bytes:
+                self.close_active()
+            else:
+                self.sync_if_due()
+
+    def quarantine(self, frame):
+        # Frames the database rejected outright are set aside for inspection, so they
+        # neither block replay nor get lost
+        record = encode_record(frame)
+        with self.lock:
+            with open(os.path.join(self.directory, QUARANTINE_FILE), "ab") as f:
+                f.write(record)
+            self.quarantined += 1
+
+    def sync_if_due(self):
+        # Called with the lock held
+        if self.file is None or not self.unsynced:
+            return
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+            self.last_sync = time.monotonic()
+
+    def close_active(self):
+        # Called with the lock held; the segment becomes eligible for replay
+        if self.file is None:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+        self.unsynced = 0
+        if self.active_records:
+            self.closed.append(self.active_path)
+        else:
+            os.remove(self.active_path)
+        self.active_path = None
+
+    def next_segment(self):
+        with self.lock:
+            self.sync_if_due()
+            if not self.closed and self.active_records and self.file is not None:
+                self.close_active()
+            if not self.closed:
+                self.available = True
+                return None
+            return self.closed[0]
+
+    def load_offset(self, segment):
+        try:
+            with open(segment + ".offset") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def save_offset(self, segment, offset):
+        with open(segment + ".offset", "w") as f:
+            f.write(str(offset))
+
+    def finish_segment(self, segment):
+        for path in (segment, segment + ".offset"):
+            if os.path.exists(path):
+                os.remove(path)
+        with self.lock:
+            if self.closed and self.closed[0] == segment:
+                self.closed.pop(0)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            segment = self.next_segment()
+            if segment is None:
+                self.replay_rate = 0.0
+                self.stop_event.wait(min(self.fsync_interval, 0.5))
+                continue
+            offset = self.load_offset(segment)
+            try:
+                frames, next_offset, complete = read_records(segment, offset, self.batch_size)
+            except OSError as e:
+                logging.error(f"Failed to read spool segment {segment}: {str(e)}")
+                self.stop_event.wait(self.retry_interval)
+                continue
+            if not frames:
+                if not complete:
+                    logging.warning(f"Discarding torn tail of spool segment {segment} at byte {offset}")
+                self.finish_segment(segment)
+                continue
+            started = time.monotonic()
+            if not self.store_batch(frames):
+                self.mark_unavailable()
+                self.stop_event.wait(self.retry_interval)
+                continue
+            self.available = True
+            self.save_offset(segment, next_offset)
+            self.replayed += len(frames)
+            # Pace batches so replay stays under rate_limit frames per second
+            elapsed = time.monotonic() - started
+            budget = len(frames) / self.rate_limit if self.rate_limit else 0
+            self.stop_event.wait(max(budget - elapsed, 0))
+            self.replay_rate = len(frames) / max(time.monotonic() - started, 1e-9)
+
+    def stats(self):
+        with self.lock:
+            segments = list(self.closed) + ([self.active_path] if self.active_path else [])
+            sizes = [os.path.getsize(path) for path in segments if os.path.exists(path)]
+            replayed_bytes = self.load_offset(self.closed[0]) if self.closed else 0
+        oldest = None
+        if segments:
+            match = re.match(r"(\d+)", os.path.basename(segments[0]))
+            oldest = (time.time_ns() - int(match.group(1))) / 1e9 if match else None
+        return {
+            "available": self.available,
+            "segments": len(segments),
+            "bytes": sum(sizes) - replayed_bytes,
+            "oldest_age": oldest,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "quarantined": self.quarantined,
+            "replay_rate": self.replay_rate,
+        }
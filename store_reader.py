@@ -0,0 +1,132 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+from pymongo import ASCENDING, DESCENDING
+import threading
+import time
+from shm_ring import FrameRingReader
+import settings
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Live data for the dashboard when ingest runs in ingest_daemon.py: a background thread
+# feeds the same coalescer and alarm_event signal that the embedded MQTTHandler would.
+# Frames come from the daemon's shared memory rings when it runs on this machine, and
+# from the frame store otherwise; alarms always come from the event log.
+class StoreFollower(QObject):
+    alarm_event = pyqtSignal(dict)  # Signal: raised/cleared alarm event
+
+    def __init__(self, db, project_name, frame_store, coalescer, poll_interval=0.5, ring_interval=0.05,
+                 tag_refresh=5.0):
+        super().__init__()
+        self.db = db
+        self.project_name = project_name
+        self.frame_store = frame_store
+        self.coalescer = coalescer
+        self.poll_interval = poll_interval
+        self.ring_interval = ring_interval
+        self.tag_refresh = tag_refresh
+        self.rings = FrameRingReader(project_name) if settings.get("shm_rings") else None
+        self.ring_cursors = {}
+        self.tags = []
+        self.tags_loaded = 0
+        self.events_collection = db.tags_collection.database["alarm_events"]
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_timestamps = {}
+        self.last_event_id = None
+        self.followed = 0
+
+    def start(self):
+        latest = self.events_collection.find_one({"project_name": self.project_name}, {"_id": 1},
+                                                 sort=[("_id", DESCENDING)])
+        self.last_event_id = latest["_id"] if latest else None
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name="store-follower", daemon=True)
+        self.thread.start()
+        logging.info(f"Following stored data for {self.project_name} (reader mode)")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+        if self.rings:
+            self.rings.close()
+
+    def run(self):
+        next_poll = 0
+        while not self.stop_event.is_set():
+            try:
+                # Rings are cheap to check, so they are polled at GUI rate; the database far less often
+                store_tags = self.poll_rings()
+                if time.monotonic() >= next_poll:
+                    next_poll = time.monotonic() + self.poll_interval
+                    self.poll_frames(store_tags)
+                    self.poll_events()
+            except Exception as e:
+                logging.error(f"Store follower poll failed: {str(e)}")
+            self.stop_event.wait(self.ring_interval if self.rings else self.poll_interval)
+
+    def project_tags(self):
+        if time.monotonic() - self.tags_loaded >= self.tag_refresh:
+            self.tags = [tag["tag_name"] for tag in self.db.tags_collection.find({"project_name": self.project_name},
+                                                                                 {"tag_name": 1})]
+            self.tags_loaded = time.monotonic()
+        return self.tags
+
+    def poll_rings(self):
+        # Returns the tags that have no ring and must be read from the store
+        if not self.rings:
+            return self.project_tags()
+        store_tags = []
+        for tag_name in self.project_tags():
+            ring = self.rings.get(tag_name)
+            if ring is None:
+                store_tags.append(tag_name)
+                continue
+            cursor = self.ring_cursors.get(tag_name)
+            first_sight = cursor is None or cursor > ring.frames_written()
+            if first_sight:
+                # First sight, or the ring was replaced: start from its newest frame
+                cursor = max(ring.frames_written() - 1, 0)
+            frames, self.ring_cursors[tag_name] = ring.read_since(cursor, self.coalescer.max_pending)
+            if first_sight or (frames and frames[0][0] != cursor):
+                # Frames were skipped; the query cache can no longer be extended in place
+                self.frame_store.cache.invalidate(self.project_name, tag_name)
+            for number, timestamp, values, sample_rate in frames:
+                self.follow(tag_name, timestamp, values)
+        return store_tags
+
+    def poll_frames(self, tags):
+        for tag_name in tags:
+            last = self.last_timestamps.get(tag_name)
+            if last is None:
+                # Start from the newest frame rather than replaying history into the views
+                newest = self.frame_store.latest_frames(self.project_name, tag_name, 1)
+                if newest:
+                    self.last_timestamps[tag_name] = int(newest[0][0])
+                    self.coalescer.push(tag_name, int(newest[0][0]), newest[0][1])
+                continue
+            # Newest frames only: if the GUI fell behind, older ones would be dropped by the coalescer anyway
+            frames = list(self.frame_store.read_frames(self.project_name, tag_name, start=last + 1,
+                                                       limit=self.coalescer.max_pending, latest=True))
+            if len(frames) == self.coalescer.max_pending:
+                self.frame_store.cache.invalidate(self.project_name, tag_name)
+            for timestamp, values in reversed(frames):
+                self.follow(tag_name, int(timestamp), values)
+
+    def follow(self, tag_name, timestamp, values):
+        # The daemon writes the frames, so keep this process's query cache current by hand.
+        # values is the one copy read() made out of the ring slot; views take it as is.
+        self.last_timestamps[tag_name] = timestamp
+        self.frame_store.cache.append(self.project_name, tag_name, timestamp, values)
+        self.coalescer.push(tag_name, timestamp, values)
+        self.followed += 1
+
+    def poll_events(self):
+        query = {"project_name": self.project_name}
+        if self.last_event_id is not None:
+            query["_id"] = {"$gt": self.last_event_id}
+        for event in self.events_collection.find(query).sort("_id", ASCENDING):
+            self.last_event_id = event.pop("_id")
+            self.alarm_event.emit(event)
@@ -0,0 +1,134 @@
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import numpy as np
+from timeutil import to_ns, now_ns, hour_bucket, NS_PER_HOUR
+from frame_store import migrate_string_field
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+OVERALL_WINDOW = "all"
+
+
+# (frames, samples, sum, sum of squares, min, max, first timestamp, last timestamp)
+def merge_stats(a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2], a[3] + b[3], min(a[4], b[4]), max(a[5], b[5]), min(a[6], b[6]),
+            max(a[7], b[7]))
+
+
+def stats_update(stats):
+    frames, samples, total, total_sq, low, high, first, last = stats
+    return {
+        "$inc": {"frames": frames, "samples": samples, "sum": total, "sum_sq": total_sq},
+        "$min": {"min": low, "first_timestamp": first},
+        "$max": {"max": high, "last_timestamp": last},
+    }
+
+class SummaryStore:
+    def __init__(self, db):
+        self.db = db
+        self.summaries_collection = db.tags_collection.database["tag_summaries"]
+        self.summaries_collection.create_index([("project_name", ASCENDING), ("tag_name", ASCENDING), ("window", ASCENDING)],
+                                               unique=True)
+
+    def window_key(self, timestamp):
+        # Hourly windows keyed by the epoch ns at the start of the hour
+        return hour_bucket(timestamp)
+
+    def update(self, project_name, tag_name, values, timestamp):
+        return self.update_many(project_name, tag_name, [(timestamp, values)])
+
+    def update_many(self, project_name, tag_name, frames):
+        # frames: (timestamp, values) pairs. One round trip however many frames: the overall
+        # document, the latest value and one update per hourly window they touch.
+        windows = {}
+        latest = None
+        for timestamp, values in frames:
+            timestamp = to_ns(timestamp)
+            values = np.asarray(values, dtype=np.float64)
+            if not len(values):
+                continue
+            stats = (1, int(len(values)), float(values.sum()), float(np.dot(values, values)), float(values.min()),
+                     float(values.max()), timestamp, timestamp)
+            key = self.window_key(timestamp)
+            windows[key] = merge_stats(windows[key], stats) if key in windows else stats
+            if latest is None or timestamp > latest[0]:
+                latest = (timestamp, float(values[-1]))
+        if latest is None:
+            return False, "Empty frame"
+        overall = {"project_name": project_name, "tag_name": tag_name, "window": OVERALL_WINDOW}
+        total = None
+        for stats in windows.values():
+            total = stats if total is None else merge_stats(total, stats)
+        try:
+            # Ordered, so the overall document exists before the latest value is compared.
+            # Only the newest sample is kept, and only if no later frame got there first:
+            # spooled and replayed frames arrive out of order.
+            self.summaries_collection.bulk_write([
+                UpdateOne(overall, stats_update(total), upsert=True),
+                UpdateOne(dict(overall, **{"$or": [{"latest_timestamp": {"$lt": latest[0]}},
+                                                   {"latest_timestamp": {"$exists": False}}]}),
+                          {"$set": {"latest_value": latest[1], "latest_timestamp": latest[0]},
+                           "$unset": {"latest_values": ""}}),
+            ] + [UpdateOne({"project_name": project_name, "tag_name": tag_name, "window": key}, stats_update(stats),
+                           upsert=True) for key, stats in windows.items()])
+            return True, f"Summary updated for {tag_name}"
+        except Exception as e:
+            logging.error(f"Failed to update summary for {tag_name}: {str(e)}")
+            return False, str(e)
+
+    def get_project_summaries(self, project_name, windows=24):
+        # The overall summary plus the last `windows` hourly windows of every tag
+        first_window = hour_bucket(now_ns()) - (windows - 1) * NS_PER_HOUR
+        query = {"project_name": project_name, "$or": [{"window": OVERALL_WINDOW}, {"window": {"$gte": first_window}}]}
+        summaries = {}
+        for doc in self.summaries_collection.find(query).sort([("tag_name", ASCENDING), ("window", ASCENDING)]):
+            tag = summaries.setdefault(doc["tag_name"], {"overall": None, "windows": []})
+            stats = self.statistics(doc)
+            if doc["window"] == OVERALL_WINDOW:
+                tag["overall"] = stats
+            else:
+                tag["windows"].append(stats)
+        return summaries
+
+    def window_envelope(self, project_name, tag_name, start, end):
+        # Hourly (window start, min, max) for long time ranges; the numeric bounds skip the
+        # "all" window
+        query = {"project_name": project_name, "tag_name": tag_name,
+                 "window": {"$gte": self.window_key(to_ns(start)), "$lte": to_ns(end)}}
+        docs = list(self.summaries_collection.find(query, {"window": 1, "min": 1, "max": 1}).sort("window", ASCENDING))
+        return (np.array([doc["window"] for doc in docs], dtype=np.int64), np.array([doc["min"] for doc in docs]),
+                np.array([doc["max"] for doc in docs]))
+
+    def migrate_legacy_timestamps(self):
+        converted = 0
+        for doc in self.summaries_collection.find({"window": {"$type": "string", "$ne": OVERALL_WINDOW}}, {"window": 1}):
+            try:
+                # Legacy windows are ISO hour prefixes such as "2025-01-31T14"
+                window = self.window_key(to_ns(doc["window"] + ":00"))
+                self.summaries_collection.update_one({"_id": doc["_id"]}, {"$set": {"window": window}})
+                converted += 1
+            except DuplicateKeyError:
+                logging.warning(f"Summary window {doc['window']} already exists in epoch form; left as is")
+        for field in ("first_timestamp", "last_timestamp", "latest_timestamp"):
+            converted += migrate_string_field(self.summaries_collection, field)
+        return converted
+
+    def statistics(self, doc):
+        samples = doc.get("samples", 0)
+        stats = {
+            "window": doc["window"],
+            "frames": doc.get("frames", 0),
+            "samples": samples,
+            "first_timestamp": doc.get("first_timestamp"),
+            "last_timestamp": doc.get("last_timestamp"),
+            "min": doc.get("min"),
+            "max": doc.get("max"),
+            "mean": doc["sum"] / samples if samples else None,
+            "rms": float(np.sqrt(doc["sum_sq"] / samples)) if samples else None,
+        }
+        if "latest_timestamp" in doc:
+            # Documents from before latest_value held the whole newest frame
+            stats["latest_value"] = doc["latest_value"] if "latest_value" in doc else doc["latest_values"][-1]
+            stats["latest_timestamp"] = doc["latest_timestamp"]
+        return stats
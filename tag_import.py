@@ -0,0 +1,105 @@
+import csv
+import json
+import os
+from pymongo.errors import BulkWriteError
+from tag_metadata import split_tag_string, TagMetadata, FIELD_TYPES, FIELD_ALIASES
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Bulk tag commissioning. A tag file is either
+#   CSV:  a header row with "tag" (or "tag_name"), optional "unit" and any metadata
+#         columns (sample_rate, scale, offset, ...), one tag per row; or
+#   JSON: a list of full tag strings ("topic|unit|key=value,...") and/or objects
+#         {"tag": ..., "unit": ..., "sample_rate": ...}.
+# Everything is validated first; valid tags are then written with one insert_many.
+
+
+def tag_string_from_fields(fields):
+    fields = {key.strip().lower(): value for key, value in fields.items() if key and value not in (None, "")}
+    tag = str(fields.pop("tag", fields.pop("tag_name", ""))).strip()
+    if "|" in tag:
+        return tag
+    unit = str(fields.pop("unit", "")).strip()
+    metadata = ",".join(f"{key}={value}" for key, value in fields.items()
+                        if FIELD_ALIASES.get(key, key) in FIELD_TYPES)
+    return f"{tag}|{unit}|{metadata}" if metadata else f"{tag}|{unit}"
+
+
+def read_tag_file(path):
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path) as f:
+            entries = json.load(f)
+        if isinstance(entries, dict):
+            entries = entries.get("tags", [])
+        if not isinstance(entries, list):
+            raise ValueError("Expected a list of tags")
+        # Anything that is neither a string nor an object is left for validate_tags to report
+        return [tag_string_from_fields(entry) if isinstance(entry, dict) else entry for entry in entries]
+    with open(path, newline="") as f:
+        try:
+            return [tag_string_from_fields(row) for row in csv.DictReader(f)]
+        except csv.Error as e:
+            raise ValueError(str(e))
+
+
+def validate_tags(db, project_name, tag_strings):
+    # Returns (docs, errors); errors are (line, tag string, reason)
+    existing = {tag["tag_name"] for tag in db.tags_collection.find({"project_name": project_name}, {"tag_name": 1})}
+    docs, errors, seen = [], [], set()
+    for line, tag_string in enumerate(tag_strings, 1):
+        if not isinstance(tag_string, str):
+            errors.append((line, repr(tag_string), "Tag entry must be a string or an object"))
+            continue
+        try:
+            base, metadata = split_tag_string(tag_string.strip())
+        except ValueError as e:
+            errors.append((line, tag_string, str(e)))
+            continue
+        tag_data = db.parse_tag_string(base)
+        if tag_data is None:
+            errors.append((line, tag_string, "Invalid tag format"))
+            continue
+        tag_name = tag_data["tag_name"]
+        if tag_name in existing:
+            errors.append((line, tag_string, "Tag already exists"))
+            continue
+        if tag_name in seen:
+            errors.append((line, tag_string, "Duplicate in file"))
+            continue
+        seen.add(tag_name)
+        doc = dict(tag_data, project_name=project_name)
+        if metadata:
+            doc["metadata"] = TagMetadata(tag_name, tag_data.get("unit"), **metadata).as_dict()
+        docs.append(doc)
+    return docs, errors
+
+
+def import_tags(db, project_name, tag_strings):
+    # Returns (success, message, added tag names, errors)
+    docs, errors = validate_tags(db, project_name, tag_strings)
+    if not docs:
+        return False, f"No valid tags to import ({len(errors)} rejected)", [], errors
+    try:
+        db.tags_collection.insert_many(docs, ordered=False)
+        added = [doc["tag_name"] for doc in docs]
+    except BulkWriteError as e:
+        # Someone else added some of them meanwhile; keep the rest
+        failed = {error["index"] for error in e.details.get("writeErrors", [])}
+        added = [doc["tag_name"] for index, doc in enumerate(docs) if index not in failed]
+        errors.extend((None, docs[index]["tag_name"], "Insert failed") for index in sorted(failed))
+    except Exception as e:
+        logging.error(f"Failed to import tags into {project_name}: {str(e)}")
+        return False, str(e), [], errors
+    logging.info(f"Imported {len(added)} tags into {project_name} ({len(errors)} rejected)")
+    return True, f"Imported {len(added)} tags ({len(errors)} rejected)", added, errors
+
+
+def delete_tags(db, project_name, tag_names):
+    try:
+        result = db.tags_collection.delete_many({"project_name": project_name, "tag_name": {"$in": list(tag_names)}})
+        logging.info(f"Deleted {result.deleted_count} tags from {project_name}")
+        return True, f"Deleted {result.deleted_count} tags"
+    except Exception as e:
+        logging.error(f"Failed to delete tags from {project_name}: {str(e)}")
+        return False, str(e)
@@ -0,0 +1,122 @@
+import threading
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Signal description stored under "metadata" on each tag document. Defaults match what
+# the publisher sends today: one 4096-sample frame per second of raw ADC counts.
+DEFAULT_METADATA = {
+    "sample_rate": 4096.0,  # Hz
+    "frame_length": 4096,  # samples per frame
+    "scale": 1.0,  # engineering value = raw * scale + offset
+    "offset": 0.0,
+    "sensor_type": "generic",
+    "raw_min": 16390.0,  # expected raw range, used for default axis limits
+    "raw_max": 46537.0,
+}
+FIELD_TYPES = {"sample_rate": float, "frame_length": int, "scale": float, "offset": float, "sensor_type": str,
+               "raw_min": float, "raw_max": float}
+FIELD_ALIASES = {"sr": "sample_rate", "fs": "sample_rate", "n": "frame_length", "sensor": "sensor_type"}
+
+
+class TagMetadata:
+    def __init__(self, tag_name, unit=None, **fields):
+        self.tag_name = tag_name
+        self.unit = unit or ""
+        values = dict(DEFAULT_METADATA)
+        values.update({key: value for key, value in fields.items() if key in DEFAULT_METADATA})
+        for key, value in values.items():
+            setattr(self, key, FIELD_TYPES[key](value))
+
+    @property
+    def is_identity(self):
+        return self.scale == 1.0 and self.offset == 0.0
+
+    @property
+    def sample_spacing(self):
+        return 1.0 / self.sample_rate
+
+    def to_engineering(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if self.is_identity:
+            return values
+        return values * self.scale + self.offset
+
+    def value_range(self):
+        low, high = self.to_engineering([self.raw_min, self.raw_max])
+        return (min(low, high), max(low, high))
+
+    def frame_times(self, count=None):
+        # Seconds from the start of a frame for each sample
+        return np.arange(count or self.frame_length) / self.sample_rate
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in DEFAULT_METADATA}
+
+
+def parse_metadata(text):
+    # "sample_rate=4096,scale=0.001,offset=-31463,sensor=accelerometer"
+    fields = {}
+    for item in filter(None, (part.strip() for part in text.replace(";", ",").split(","))):
+        if "=" not in item:
+            raise ValueError(f"Expected key=value, got '{item}'")
+        key, value = (part.strip() for part in item.split("=", 1))
+        key = FIELD_ALIASES.get(key, key)
+        if key not in FIELD_TYPES:
+            raise ValueError(f"Unknown tag field '{key}'. Use one of: {', '.join(FIELD_TYPES)}")
+        fields[key] = FIELD_TYPES[key](value)
+    if fields.get("sample_rate", 1) <= 0 or fields.get("frame_length", 1) <= 0:
+        raise ValueError("sample_rate and frame_length must be positive")
+    return fields
+
+
+def split_tag_string(tag_string):
+    # "topic|unit|key=value,..." -> ("topic|unit", {metadata}); the first part is what
+    # Database.parse_tag_string understands
+    parts = tag_string.split("|", 2)
+    base = "|".join(parts[:2])
+    return base, parse_metadata(parts[2]) if len(parts) > 2 else {}
+
+
+class TagMetadataStore:
+    def __init__(self, db):
+        self.db = db
+        self.lock = threading.Lock()
+        self.cache = {}
+
+    def get(self, project_name, tag_name):
+        key = (project_name, tag_name)
+        with self.lock:
+            metadata = self.cache.get(key)
+        if metadata is None:
+            try:
+                tag = self.db.tags_collection.find_one({"project_name": project_name, "tag_name": tag_name},
+                                                       {"unit": 1, "metadata": 1}) or {}
+            except Exception as e:
+                # Defaults keep ingest going while the database is unreachable; not cached
+                logging.error(f"Failed to load metadata for {tag_name}: {str(e)}")
+                return TagMetadata(tag_name)
+            metadata = TagMetadata(tag_name, tag.get("unit"), **tag.get("metadata", {}))
+            with self.lock:
+                self.cache[key] = metadata
+        return metadata
+
+    def set(self, project_name, tag_name, fields):
+        try:
+            current = self.get(project_name, tag_name)
+            metadata = TagMetadata(tag_name, current.unit, **dict(current.as_dict(), **fields))
+            self.db.tags_collection.update_one({"project_name": project_name, "tag_name": tag_name},
+                                               {"$set": {"metadata": metadata.as_dict()}})
+            self.invalidate(project_name, tag_name)
+            return True, f"Metadata updated for {tag_name}"
+        except Exception as e:
+            logging.error(f"Failed to update metadata for {tag_name}: {str(e)}")
+            return False, str(e)
+
+    def invalidate(self, project_name=None, tag_name=None):
+        with self.lock:
+            if tag_name is None:
+                self.cache.clear()
+            else:
+                self.cache.pop((project_name, tag_name), None)
@@ -0,0 +1,106 @@
+import pytest
+
+pytest.importorskip("pymongo")
+
+from alarms import AlarmEngine
+from metrics import METRIC_NAMES
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+        self.inserts = 0
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def find(self, query):
+        return [doc for doc in self.docs if all(doc.get(key) == value for key, value in query.items())]
+
+    def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    def insert_many(self, docs):
+        self.inserts += 1
+        self.docs.extend(docs)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection()
+        return collection
+
+
+class FakeTags:
+    def __init__(self):
+        self.database = FakeDatabase()
+
+
+class FakeDb:
+    def __init__(self):
+        self.tags_collection = FakeTags()
+
+
+def metrics(**values):
+    return dict({name: 0.0 for name in METRIC_NAMES}, **values)
+
+
+def make_engine(*rules):
+    engine = AlarmEngine(FakeDb(), "p")
+    for rule in rules:
+        assert engine.add_rule(**rule)[0]
+    return engine
+
+
+def states(engine, tag_name, rms_values, persist=True):
+    return [[event["state"] for event in engine.process(tag_name, metrics(rms=value), timestamp, persist)]
+            for timestamp, value in enumerate(rms_values)]
+
+
+def test_raise_and_clear_with_hysteresis():
+    engine = make_engine(dict(tag_name="a", metric="rms", threshold=10.0, hysteresis=2.0))
+    # Clears only once the value drops below threshold - hysteresis
+    assert states(engine, "a", [5, 11, 12, 9, 8.5, 7.9, 11]) == [[], ["raised"], [], [], [], ["cleared"], ["raised"]]
+    assert len(engine.active_alarms()) == 1
+
+
+def test_below_rule():
+    engine = make_engine(dict(tag_name="a", metric="rms", threshold=1.0, direction="below", hysteresis=0.5))
+    assert states(engine, "a", [2, 0.5, 1.2, 1.6]) == [[], ["raised"], [], ["cleared"]]
+
+
+def test_delay_counts_consecutive_frames():
+    engine = make_engine(dict(tag_name="a", metric="rms", threshold=10.0, delay_frames=3))
+    # An interruption restarts the count, for raising and for clearing
+    assert states(engine, "a", [11, 11, 5, 11, 11, 11, 5, 5, 11, 5, 5, 5]) == \
+        [[], [], [], [], [], ["raised"], [], [], [], [], [], ["cleared"]]
+
+
+def test_rules_only_move_on_their_own_tag():
+    engine = make_engine(dict(tag_name="a", metric="rms", threshold=10.0, delay_frames=2),
+                         dict(tag_name="b", metric="rms", threshold=10.0))
+    assert states(engine, "a", [11]) == [[]]
+    assert states(engine, "b", [11, 11]) == [["raised"], []]
+    assert states(engine, "a", [11]) == [["raised"]]
+    assert engine.process("c", metrics(rms=99), 0) == []
+
+
+def test_events_are_persisted():
+    engine = make_engine(dict(tag_name="a", metric="rms", threshold=10.0, severity="trip"))
+    events = engine.process("a", metrics(rms=12.5), 42)
+    stored = engine.events_collection.docs
+    assert stored == events and engine.events_collection.inserts == 1
+    assert stored[0]["value"] == 12.5 and stored[0]["timestamp"] == 42 and stored[0]["severity"] == "trip"
+
+
+def test_view_only_evaluation_is_not_persisted():
+    engine = make_engine(dict(tag_name="a", metric="rms", threshold=10.0))
+    assert states(engine, "a", [12, 5], persist=False) == [["raised"], ["cleared"]]
+    assert engine.events_collection.docs == []
+
+
+def test_rejects_unknown_metric_and_direction():
+    engine = make_engine()
+    assert not engine.add_rule("a", "nope", 1.0)[0]
+    assert not engine.add_rule("a", "rms", 1.0, direction="sideways")[0]
+    assert engine.rules == []
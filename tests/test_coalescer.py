@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from coalescer import FrameCoalescer
+
+
+@pytest.fixture
+def coalescer():
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    coalescer = FrameCoalescer(max_pending=2, interval_ms=60000)
+    yield coalescer
+    coalescer.stop()
+
+
+def test_flush_emits_each_tag_once(coalescer):
+    emitted = []
+    coalescer.tags_updated.connect(emitted.append)
+    coalescer.push("a", 1, np.zeros(4))
+    coalescer.push("a", 2, np.zeros(4))
+    coalescer.push("b", 1, np.zeros(4))
+    coalescer.flush()
+    assert len(emitted) == 1 and sorted(emitted[0]) == ["a", "b"]
+    coalescer.flush()
+    assert len(emitted) == 1
+
+
+def test_take_during_flush(coalescer):
+    taken = {}
+    coalescer.tags_updated.connect(lambda tags: taken.update({tag: coalescer.take(tag) for tag in tags}))
+    coalescer.push("a", 1, np.ones(3))
+    coalescer.flush()
+    assert [timestamp for timestamp, _ in taken["a"]] == [1]
+    assert coalescer.take("a") == []
+    assert coalescer.stats()["delivered"] == 1
+
+
+def test_slot_is_bounded(coalescer):
+    for timestamp in range(5):
+        coalescer.push("a", timestamp, np.zeros(2))
+    stats = coalescer.stats()
+    assert (stats["received"], stats["merged"], stats["dropped"], stats["pending"]) == (5, 4, 3, 2)
+    assert coalescer.nbytes() == 2 * 8 * 2
+    coalescer.clear()
+    assert coalescer.stats()["pending"] == 0 and coalescer.nbytes() == 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from codec import CODECS, encode_frame, decode_frame, decode_engineering
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_round_trip(name):
+    rng = np.random.default_rng(1)
+    values = np.round(rng.normal(0, 50, 4096), 2)
+    if not CODECS[name].can_encode(values):
+        pytest.skip(f"{name} cannot encode the sample")
+    doc = CODECS[name].encode(values)
+    np.testing.assert_array_equal(CODECS[name].decode(doc), values)
+
+
+def test_unscalable_values_fall_back_to_xor():
+    values = np.random.default_rng(2).normal(size=1000)
+    doc = encode_frame(values)
+    assert doc["codec"].startswith("xor-")
+    np.testing.assert_array_equal(decode_frame(doc), values)
+
+
+def test_special_values_survive():
+    values = np.array([0.0, -0.0, np.inf, -np.inf, 1e300, 5e-324])
+    np.testing.assert_array_equal(decode_frame(encode_frame(values)), values)
+
+
+def test_empty_frame():
+    assert len(decode_frame(encode_frame([]))) == 0
+
+
+def test_engineering_scale_is_separate_from_codec_scale():
+    counts = np.array([100.0, 200.0, 300.0])
+    doc = encode_frame(counts)
+    np.testing.assert_array_equal(decode_engineering(doc), counts)
+    doc.update({"eng_scale": 0.01, "eng_offset": 1.0})
+    np.testing.assert_allclose(decode_engineering(doc), [2.0, 3.0, 4.0])
@@ -0,0 +1,75 @@
+import pytest
+
+from frame_envelope import SequenceTracker, encode_envelope, decode_payload
+
+NS = 1_000_000_000
+
+
+def test_envelope_round_trip():
+    header, values = decode_payload(encode_envelope(7, 123 * NS, 4096, [1.0, 2.5], epoch=99).encode("utf-8"))
+    assert header == {"seq": 7, "ts": 123 * NS, "sr": 4096, "epoch": 99}
+    assert values == [1.0, 2.5]
+
+
+def test_envelope_without_epoch():
+    header, _ = decode_payload(encode_envelope(0, NS, None, []))
+    assert header["epoch"] is None
+
+
+def test_legacy_csv_payload():
+    assert decode_payload(b" 1, 2.5 ,3 ") == (None, [1.0, 2.5, 3.0])
+
+
+def test_envelope_missing_seq():
+    with pytest.raises(ValueError):
+        decode_payload('{"ts": 1, "values": []}')
+
+
+def test_new_gap_and_duplicate():
+    tracker = SequenceTracker()
+    assert tracker.check("a", 0, 1 * NS, epoch=5) == SequenceTracker.NEW
+    assert tracker.check("a", 1, 2 * NS, epoch=5) == SequenceTracker.NEW
+    assert tracker.check("a", 4, 3 * NS, epoch=5) == SequenceTracker.GAP
+    # A redelivery keeps its epoch and an older seq, whatever its timestamp says
+    assert tracker.check("a", 1, 9 * NS, epoch=5) == SequenceTracker.DUPLICATE
+    stats = tracker.stats("a")
+    assert (stats["frames"], stats["gaps"], stats["missing"], stats["duplicates"]) == (3, 1, 2, 1)
+    assert tracker.epoch("a") == 5
+
+
+def test_new_epoch_is_a_reset():
+    tracker = SequenceTracker()
+    tracker.check("a", 10, 5 * NS, epoch=1)
+    assert tracker.check("a", 0, 1 * NS, epoch=2) == SequenceTracker.RESET
+    assert tracker.epoch("a") == 2
+    assert tracker.check("a", 1, 2 * NS, epoch=2) == SequenceTracker.NEW
+
+
+def test_legacy_restart_starts_a_stream_at_its_timestamp():
+    tracker = SequenceTracker()
+    tracker.check("a", 10, 5 * NS)
+    assert tracker.check("a", 10, 5 * NS) == SequenceTracker.DUPLICATE
+    assert tracker.check("a", 0, 6 * NS) == SequenceTracker.RESET
+    assert tracker.epoch("a") == 6 * NS
+    assert tracker.check("a", 1, 7 * NS) == SequenceTracker.NEW
+    assert tracker.epoch("a") == 6 * NS
+
+
+def test_seed_is_used_on_first_sight():
+    tracker = SequenceTracker(seed=lambda tag_name: (3, 3 * NS, 8))
+    assert tracker.check("a", 3, 3 * NS, epoch=8) == SequenceTracker.DUPLICATE
+    assert tracker.check("a", 4, 4 * NS, epoch=8) == SequenceTracker.NEW
+
+
+def test_failing_seed_does_not_lose_the_frame():
+    def seed(tag_name):
+        raise ConnectionError("down")
+    assert SequenceTracker(seed=seed).check("a", 3, NS) == SequenceTracker.NEW
+
+
+def test_reset_forgets_positions_and_seed():
+    tracker = SequenceTracker(seed=lambda tag_name: (100, 100 * NS, 1))
+    tracker.check("a", 5, NS, epoch=1)
+    tracker.reset()
+    assert tracker.check("a", 5, NS, epoch=1) == SequenceTracker.NEW
+    assert tracker.stats()["duplicates"] == 1
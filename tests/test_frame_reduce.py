@@ -0,0 +1,112 @@
+import numpy as np
+
+from codec import encode_frame
+from frame_reduce import GridReduction, decimate, decode_and_reduce, find_gaps, metrics_fill
+
+NS = 1_000_000_000
+RATE = 100
+
+
+def chunk_docs(chunk, frames=10, length=100):
+    # One second per frame; chunk k holds seconds [k * frames, (k + 1) * frames)
+    docs = []
+    for i in range(frames):
+        second = chunk * frames + i
+        doc = encode_frame(np.full(length, float(second)))
+        doc["timestamp"] = second * NS
+        docs.append(doc)
+    return docs
+
+
+def test_every_chunk_keeps_its_resolution():
+    chunks = 100
+    end = chunks * 10 * NS
+    grid = GridReduction(0, end, 500)
+    for chunk in range(chunks):
+        grid.add(decode_and_reduce(chunk_docs(chunk), grid.start, grid.bucket_ns, grid.buckets, RATE))
+    result = grid.result()
+    assert result["frames"] == 1000
+    # 1000 s over 500 buckets: two seconds (values) per bucket, the first chunk included
+    assert len(result["values"]) == 2 * 500
+    np.testing.assert_array_equal(result["values"][:4], [0.0, 1.0, 2.0, 3.0])
+    assert result["values"][-1] == 999.0
+    assert result["latest_value"] == 999.0
+    assert [entry[1][-1] for entry in result["recent"]] == [995.0, 996.0, 997.0, 998.0, 999.0]
+
+
+def test_merge_order_does_not_matter():
+    in_order, reverse = GridReduction(0, 30 * NS, 30), GridReduction(0, 30 * NS, 30)
+    parts = [decode_and_reduce(chunk_docs(chunk), 0, in_order.bucket_ns, 30, RATE) for chunk in range(3)]
+    for part in parts:
+        in_order.add(part)
+    for part in reversed(parts):
+        reverse.add(part)
+    np.testing.assert_array_equal(in_order.result()["values"], reverse.result()["values"])
+    assert reverse.result()["latest_value"] == 29.0
+
+
+def test_empty_grid():
+    grid = GridReduction(0, NS, 10)
+    grid.add(decode_and_reduce([], 0, grid.bucket_ns, 10))
+    assert grid.result() is None
+
+
+def test_decimate_keeps_extremes():
+    times = np.arange(1000)
+    values = np.sin(times / 50.0)
+    values[321] = 5.0
+    out_times, out_values = decimate(times, values, 100)
+    assert len(out_values) <= 100 and out_values.max() == 5.0 and 321 in out_times
+
+
+class FakeMetricsStore:
+    # Per-frame min/max metrics, one frame per second, as MetricsStore.get_series returns them
+    def __init__(self, seconds):
+        self.times = np.array(seconds, dtype=np.int64) * NS
+        self.calls = 0
+
+    def get_series(self, project_name, tag_name, metric, start=None, end=None):
+        self.calls += 1
+        keep = (self.times >= start) & (self.times <= end)
+        values = self.times[keep] / NS
+        return self.times[keep], values - 1 if metric == "min" else values + 1
+
+
+def test_find_gaps():
+    times = np.array([5, 15, 25, 85, 95]) * NS
+    assert find_gaps(times, 10 * NS, 0, 100 * NS) == [(30 * NS, 80 * NS)]
+    assert find_gaps(np.empty(0), NS, 0, 10) == [(0, 10)]
+
+
+def test_metrics_fill_buckets_only_inside_gaps():
+    store = FakeMetricsStore(range(100))
+    times, mins, maxs = metrics_fill(store, "p", "a", [(30 * NS, 49 * NS)], 0, 10 * NS)
+    assert times.tolist() == [30 * NS, 40 * NS]
+    assert mins.tolist() == [29.0, 39.0] and maxs.tolist() == [40.0, 50.0]
+    assert len(metrics_fill(store, "p", "a", [], 0, NS)[0]) == 0
+    assert len(metrics_fill(None, "p", "a", [(0, NS)], 0, NS)[0]) == 0
+
+
+def test_grid_fills_gaps_from_metrics():
+    # Raw frames for the first and last 10 s of 100 s only, as the triggered capture mode stores them
+    grid = GridReduction(0, 100 * NS, 50)
+    docs = chunk_docs(0) + chunk_docs(9)
+    grid.add(decode_and_reduce(docs, grid.start, grid.bucket_ns, grid.buckets, RATE))
+    store = FakeMetricsStore(range(100))
+    grid.fill_gaps(store, "p", "a")
+    result = grid.result()
+    assert [(int(start // NS), int(end // NS)) for start, end in result["gaps"]] == [(10, 90)]
+    assert len(result["values"]) == 2 * 10
+    assert len(result["fill_values"]) == 2 * 40
+    assert result["fill_values"][:2].tolist() == [9.0, 12.0]
+
+
+def test_grid_without_frames_uses_metrics_alone():
+    grid = GridReduction(0, 10 * NS, 5)
+    grid.fill_gaps(FakeMetricsStore(range(10)), "p", "a")
+    result = grid.result()
+    assert result["frames"] == 0 and len(result["values"]) == 0
+    assert len(result["fill_values"]) == 2 * 5
+    grid = GridReduction(0, 10 * NS, 5)
+    grid.fill_gaps(None, "p", "a")
+    assert grid.result() is None
@@ -0,0 +1,91 @@
+import pytest
+
+pytest.importorskip("pymongo")
+
+from frame_envelope import SequenceTracker
+from frame_store import FrameStore
+
+
+class UpdateResult:
+    def __init__(self, upserted_id):
+        self.upserted_id = upserted_id
+
+
+class FakeCollection:
+    # Just enough of a pymongo collection for FrameStore's sequenced writes
+    def __init__(self, name, database):
+        self.name = name
+        self.database = database
+        self.docs = []
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def index_information(self):
+        return {}
+
+    def matches(self, doc, query):
+        return all(doc.get(key) == value for key, value in query.items())
+
+    def update_one(self, query, update, upsert=False):
+        if any(self.matches(doc, query) for doc in self.docs):
+            return UpdateResult(None)
+        doc = dict(update["$setOnInsert"], _id=len(self.docs))
+        self.docs.append(doc)
+        return UpdateResult(doc["_id"])
+
+    def insert_one(self, doc):
+        self.docs.append(dict(doc, _id=len(self.docs)))
+
+    def find_one(self, query, projection=None, sort=None):
+        docs = [doc for doc in self.docs
+                if all(doc.get(key) == value for key, value in query.items() if not isinstance(value, dict))]
+        if sort:
+            docs.sort(key=lambda doc: doc[sort[0][0]], reverse=sort[0][1] < 0)
+        return docs[0] if docs else None
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection(name, self)
+        return collection
+
+
+class FakeDb:
+    def __init__(self):
+        self.tags_collection = FakeDatabase()["tags"]
+
+
+def store_run(store, tracker, epoch, timestamps):
+    results = []
+    for seq, timestamp in enumerate(timestamps):
+        status = tracker.check("tag", seq, timestamp, epoch)
+        if status == SequenceTracker.DUPLICATE:
+            results.append("duplicate")
+            continue
+        stored, message = store.write_frame("project", "tag", [1.0, 2.0], timestamp, seq, 4096,
+                                            tracker.epoch("tag"))
+        results.append("already" if "already" in message else "stored")
+    return results
+
+
+@pytest.mark.parametrize("with_epoch", [True, False])
+def test_restarted_publisher_frames_are_stored(with_epoch):
+    store = FrameStore(FakeDb())
+    tracker = SequenceTracker(lambda tag_name: store.last_sequence("project", tag_name))
+    first = store_run(store, tracker, 1000 if with_epoch else None, range(10_000, 10_010))
+    # The publisher restarts and counts from 0 again, later in source time
+    second = store_run(store, tracker, 2000 if with_epoch else None, range(20_000, 20_005))
+    assert first == ["stored"] * 10
+    assert second == ["stored"] * 5
+    assert len(store.frames_collection.docs) == 15
+
+
+def test_redelivery_after_restart_of_the_dashboard_is_not_stored_twice():
+    store = FrameStore(FakeDb())
+    store_run(store, SequenceTracker(lambda tag_name: store.last_sequence("project", tag_name)), 1000,
+              range(10_000, 10_010))
+    tracker = SequenceTracker(lambda tag_name: store.last_sequence("project", tag_name))
+    assert tracker.check("tag", 9, 10_009, 1000) == SequenceTracker.DUPLICATE
+    stored, message = store.write_frame("project", "tag", [1.0], 10_009, 9, 4096, 1000)
+    assert "already" in message
@@ -0,0 +1,80 @@
+import numpy as np
+
+from memory_budget import MemoryBudget, estimate_nbytes
+
+
+class Holder:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+        self.releases = 0
+
+    def size(self):
+        return self.nbytes
+
+    def release(self):
+        self.releases += 1
+        self.nbytes = 0
+
+
+def register(budget, key, nbytes, shrinkable=True):
+    holder = Holder(nbytes)
+    budget.register(key, holder.size, holder.release if shrinkable else None, label=key)
+    return holder
+
+
+def test_under_budget_releases_nothing():
+    budget = MemoryBudget(100)
+    holder = register(budget, "a", 60)
+    assert budget.enforce() == []
+    assert holder.releases == 0 and budget.stats()["tracked"] == 60
+
+
+def test_releases_least_recently_used_first():
+    budget = MemoryBudget(100)
+    a, b, c = (register(budget, key, 50) for key in "abc")
+    budget.touch("a")
+    assert budget.enforce() == ["b"]
+    assert (a.releases, b.releases, c.releases) == (0, 1, 0)
+    stats = budget.stats()
+    assert (stats["tracked"], stats["evictions"], stats["freed"]) == (100, 1, 50)
+
+
+def test_skips_entries_that_cannot_shrink():
+    budget = MemoryBudget(50)
+    register(budget, "fixed", 80, shrinkable=False)
+    holder = register(budget, "cache", 40)
+    assert budget.enforce() == ["cache"]
+    assert holder.releases == 1 and budget.stats()["tracked"] == 80
+
+
+def test_failing_release_is_skipped():
+    budget = MemoryBudget(50)
+    budget.register("broken", lambda: 80, lambda: 1 / 0, label="broken")
+    holder = register(budget, "cache", 40)
+    assert budget.enforce() == ["cache"]
+    assert holder.releases == 1
+
+
+def test_unregister_and_usage():
+    budget = MemoryBudget(1000)
+    register(budget, "small", 10)
+    register(budget, "large", 30)
+    register(budget, "gone", 20)
+    budget.unregister("gone")
+    budget.enforce()
+    assert budget.usage() == [("large", 30), ("small", 10)]
+    assert budget.stats()["entries"] == 2
+
+
+def test_estimate_nbytes():
+    values = np.zeros(1000)
+    assert estimate_nbytes(values) == values.nbytes
+    # Shared arrays are counted once
+    assert values.nbytes <= estimate_nbytes({"a": values, "b": [values]}) < 2 * values.nbytes
+    # Large containers are sampled and scaled up
+    arrays = [np.zeros(10) for _ in range(1000)]
+    assert estimate_nbytes(arrays) >= 1000 * 80
+    # Objects reporting their own size are trusted
+    holder = Holder(123)
+    holder.memory_usage = lambda: 123
+    assert estimate_nbytes(holder) == 123
@@ -0,0 +1,90 @@
+import pytest
+
+pytest.importorskip("pymongo")
+
+from metrics import MetricsStore, MetricSeries
+from timeutil import NS_PER_HOUR, now_ns
+
+
+class Cursor(list):
+    def sort(self, key, direction):
+        return Cursor(sorted(self, key=lambda doc: doc[key]))
+
+
+class FakeCollection:
+    # Just enough of a pymongo collection for MetricsStore's hourly buckets
+    def __init__(self, name, database):
+        self.name = name
+        self.database = database
+        self.docs = []
+        self.finds = 0
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def matches(self, doc, query):
+        for key, value in query.items():
+            if isinstance(value, dict):
+                if "$gte" in value and doc[key] < value["$gte"] or "$lte" in value and doc[key] > value["$lte"]:
+                    return False
+            elif doc.get(key) != value:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        return Cursor(dict(doc) for doc in self.docs if self.matches(doc, query))
+
+    def update_one(self, query, update, upsert=False):
+        doc = next((doc for doc in self.docs if self.matches(doc, query)), None)
+        if doc is None:
+            doc = dict(query)
+            self.docs.append(doc)
+        for name, value in update["$push"].items():
+            doc.setdefault(name, []).append(value)
+        doc["count"] = doc.get("count", 0) + update["$inc"]["count"]
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection(name, self)
+        return collection
+
+
+class FakeDb:
+    def __init__(self):
+        self.tags_collection = FakeDatabase()["tags"]
+
+
+def metrics(value):
+    return dict.fromkeys(["rms", "peak", "peak_to_peak", "crest_factor", "mean", "kurtosis", "band_energy", "min",
+                          "max"], float(value))
+
+
+def test_series_picks_up_late_frames():
+    store = MetricsStore(FakeDb())
+    now = now_ns()
+    hour_ago = now - NS_PER_HOUR
+    store.append("p", "a", hour_ago, metrics(1))
+    store.append("p", "a", now - 10, metrics(2))
+    series = MetricSeries(store, "p", "a", "rms", 3 * NS_PER_HOUR)
+    timestamps, values = series.refresh()
+    assert values.tolist() == [1.0, 2.0]
+    # A spool replay lands frames before the newest point held, an hour back and now
+    store.append("p", "a", hour_ago + 5, metrics(3))
+    store.append("p", "a", now - 20, metrics(4))
+    timestamps, values = series.refresh()
+    assert timestamps.tolist() == [hour_ago, hour_ago + 5, now - 20, now - 10]
+    assert values.tolist() == [1.0, 3.0, 4.0, 2.0]
+
+
+def test_unchanged_buckets_are_not_read_again():
+    store = MetricsStore(FakeDb())
+    store.append("p", "a", now_ns() - 10, metrics(1))
+    series = MetricSeries(store, "p", "a", "rms", NS_PER_HOUR)
+    series.refresh()
+    finds = store.metrics_collection.finds
+    timestamps, values = series.refresh()
+    # Only the bucket counts are read
+    assert store.metrics_collection.finds == finds + 1
+    assert values.tolist() == [1.0]
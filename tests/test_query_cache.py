@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from query_cache import QueryCache
+
+
+def frame(value, length=10):
+    return np.full(length, float(value))
+
+
+def timestamps_of(result):
+    return result[0].tolist()
+
+
+def test_miss_then_hit():
+    cache = QueryCache()
+    assert cache.get("p", "a", 0, 10) is None
+    cache.put("p", "a", 0, 10, 0, [1, 2], [frame(1), frame(2)])
+    timestamps, frames = cache.get("p", "a", 0, 10)
+    assert timestamps.tolist() == [1, 2] and frames[1][0] == 2.0
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_cached_arrays_are_read_only():
+    cache = QueryCache()
+    _, frames = cache.put("p", "a", None, None, 0, [1], [frame(1)])
+    with pytest.raises(ValueError):
+        frames[0][0] = 5.0
+
+
+def test_limit_is_served_from_a_larger_entry():
+    cache = QueryCache()
+    cache.put("p", "a", None, None, 3, [1, 2, 3], [frame(1), frame(2), frame(3)])
+    assert timestamps_of(cache.get("p", "a", limit=1)) == [3]
+    assert timestamps_of(cache.get("p", "a", limit=3)) == [1, 2, 3]
+    assert cache.get("p", "a", limit=4) is None
+    assert cache.get("p", "a") is None
+    # A whole-range entry serves any limit
+    cache.put("p", "a", None, None, 0, [1, 2, 3, 4], [frame(i) for i in range(1, 5)])
+    assert timestamps_of(cache.get("p", "a", limit=4)) == [1, 2, 3, 4]
+    assert cache.stats()["entries"] == 1
+
+
+def test_resolution_is_part_of_the_key():
+    cache = QueryCache()
+    cache.put("p", "a", 0, 10, 0, [1], [frame(1)], resolution=1000)
+    assert cache.get("p", "a", 0, 10) is None
+    assert timestamps_of(cache.get("p", "a", 0, 10, resolution=1000)) == [1]
+
+
+def test_lru_eviction_under_budget():
+    size = frame(0).nbytes + 8
+    cache = QueryCache(budget_bytes=3 * size)
+    for tag in "abc":
+        cache.put("p", tag, None, 5, 0, [1], [frame(1)])
+    cache.get("p", "a", None, 5)
+    cache.put("p", "d", None, 5, 0, [1], [frame(1)])
+    assert cache.get("p", "b", None, 5) is None
+    assert all(cache.get("p", tag, None, 5) is not None for tag in "acd")
+    assert cache.stats()["evictions"] == 1 and cache.nbytes == 3 * size
+
+
+def test_oversized_results_are_not_cached():
+    cache = QueryCache(budget_bytes=100)
+    timestamps, _ = cache.put("p", "a", None, None, 0, [1, 2], [frame(1, 50), frame(2, 50)])
+    assert timestamps.tolist() == [1, 2]
+    assert cache.stats()["entries"] == 0 and cache.nbytes == 0
+
+
+def test_append_extends_open_ended_ranges():
+    cache = QueryCache()
+    cache.put("p", "a", 10, None, 0, [10, 20], [frame(1), frame(2)])
+    cache.put("p", "a", None, None, 2, [10, 20], [frame(1), frame(2)])
+    cache.append("p", "a", 30, frame(3))
+    cache.append("p", "a", 15, frame(9))
+    cache.append("p", "a", 30, frame(3))
+    cache.append("p", "a", 5, frame(0))
+    assert timestamps_of(cache.get("p", "a", 10)) == [10, 15, 20, 30]
+    # The newest-two entry stays the newest two
+    assert timestamps_of(cache.get("p", "a", limit=2)) == [20, 30]
+    assert cache.nbytes == sum(frame(0).nbytes + 8 for _ in range(4 + 2))
+
+
+def test_append_drops_closed_ranges_it_falls_in():
+    cache = QueryCache()
+    cache.put("p", "a", 0, 100, 0, [10], [frame(1)])
+    cache.put("p", "a", 200, 300, 0, [210], [frame(1)])
+    cache.append("p", "a", 50, frame(2))
+    assert cache.get("p", "a", 0, 100) is None
+    assert cache.get("p", "a", 200, 300) is not None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_invalidate_by_tag_project_and_all():
+    cache = QueryCache()
+    for project, tag in (("p", "a"), ("p", "b"), ("q", "a")):
+        cache.put(project, tag, None, None, 0, [1], [frame(1)])
+    cache.invalidate("p", "a")
+    assert cache.get("p", "a") is None and cache.get("p", "b") is not None
+    cache.invalidate("p")
+    assert cache.get("p", "b") is None and cache.get("q", "a") is not None
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0 and cache.nbytes == 0 and cache.by_tag == {}
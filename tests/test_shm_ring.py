@@ -0,0 +1,88 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from shm_ring import FrameRing, FrameRingReader, FrameRingWriter, ring_name, unlink_segment
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create(f"sarayu_test_{uuid.uuid4().hex[:12]}", 4, 8)
+    yield ring
+    unlink_segment(ring.shm)
+    ring.close()
+
+
+def test_write_and_read(ring):
+    ring.write(10, [1.0, 2.0, 3.0], 4096.0)
+    timestamp, values, sample_rate = ring.read(0)
+    assert (timestamp, sample_rate) == (10, 4096.0)
+    np.testing.assert_array_equal(values, [1.0, 2.0, 3.0])
+    assert ring.frames_written() == 1
+
+
+def test_values_are_a_copy(ring):
+    ring.write(1, [1.0])
+    _, values, _ = ring.read(0)
+    ring.write(2, [9.0])
+    ring.values[0, 0] = 5.0
+    assert values[0] == 1.0
+
+
+def test_overwritten_frame_is_rejected(ring):
+    for number in range(6):
+        ring.write(number, [float(number)])
+    assert ring.read(0) is None and ring.read(1) is None
+    assert ring.read(5)[1][0] == 5.0
+
+
+def test_frame_being_written_is_rejected(ring):
+    ring.write(1, [1.0])
+    # The writer marks a slot odd while it rewrites it
+    ring.seqs[0] = 2 * 4 + 1
+    assert ring.read(0) is None
+    assert ring.read(4) is None
+
+
+def test_long_frames_are_cut_to_capacity(ring):
+    ring.write(1, np.arange(20.0))
+    assert len(ring.read(0)[1]) == 8
+
+
+def test_read_since_skips_what_the_ring_lost(ring):
+    for number in range(7):
+        ring.write(number, [float(number)])
+    frames, cursor = ring.read_since(0)
+    assert [frame[0] for frame in frames] == [3, 4, 5, 6] and cursor == 7
+    frames, cursor = ring.read_since(cursor)
+    assert frames == [] and cursor == 7
+    frames, _ = ring.read_since(0, limit=2)
+    assert [frame[0] for frame in frames] == [5, 6]
+
+
+def test_attach_rejects_other_segments(ring):
+    ring.magic[0] = 0
+    with pytest.raises(ValueError):
+        FrameRing.attach(ring.shm.name)
+
+
+def test_writer_replaces_small_rings_and_reader_follows():
+    project_name = f"test-{uuid.uuid4().hex[:8]}"
+    writer = FrameRingWriter(project_name, slots=4)
+    reader = FrameRingReader(project_name, retry_interval=0)
+    try:
+        assert reader.get("a/b") is None
+        writer.write("a/b", 1, [1.0, 2.0])
+        first = reader.get("a/b")
+        assert first.read(0)[1].tolist() == [1.0, 2.0]
+        writer.write("a/b", 2, [1.0, 2.0, 3.0])
+        assert first.retired
+        second = reader.get("a/b")
+        assert second is not first and second.capacity == 3
+        assert second.read(0)[1].tolist() == [1.0, 2.0, 3.0]
+    finally:
+        reader.close()
+        writer.close(unlink=True)
+    with pytest.raises(FileNotFoundError):
+        FrameRing.attach(ring_name(project_name, "a/b"))
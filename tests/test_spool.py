@@ -0,0 +1,151 @@
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from spool import (IngestSpool, SpoolFrame, encode_record, read_records, LEGACY_RECORD_HEADER, LEGACY_SEGMENT_SUFFIX,
+                   QUARANTINE_FILE)
+
+
+def make_frames(count, tag_name="plant/a"):
+    return [SpoolFrame(tag_name, 1000 + i, i, 4096.0, np.arange(i, i + 4, dtype=np.float64), 77) for i in range(count)]
+
+
+def write_segment(path, frames):
+    with open(path, "wb") as f:
+        for frame in frames:
+            f.write(encode_record(frame))
+
+
+def assert_same(frames, expected):
+    assert len(frames) == len(expected)
+    for frame, want in zip(frames, expected):
+        assert frame._replace(values=None) == want._replace(values=None)
+        np.testing.assert_array_equal(frame.values, want.values)
+
+
+def test_record_round_trip(tmp_path):
+    path = str(tmp_path / "1.seg2")
+    frames = make_frames(3) + [SpoolFrame("b", 5, None, None, np.empty(0), None)]
+    write_segment(path, frames)
+    read, offset, complete = read_records(path, 0, 100)
+    assert complete and offset == os.path.getsize(path)
+    assert_same(read, frames)
+
+
+def test_limit_and_offset(tmp_path):
+    path = str(tmp_path / "1.seg2")
+    frames = make_frames(5)
+    write_segment(path, frames)
+    first, offset, complete = read_records(path, 0, 2)
+    rest, _, _ = read_records(path, offset, 100)
+    assert complete
+    assert_same(first + rest, frames)
+
+
+def test_torn_tail(tmp_path):
+    path = str(tmp_path / "1.seg2")
+    frames = make_frames(3)
+    write_segment(path, frames)
+    size = os.path.getsize(path)
+    with open(path, "r+b") as f:
+        f.truncate(size - 5)
+    read, offset, complete = read_records(path, 0, 100)
+    assert not complete
+    assert_same(read, frames[:2])
+    assert read_records(path, offset, 100) == ([], offset, False)
+
+
+def test_corrupt_record(tmp_path):
+    path = str(tmp_path / "1.seg2")
+    write_segment(path, make_frames(2))
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\xff")
+    read, _, complete = read_records(path, 0, 100)
+    assert not complete and len(read) == 1
+
+
+def test_legacy_segment(tmp_path):
+    path = str(tmp_path / f"1{LEGACY_SEGMENT_SUFFIX}")
+    topic, values = b"old", np.array([1.0, 2.0], dtype="<f8")
+    header = LEGACY_RECORD_HEADER.pack(0, 42, 3, 100.0, len(topic), len(values))
+    body = topic + values.tobytes()
+    with open(path, "wb") as f:
+        f.write(struct.pack("<I", zlib.crc32(header[4:] + body)) + header[4:] + body)
+    read, _, complete = read_records(path, 0, 10)
+    assert complete
+    assert_same(read, [SpoolFrame("old", 42, 3, 100.0, values, None)])
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_replay_in_order_and_cleanup(tmp_path):
+    stored = []
+    spool = IngestSpool(str(tmp_path), lambda batch: stored.extend(batch) or True, rate_limit=0, batch_size=2,
+                        fsync_interval=0.01)
+    frames = make_frames(5)
+    for frame in frames:
+        spool.append(frame)
+    spool.start()
+    try:
+        assert wait_for(lambda: len(stored) == 5)
+        assert wait_for(lambda: not [name for name in os.listdir(tmp_path) if name != QUARANTINE_FILE])
+    finally:
+        spool.stop()
+    assert_same(stored, frames)
+    assert spool.stats()["replayed"] == 5
+
+
+def test_failed_store_keeps_frames(tmp_path):
+    attempts = []
+
+    def store_batch(batch):
+        attempts.append(len(batch))
+        return False
+
+    spool = IngestSpool(str(tmp_path), store_batch, rate_limit=0, fsync_interval=0.01, retry_interval=0.01)
+    spool.append(make_frames(1)[0])
+    spool.start()
+    try:
+        assert wait_for(lambda: len(attempts) >= 2)
+    finally:
+        spool.stop()
+    assert not spool.available
+    assert spool.stats()["replayed"] == 0
+    # A new spool on the same directory picks the segment up again
+    assert len(IngestSpool(str(tmp_path), lambda batch: True).closed) == 1
+
+
+def test_resume_from_saved_offset(tmp_path):
+    frames = make_frames(4)
+    path = str(tmp_path / f"{1:020d}.seg2")
+    write_segment(path, frames)
+    _, offset, _ = read_records(path, 0, 3)
+    with open(path + ".offset", "w") as f:
+        f.write(str(offset))
+    stored = []
+    spool = IngestSpool(str(tmp_path), lambda batch: stored.extend(batch) or True, rate_limit=0)
+    spool.start()
+    try:
+        assert wait_for(lambda: not os.path.exists(path))
+    finally:
+        spool.stop()
+    assert_same(stored, frames[3:])
+
+
+def test_quarantine_is_never_replayed(tmp_path):
+    spool = IngestSpool(str(tmp_path), lambda batch: True)
+    spool.quarantine(make_frames(1)[0])
+    assert spool.stats()["quarantined"] == 1
+    assert IngestSpool(str(tmp_path), lambda batch: True).closed == []
+    assert len(read_records(str(tmp_path / QUARANTINE_FILE), 0, 10)[0]) == 1
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from tag_import import read_tag_file, tag_string_from_fields, validate_tags
+
+
+class FakeTags:
+    def __init__(self, names):
+        self.names = names
+
+    def find(self, query, projection=None):
+        return [{"tag_name": name} for name in self.names]
+
+
+class FakeDb:
+    # parse_tag_string stands in for Database's: "topic|unit" -> tag document, None if malformed
+    def __init__(self, existing=()):
+        self.tags_collection = FakeTags(list(existing))
+
+    def parse_tag_string(self, base):
+        topic, _, unit = base.partition("|")
+        if not topic or " " in topic:
+            return None
+        return {"tag_name": topic, "unit": unit}
+
+
+def test_fields_to_tag_string():
+    assert tag_string_from_fields({"Tag": " plant/a ", "unit": "mm/s", "sr": "2048", "colour": "red"}) == \
+        "plant/a|mm/s|sr=2048"
+    assert tag_string_from_fields({"tag_name": "plant/b", "unit": "", "scale": None}) == "plant/b|"
+    assert tag_string_from_fields({"tag": "plant/c|g|scale=0.1"}) == "plant/c|g|scale=0.1"
+    assert tag_string_from_fields({"tag": 17}) == "17|"
+
+
+def test_read_csv(tmp_path):
+    path = tmp_path / "tags.csv"
+    path.write_text("tag,unit,sample_rate\nplant/a,mm/s,2048\nplant/b,,\n")
+    assert read_tag_file(str(path)) == ["plant/a|mm/s|sample_rate=2048", "plant/b|"]
+
+
+def test_read_json(tmp_path):
+    path = tmp_path / "tags.json"
+    path.write_text(json.dumps({"tags": ["plant/a|g", {"tag": "plant/b", "unit": "g"}, 5, None]}))
+    assert read_tag_file(str(path)) == ["plant/a|g", "plant/b|g", 5, None]
+
+
+def test_read_json_that_is_not_a_list(tmp_path):
+    path = tmp_path / "tags.json"
+    path.write_text("42")
+    with pytest.raises(ValueError):
+        read_tag_file(str(path))
+
+
+def test_validate_reports_each_bad_line():
+    docs, errors = validate_tags(FakeDb(existing=["plant/old"]), "p", [
+        "plant/a|g|sample_rate=2048", "plant/old|g", "plant/a|g", "bad topic|g", "plant/c|g|wrong=1", 5, None,
+        "plant/d|g|sample_rate=-1",
+    ])
+    assert [doc["tag_name"] for doc in docs] == ["plant/a"]
+    assert docs[0]["project_name"] == "p" and docs[0]["metadata"]["sample_rate"] == 2048.0
+    assert [(line, reason) for line, _, reason in errors] == [
+        (2, "Tag already exists"), (3, "Duplicate in file"), (4, "Invalid tag format"),
+        (5, "Unknown tag field 'wrong'. Use one of: sample_rate, frame_length, scale, offset, sensor_type, raw_min, raw_max"),
+        (6, "Tag entry must be a string or an object"), (7, "Tag entry must be a string or an object"),
+        (8, "sample_rate and frame_length must be positive"),
+    ]
+
+
+def test_validate_without_metadata():
+    docs, errors = validate_tags(FakeDb(), "p", [" plant/a|g "])
+    assert errors == [] and docs == [{"tag_name": "plant/a", "unit": "g", "project_name": "p"}]
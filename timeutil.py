@@ -0,0 +1,69 @@
+import time
+from datetime import datetime
+import numpy as np
+
+# Timestamps are int64 nanoseconds since the Unix epoch everywhere: in Mongo, in the
+# stores and between threads. Strings are only produced for labels and reports.
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_HOUR = 3600 * NS_PER_SECOND
+LOCAL_TZ = datetime.now().astimezone().tzinfo
+
+
+def now_ns():
+    return time.time_ns()
+
+
+def to_ns(value):
+    # Accepts epoch ns, naive/aware datetimes (naive means local time), datetime64 and
+    # the legacy ISO strings written by datetime.now().isoformat()
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, np.datetime64):
+        return int(value.astype("datetime64[ns]").astype(np.int64))
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        seconds = int(value.timestamp())
+        return seconds * NS_PER_SECOND + value.microsecond * 1000
+    raise TypeError(f"Unsupported timestamp {value!r}")
+
+
+def to_ns_array(values):
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        return values.astype(np.int64)
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[ns]").astype(np.int64)
+    # Legacy strings are local wall-clock times, so they go through the scalar path
+    return np.fromiter((to_ns(value) for value in values), dtype=np.int64, count=len(values))
+
+
+def to_datetime64(values):
+    return to_ns_array(values).view("datetime64[ns]")
+
+
+def to_seconds(values):
+    # Float epoch seconds for plot axes
+    return to_ns_array(values) / NS_PER_SECOND
+
+
+def hour_bucket(timestamp_ns):
+    # Start of the local wall-clock hour, so hourly windows match their labels and the
+    # legacy local-time keys even in zones offset by a fraction of an hour
+    offset = time.localtime(timestamp_ns // NS_PER_SECOND).tm_gmtoff * NS_PER_SECOND
+    return timestamp_ns - (timestamp_ns + offset) % NS_PER_HOUR
+
+
+def to_datetime(timestamp_ns):
+    return datetime.fromtimestamp(timestamp_ns / NS_PER_SECOND)
+
+
+def format_ns(timestamp_ns, fmt="%Y-%m-%d %H:%M:%S.%f"):
+    if timestamp_ns is None:
+        return "N/A"
+    if isinstance(timestamp_ns, str):
+        return timestamp_ns
+    return to_datetime(timestamp_ns).strftime(fmt)
@@ -0,0 +1,127 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+import threading
+import logging
+
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class CancelToken:
+    def __init__(self):
+        self.cancelled = False
+        self.on_report = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, partial):
+        # Lets a long job hand intermediate results to the GUI before it finishes
+        if self.on_report and not self.cancelled:
+            self.on_report(partial)
+
+
+class JobSignals(QObject):
+    finished = pyqtSignal(str, int, object)  # Signal: key, generation, result
+    partial = pyqtSignal(str, int, object)  # Signal: key, generation, intermediate result
+    failed = pyqtSignal(str, int, str)  # Signal: key, generation, error message
+
+
+class ComputeJob(QRunnable):
+    def __init__(self, key, generation, token, signals, fn, args):
+        super().__init__()
+        self.key = key
+        self.generation = generation
+        self.token = token
+        self.signals = signals
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        if self.token.cancelled:
+            return
+        self.token.on_report = lambda partial: self.signals.partial.emit(self.key, self.generation, partial)
+        try:
+            result = self.fn(self.token, *self.args)
+        except Exception as e:
+            logging.error(f"Compute job {self.key} failed: {str(e)}")
+            self.signals.failed.emit(self.key, self.generation, str(e))
+            return
+        if not self.token.cancelled:
+            self.signals.finished.emit(self.key, self.generation, result)
+
+
+# Runs "fetch + compute" functions on a QThreadPool and hands results back on the
+# GUI thread. Submitting a job under a key supersedes the previous job for that key:
+# a queued job returns as soon as it starts, a running one can poll token.cancelled,
+# and either way its result is ignored.
+class ComputePool(QObject):
+    def __init__(self, max_threads=None):
+        super().__init__()
+        self.thread_pool = QThreadPool()
+        if max_threads:
+            self.thread_pool.setMaxThreadCount(max_threads)
+        self.lock = threading.Lock()
+        self.jobs = {}  # key -> (token, signals, on_result, on_error, on_partial)
+        self.generations = {}
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None, on_partial=None):
+        with self.lock:
+            generation = self.generations.get(key, 0) + 1
+            self.generations[key] = generation
+            previous = self.jobs.get(key)
+            token = CancelToken()
+            signals = JobSignals()
+            signals.finished.connect(self.on_job_finished)
+            signals.failed.connect(self.on_job_failed)
+            signals.partial.connect(self.on_job_partial)
+            self.jobs[key] = (token, signals, on_result, on_error, on_partial)
+        if previous:
+            previous[0].cancel()
+        self.thread_pool.start(ComputeJob(key, generation, token, signals, fn, args))
+        return generation
+
+    def cancel(self, key):
+        with self.lock:
+            entry = self.jobs.pop(key, None)
+            self.generations[key] = self.generations.get(key, 0) + 1
+        if entry:
+            entry[0].cancel()
+
+    def take_current(self, key, generation):
+        with self.lock:
+            if self.generations.get(key) != generation or key not in self.jobs:
+                return None
+            return self.jobs.pop(key)
+
+    def on_job_partial(self, key, generation, partial):
+        with self.lock:
+            entry = self.jobs.get(key) if self.generations.get(key) == generation else None
+        if entry and entry[4]:
+            try:
+                entry[4](partial)
+            except RuntimeError as e:
+                logging.debug(f"Dropped partial result for {key}: {str(e)}")
+
+    def on_job_finished(self, key, generation, result):
+        entry = self.take_current(key, generation)
+        if entry and entry[2]:
+            try:
+                entry[2](result)
+            except RuntimeError as e:
+                # The feature's widgets were deleted while the job was running
+                logging.debug(f"Dropped result for {key}: {str(e)}")
+
+    def on_job_failed(self, key, generation, message):
+        entry = self.take_current(key, generation)
+        if entry and entry[3]:
+            try:
+                entry[3](message)
+            except RuntimeError as e:
+                logging.debug(f"Dropped error for {key}: {str(e)}")
+
+    def shutdown(self):
+        with self.lock:
+            entries = list(self.jobs.values())
+            self.jobs.clear()
+        for token, *_ in entries:
+            token.cancel()
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone(2000)